@@ -7,23 +7,52 @@ Includes:
     + Additional JSON metadata for the automation
 - Table specs for associating models, table names, and misc
 - A table poller for executing callbacks on status changes
+- A process-wide, per-base rate limiter shared by all clients
+- A REST transport using pooled, per-base HTTP sessions
+- A unit of work session, with an identity map of loaded models
 
 """
 
 import abc
+from collections import defaultdict
+import concurrent.futures
 import datetime
 import enum
+import functools
+import heapq
+import itertools
 import json
 import logging
-from typing import Dict, Optional, Set, Type
+import queue
+import random
+import threading
+import time
+import types
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
+from urllib.parse import quote
 
 import pydantic
+import pydantic.fields
 import pydantic.schema
 from pydantic import constr
-from airtable import Airtable
+import requests
+import requests.adapters
 
 from ..secrets import BaseSecret, SecretsClient
-from ..settings import BaseConfig
+from ..settings import BaseConfig, get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +63,73 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_POLL_TABLE_MAX_NUM_RETRIES = 3
 
+CALLBACK_RETRY_BASE_DELAY = 1.0
+CALLBACK_RETRY_MAX_DELAY = 60.0
+"""Bounds of the backoff between attempts of a failed poll callback"""
+
+DEAD_LETTER_RETRY_BASE_DELAY = 5 * 60.0
+DEAD_LETTER_RETRY_MAX_DELAY = 6 * 60 * 60.0
+"""Bounds of the backoff between polls retrying a dead letter"""
+
+DEFAULT_DEAD_LETTER_MAX_NUM_FAILURES = 8
+"""Number of failed polls after which a dead letter is only replayed
+manually
+"""
+
+POLL_LEASE_TTL = 60.0
+"""Expiry of the lease on polling a table, renewed while polling"""
+
+RECORD_LEASE_TTL = 15 * 60.0
+"""Expiry of the lease on processing a record's status, long enough for
+other polls to have scanned past the record
+"""
+
+DEFAULT_POLL_TABLE_PREFETCH_PAGES = 1
+"""Number of pages fetched ahead while `poll_table` runs callbacks"""
+
+PREFETCH_POLL_INTERVAL = 0.1
+"""How often a blocked prefetch thread checks whether it was cancelled"""
+
+ALL_FIELDS = object()
+"""Sentinel for fetching every field of a record, instead of the model's"""
+
+WATERMARK_SAFETY_MARGIN = datetime.timedelta(seconds=30)
+"""Overlap between incremental polls, to allow for clock skew with airtable"""
+
+AIRTABLE_BATCH_SIZE = 10
+"""Maximum number of records airtable accepts in a single batch request"""
+
+WRITE_BACK_MAX_DELAY = 5.0
+"""Longest a processed record's seen status waits for its batch to fill up
+before being written back, well within poll time budgets and lease expiries
+"""
+
+GET_MANY_CHUNK_SIZE = 50
+"""Number of record ids looked up per request by `AirtableClient.get_many`,
+which keeps formulas (and URLs) short and results within a single page
+"""
+
+AIRTABLE_REQUESTS_PER_SECOND = 5
+"""Airtable's documented request rate limit, per base"""
+
+DEFAULT_MAX_NUM_REQUEST_RETRIES = 5
+"""Number of times a rate limited (429) or failed (5xx) request is retried"""
+
+AIRTABLE_API_URL = "https://api.airtable.com/v0"
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 100
+
+DEFAULT_POOL_MAXSIZE = 10
+"""Maximum number of kept-alive connections per base"""
+
+DEFAULT_REQUEST_TIMEOUT = (5, 30)
+"""Connect and read timeouts for airtable requests, in seconds"""
+
+REQUEST_RETRY_BASE_DELAY = 1.0
+REQUEST_RETRY_MAX_DELAY = 30.0
+"""Airtable blocks a base for 30 seconds after it has been rate limited"""
+
 
 ###############
 # BASE MODELS #
@@ -61,17 +157,16 @@ class BaseModel(pydantic.BaseModel, abc.ABC):
     state: BaseModelState
     """Current state of the model"""
 
-    last_snapshot: Optional["BaseModel"] = pydantic.Field(default=None)
-    """Last snapshot taken after loading or saving to remote
-
-    Used to determine modified fields that need to be saved on the remote
-    """
-
     modified_fields: Optional[Set[str]] = pydantic.Field(default=None)
     """Contains a set of modified field names, automatically updated after
     modifying a field
     """
 
+    _last_snapshot: Optional[Dict[str, Any]] = pydantic.PrivateAttr(
+        default=None
+    )
+    """Frozen values of the tracked fields, by field name, see `_freeze`"""
+
     class Config:
         allow_population_by_field_name = True
         underscore_attrs_are_private = True
@@ -95,6 +190,8 @@ class BaseModel(pydantic.BaseModel, abc.ABC):
             )
 
         super().__init__(**data)
+        # NOTE that this is the only snapshot taken when loading a model
+        #
         # NOTE that our initial snapshot won't capture any modifications that
         # happened during initialization (e.g. via a pydantic validator in
         # a subclass)
@@ -104,7 +201,7 @@ class BaseModel(pydantic.BaseModel, abc.ABC):
 
     @pydantic.root_validator()
     def validate_state_invariants(cls, values):
-        """Validates and modifies state invariants"""
+        """Validates state invariants"""
         cur_state = values["state"]
 
         if (
@@ -122,33 +219,6 @@ class BaseModel(pydantic.BaseModel, abc.ABC):
                     "'created_at'"
                 )
 
-        # Check to see if any fields have changed since the last snapshot,
-        # and update `state` and `modified_fields`
-        if (
-            cur_state != BaseModelState.NEW
-            and (last_snapshot := values.get("last_snapshot")) is not None
-        ):
-            modified_fields = values["modified_fields"]
-
-            snapshot_dict = last_snapshot.dict()
-            # NOTE that we exclude any fields in `BaseModel` when checking for
-            # modified fields
-            relevant_fields = (
-                snapshot_dict.keys() | values.keys()
-            ) - BaseModel.__fields__.keys()
-            modified_fields = {
-                field
-                for field in relevant_fields
-                if snapshot_dict.get(field) != values.get(field)
-            }
-
-            if len(modified_fields) != 0:
-                values["state"] = BaseModelState.DIRTY
-                values["modified_fields"] = modified_fields
-            else:
-                values["state"] = BaseModelState.CLEAN
-                values["modified_fields"] = set()
-
         return values
 
     @pydantic.validator("id", "created_at")
@@ -166,12 +236,96 @@ class BaseModel(pydantic.BaseModel, abc.ABC):
 
         return v
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+
+        # NOTE that we only compare the assigned field with the snapshot, so
+        # tracking modifications costs the same regardless of the number of
+        # fields
+        if name in _get_tracked_field_names(type(self)):
+            self._update_modified_field(name)
+        elif name == "state":
+            self._update_modified_fields()
+
     # METHODS
 
+    @property
+    def last_snapshot(self) -> Optional[Mapping[str, Any]]:
+        """Last snapshot taken after loading or saving to remote
+
+        A read-only map of field names to frozen values (lists are stored as
+        tuples, dicts as read-only maps, etc.). Used to determine modified
+        fields that need to be saved on the remote.
+        """
+        if self._last_snapshot is None:
+            return None
+        return types.MappingProxyType(self._last_snapshot)
+
     def snapshot(self):
         """Takes a snapshot of the model's current state"""
-        self.last_snapshot = self.copy(deep=True)
+        if self._last_snapshot is None or self.state == BaseModelState.NEW:
+            self._last_snapshot = {
+                name: _freeze(self.__dict__[name])
+                for name in _get_tracked_field_names(type(self))
+            }
+        else:
+            # Unmodified fields already match the snapshot, so only refreeze
+            # the modified ones
+            #
+            # NOTE that the snapshot is replaced rather than updated in place,
+            # since pydantic's `copy` shares it between a model and its copies
+            self._update_modified_fields()
+            self._last_snapshot = {
+                **self._last_snapshot,
+                **{
+                    name: _freeze(self.__dict__[name])
+                    for name in self.modified_fields
+                },
+            }
+
         self.modified_fields = set()
+        self._update_modified_fields()
+
+    def _update_modified_field(self, name):
+        """Updates `modified_fields` and `state` after `name` was assigned"""
+        # NOTE that modifications aren't tracked until a model has been saved
+        # remotely (or before the initial snapshot)
+        if self.state == BaseModelState.NEW or self._last_snapshot is None:
+            return
+
+        # NOTE that `modified_fields` is replaced rather than updated in
+        # place, like the snapshot, since copies of the model share it
+        is_modified = _freeze(self.__dict__[name]) != self._last_snapshot[name]
+        if is_modified != (name in self.modified_fields):
+            self.__dict__["modified_fields"] = (
+                self.modified_fields | {name}
+                if is_modified
+                else self.modified_fields - {name}
+            )
+
+        self._update_state()
+
+    def _update_modified_fields(self):
+        """Recomputes `modified_fields` and `state` from every field"""
+        if self.state == BaseModelState.NEW or self._last_snapshot is None:
+            return
+
+        self.__dict__["modified_fields"] = {
+            name
+            for name, value in self._last_snapshot.items()
+            if _freeze(self.__dict__[name]) != value
+        }
+
+        self._update_state()
+
+    def _update_state(self):
+        # NOTE that we bypass validation (and `__setattr__`) here, the
+        # invariants of 'CLEAN' and 'DIRTY' are the same
+        self.__dict__["state"] = (
+            BaseModelState.DIRTY
+            if self.modified_fields
+            else BaseModelState.CLEAN
+        )
 
     # (DE)SERIALIZATION METHODS
 
@@ -184,9 +338,30 @@ class BaseModel(pydantic.BaseModel, abc.ABC):
             created_at=raw_dict["createdTime"],
             **raw_dict["fields"],
         )
-        res.snapshot()
         return res
 
+    @classmethod
+    def from_airtable_read_only(cls, **raw_dict) -> "ReadOnlyRecord":
+        """Load an immutable record from raw airtable data
+
+        The data is validated once, like `from_airtable` does, but no
+        snapshot is taken and modifications aren't tracked. Meant for bulk
+        scans that never write back, see `ReadOnlyRecord`.
+        """
+        values, _, error = pydantic.validate_model(
+            cls,
+            {
+                "state": BaseModelState.CLEAN,
+                "id": raw_dict["id"],
+                "created_at": raw_dict["createdTime"],
+                **raw_dict["fields"],
+            },
+        )
+        if error is not None:
+            raise error
+
+        return _get_read_only_record_cls(cls)(values)
+
     @classmethod
     def new(cls, **data):
         """Create a new model from provided data"""
@@ -210,34 +385,30 @@ class BaseModel(pydantic.BaseModel, abc.ABC):
             **data,
         )
 
+    @classmethod
+    def get_airtable_field_names(cls) -> List[str]:
+        """Returns the airtable names of the fields declared by the model
+
+        Used to only fetch the fields we care about from airtable.
+        """
+        return [
+            field.alias
+            for name, field in cls.__fields__.items()
+            if name not in BaseModel.__fields__
+        ]
+
     def to_airtable(self, modified_only=False):
         """Serialize model to airtable format"""
-        include = None
-        if modified_only:
-            include = self.modified_fields
-
-        # NOTE that `pydantic.BaseModel.dict()` doesn't serialize all types to
-        # strings, so we have to use `pydantic.BaseModel.json()` to dump the
-        # model to json and then reload it back into a dict.
-        fields = json.loads(
-            self.json(
-                by_alias=True,
-                exclude_none=True,
-                include=include,
-                # TODO : once old automation is deprecated, remove `_meta` from
-                # `exclude`
-                #
-                # Exclude _meta so that only the node automation controls it.
-                exclude={
-                    "state",
-                    "id",
-                    "created_at",
-                    "last_snapshot",
-                    "modified_fields",
-                    "_meta",
-                },
-            )
-        )
+        values = self.__dict__
+        modified_fields = self.modified_fields if modified_only else None
+
+        fields = {}
+        for name, alias, encode in _get_field_serializers(type(self)):
+            if modified_fields is not None and name not in modified_fields:
+                continue
+            value = values[name]
+            if value is not None:
+                fields[alias] = encode(value)
 
         return {
             "id": self.id,
@@ -245,7 +416,184 @@ class BaseModel(pydantic.BaseModel, abc.ABC):
         }
 
 
-BaseModel.update_forward_refs()
+def _freeze(value):
+    """Returns an immutable equivalent of a field's value, for snapshots
+
+    Scalars are returned as is, so snapshots share them with the model.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    elif isinstance(value, dict):
+        return types.MappingProxyType(
+            {k: _freeze(v) for k, v in value.items()}
+        )
+    elif isinstance(value, set):
+        return frozenset(value)
+    else:
+        return value
+
+
+@functools.lru_cache(maxsize=None)
+def _get_tracked_field_names(model_cls):
+    """Returns the names of fields whose modifications are tracked"""
+    # NOTE that we exclude any fields in `BaseModel` when checking for
+    # modified fields
+    return frozenset(model_cls.__fields__.keys() - BaseModel.__fields__.keys())
+
+
+class ReadOnlyRecord:
+    """An immutable record loaded by `BaseModel.from_airtable_read_only`
+
+    Only holds the `id`, `created_at` and the fields declared by the model, in
+    slots, with values frozen like snapshots are (lists are stored as tuples,
+    dicts as read-only maps, etc.). The model's methods aren't available.
+
+    Use `_get_read_only_record_cls` to get the record class of a model.
+    """
+
+    __slots__ = ("id", "created_at")
+
+    model_cls: Type[BaseModel]
+
+    def __init__(self, values):
+        for name in self._field_names:
+            object.__setattr__(self, name, _freeze(values[name]))
+
+    def __setattr__(self, name, value):
+        raise TypeError(
+            f'"{type(self).__name__}" is immutable and does not support '
+            "item assignment"
+        )
+
+    def __delattr__(self, name):
+        raise TypeError(
+            f'"{type(self).__name__}" is immutable and does not support '
+            "item deletion"
+        )
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self._field_names
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({})".format(
+            type(self).__name__,
+            ", ".join(
+                f"{name}={getattr(self, name)!r}" for name in self._field_names
+            ),
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_read_only_record_cls(model_cls):
+    """Creates the `ReadOnlyRecord` subclass for a model class"""
+    field_names = tuple(
+        name
+        for name in model_cls.__fields__
+        if name in _get_tracked_field_names(model_cls)
+    )
+    return type(
+        f"ReadOnly{model_cls.__name__}",
+        (ReadOnlyRecord,),
+        {
+            "__slots__": field_names,
+            "model_cls": model_cls,
+            "_field_names": ReadOnlyRecord.__slots__ + field_names,
+        },
+    )
+
+
+_JSON_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+_TO_AIRTABLE_EXCLUDE = frozenset(
+    {
+        "state",
+        "id",
+        "created_at",
+        "modified_fields",
+        # TODO : once old automation is deprecated, remove `_meta` from
+        # `exclude`
+        #
+        # Exclude _meta so that only the node automation controls it.
+        #
+        # NOTE that this is matched against field names, not aliases (as
+        # `pydantic.BaseModel.json(exclude=...)` did), so `meta` is serialized
+        "_meta",
+    }
+)
+"""Names of the fields `BaseModel.to_airtable` never serializes"""
+
+
+class _FieldSerializer(NamedTuple):
+    name: str
+    alias: str
+    encode: Callable[[Any], Any]
+
+
+def _to_json_compatible(value, default):
+    """Returns `value` as `json.loads(json.dumps(value, default=default))`
+    would, without the round trip for the common types
+    """
+    value_type = type(value)
+    if value_type in _JSON_SCALAR_TYPES:
+        return value
+    elif value_type is list or value_type is tuple:
+        return [_to_json_compatible(v, default) for v in value]
+    elif value_type is dict and all(type(k) is str for k in value):
+        return {k: _to_json_compatible(v, default) for k, v in value.items()}
+    else:
+        # e.g. sets, enums, non-string keys and subclasses of scalars
+        return json.loads(json.dumps(value, default=default))
+
+
+def _encode_isoformat(value):
+    return value.isoformat()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_field_serializers(model_cls) -> Tuple[_FieldSerializer, ...]:
+    """Compiles the serializers of the fields `to_airtable` sends, in order
+
+    Serializing a value must give the same result as dumping the model with
+    `pydantic.BaseModel.json(by_alias=True)` and loading it back, which is
+    what `to_airtable` used to do.
+    """
+    encode_generic = functools.partial(
+        _to_json_compatible, default=model_cls.__json_encoder__
+    )
+
+    def encode_scalar(value):
+        if type(value) in _JSON_SCALAR_TYPES:
+            return value
+        return encode_generic(value)
+
+    serializers = []
+    for name, field in model_cls.__fields__.items():
+        if name in _TO_AIRTABLE_EXCLUDE:
+            continue
+
+        if model_cls.__config__.json_encoders:
+            # Custom encoders may apply to any type
+            encode = encode_generic
+        elif field.shape != pydantic.fields.SHAPE_SINGLETON:
+            encode = encode_generic
+        elif field.type_ in (str, int, float, bool):
+            encode = encode_scalar
+        elif field.type_ in (datetime.date, datetime.datetime, datetime.time):
+            encode = _encode_isoformat
+        else:
+            # e.g. `pydantic.Json`, whose values are parsed JSON
+            encode = encode_generic
+
+        serializers.append(_FieldSerializer(name, field.alias, encode))
+
+    return tuple(serializers)
 
 
 # TODO : should this class inherit from ABC?
@@ -295,6 +643,461 @@ class AirtableSettings(pydantic.BaseSettings):
         env_prefix = "airtable_"
 
 
+#################
+# RATE LIMITING #
+#################
+
+
+class RateLimiter:
+    """A thread-safe token bucket with backoff for throttled responses
+
+    Every request reserves a token before being sent, waiting for the bucket to
+    refill if needed. When a response is rate limited (429) or failed (5xx),
+    the whole bucket is paused (honoring `Retry-After` when present, otherwise
+    with jittered exponential backoff) so that every client sharing the
+    limiter backs off together.
+
+    Use `get_rate_limiter` to get the limiter shared by all clients of a base.
+    """
+
+    def __init__(
+        self,
+        rate=AIRTABLE_REQUESTS_PER_SECOND,
+        capacity=None,
+        max_num_retries=DEFAULT_MAX_NUM_REQUEST_RETRIES,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.max_num_retries = max_num_retries
+
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(self.capacity)
+        self._last_refill = clock()
+        self._blocked_until = 0.0
+
+        self._num_requests = 0
+        self._num_throttled = 0
+        self._throttled_seconds = 0.0
+        self._num_retries = 0
+        self._backoff_seconds = 0.0
+
+    def acquire(self):
+        """Blocks until a request may be sent, returns the time waited"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._last_refill) * self.rate,
+            )
+            self._last_refill = now
+
+            # NOTE that tokens may go negative, this reserves a slot in the
+            # future for this request so concurrent callers queue up fairly
+            self._tokens -= 1
+            wait = max(
+                -self._tokens / self.rate if self._tokens < 0 else 0.0,
+                self._blocked_until - now,
+            )
+
+            self._num_requests += 1
+            if wait > 0:
+                self._num_throttled += 1
+                self._throttled_seconds += wait
+
+        if wait > 0:
+            self._sleep(wait)
+
+        return wait
+
+    def backoff(self, num_retries, retry_after=None):
+        """Pauses the bucket after a throttled response, returns the delay"""
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            delay = _get_backoff_delay(
+                num_retries, REQUEST_RETRY_BASE_DELAY, REQUEST_RETRY_MAX_DELAY
+            )
+
+        with self._lock:
+            self._blocked_until = max(
+                self._blocked_until, self._clock() + delay
+            )
+            self._num_retries += 1
+            self._backoff_seconds += delay
+
+        return delay
+
+    def send(self, send_request, retry_server_errors=True):
+        """Sends a request through the limiter, retrying 429s and 5xxs
+
+        `send_request` is called without arguments and must return a
+        `requests.Response`. The last response is returned once it succeeds or
+        retries are exhausted. 5xxs are only retried if `retry_server_errors`,
+        since the request may have been applied anyway.
+        """
+        for num_retries in range(self.max_num_retries + 1):
+            self.acquire()
+            response = send_request()
+
+            if not _is_retryable_status(
+                response.status_code, retry_server_errors
+            ):
+                return response
+
+            if num_retries == self.max_num_retries:
+                break
+
+            delay = self.backoff(
+                num_retries,
+                retry_after=_parse_retry_after(
+                    response.headers.get("Retry-After")
+                ),
+            )
+            logger.warning(
+                f"Airtable request failed with {response.status_code}, "
+                f"retrying in {delay:.2f}s (num retries {num_retries})"
+            )
+
+        return response
+
+    def stats(self):
+        """Returns counters describing how much the limiter has throttled"""
+        with self._lock:
+            return {
+                "num_requests": self._num_requests,
+                "num_throttled": self._num_throttled,
+                "throttled_seconds": self._throttled_seconds,
+                "num_retries": self._num_retries,
+                "backoff_seconds": self._backoff_seconds,
+            }
+
+
+def _get_backoff_delay(num_retries, base_delay, max_delay):
+    """Returns a jittered, exponentially increasing delay"""
+    delay = min(max_delay, base_delay * 2 ** num_retries)
+    return random.uniform(delay / 2, delay)
+
+
+def _is_retryable_status(status_code, retry_server_errors=True):
+    return status_code == 429 or (
+        retry_server_errors and 500 <= status_code < 600
+    )
+
+
+def _parse_retry_after(value):
+    # NOTE that we don't bother supporting the HTTP-date form of the header
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+_RATE_LIMITERS: Dict[str, RateLimiter] = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(base_id):
+    """Returns the process-wide rate limiter for an airtable base"""
+    with _RATE_LIMITERS_LOCK:
+        if base_id not in _RATE_LIMITERS:
+            _RATE_LIMITERS[base_id] = RateLimiter()
+        return _RATE_LIMITERS[base_id]
+
+
+def get_rate_limiter_stats():
+    """Returns the stats of every rate limiter, keyed by base id"""
+    with _RATE_LIMITERS_LOCK:
+        limiters = dict(_RATE_LIMITERS)
+    return {base_id: limiter.stats() for base_id, limiter in limiters.items()}
+
+
+#############
+# TRANSPORT #
+#############
+
+
+def _chunked(seq, chunk_size):
+    """Splits a sequence into lists of at most `chunk_size` elements"""
+    for i in range(0, len(seq), chunk_size):
+        yield seq[i : i + chunk_size]
+
+
+_PREFETCH_DONE = object()
+
+
+def _close_iterator(iterator):
+    """Closes a generator (e.g. to cancel prefetching) early, if it is one"""
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+def _prefetch(iterable, num_items):
+    """Iterates over `iterable` on a background thread, `num_items` ahead
+
+    Items are buffered in a bounded queue, so at most `num_items` are held
+    waiting for the consumer. Exceptions raised while iterating are re-raised
+    to the consumer. Closing the returned iterator cancels the background
+    thread once its current item is done.
+    """
+    items = queue.Queue(maxsize=num_items)
+    cancelled = threading.Event()
+
+    def put(item):
+        while not cancelled.is_set():
+            try:
+                items.put(item, timeout=PREFETCH_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((_PREFETCH_DONE, e))
+        else:
+            put((_PREFETCH_DONE, None))
+        finally:
+            # NOTE that generators can only be closed from the thread that
+            # iterates them
+            _close_iterator(iterator)
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item, error = items.get()
+            if item is _PREFETCH_DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        cancelled.set()
+
+
+def _chain_closing(*iterables):
+    """Chains iterables, closing all of them when closed"""
+    try:
+        for iterable in iterables:
+            yield from iterable
+    finally:
+        for iterable in iterables:
+            _close_iterator(iterable)
+
+
+class AirtablePage(NamedTuple):
+    records: List[dict]
+    """Raw records in the page"""
+    offset: Optional[str]
+    """Offset used to request the page, `None` for the first page"""
+    next_offset: Optional[str]
+    """Offset of the next page, `None` if this is the last page"""
+
+
+class ModelPage(list):
+    """A page of loaded records, with the offsets of the page"""
+
+    def __init__(self, records, offset=None, next_offset=None):
+        super().__init__(records)
+        self.offset = offset
+        """Offset used to request the page, `None` for the first page"""
+        self.next_offset = next_offset
+        """Offset of the next page, `None` if this is the last page"""
+
+
+_SESSIONS: Dict[Tuple[str, str], requests.Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def get_session(base_id, api_key):
+    """Returns the process-wide pooled HTTP session for an airtable base
+
+    Sessions keep connections alive between requests, so clients for
+    different tables in the same base share TLS connections.
+    """
+    key = (base_id, api_key)
+    with _SESSIONS_LOCK:
+        if key not in _SESSIONS:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1, pool_maxsize=DEFAULT_POOL_MAXSIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(
+                {
+                    "Authorization": f"Bearer {api_key}",
+                    "Accept-Encoding": "gzip, deflate",
+                }
+            )
+            _SESSIONS[key] = session
+        return _SESSIONS[key]
+
+
+class AirtableTransport:
+    """Minimal client for airtable's REST API
+
+    Requests go through a pooled session shared by every transport for the
+    same base, and through the base's `RateLimiter`.
+    """
+
+    def __init__(
+        self,
+        base_id,
+        table_name,
+        api_key,
+        *,
+        rate_limiter=None,
+        page_size=DEFAULT_PAGE_SIZE,
+        api_url=AIRTABLE_API_URL,
+        timeout=DEFAULT_REQUEST_TIMEOUT,
+    ):
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(
+                f"Page size must be between 1 and {MAX_PAGE_SIZE}: "
+                f"{page_size}"
+            )
+
+        self.table_name = table_name
+        self.page_size = page_size
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.session = get_session(base_id, api_key)
+        self.url_table = "/".join(
+            [api_url.rstrip("/"), base_id, quote(table_name, safe="")]
+        )
+
+    def record_url(self, record_id):
+        return f"{self.url_table}/{record_id}"
+
+    def _request(self, method, url, params=None, json_data=None):
+        def send_request():
+            return self.session.request(
+                method,
+                url,
+                params=params,
+                json=json_data,
+                timeout=self.timeout,
+            )
+
+        if self.rate_limiter is not None:
+            # NOTE that a 5xx may come after airtable created the records of a
+            # POST, retrying it would create duplicates. 429s are never applied
+            response = self.rate_limiter.send(
+                send_request, retry_server_errors=method != "POST"
+            )
+        else:
+            response = send_request()
+
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            # Include airtable's error message, it is much more useful than
+            # the status code alone
+            try:
+                error = response.json().get("error")
+            except ValueError:
+                error = None
+            if error is not None:
+                e.args = (*e.args, f"[Error: {error}]")
+            raise
+
+        return response.json()
+
+    def get(self, record_id):
+        return self._request("GET", self.record_url(record_id))
+
+    def iter_pages(
+        self,
+        formula=None,
+        fields=None,
+        sort=None,
+        max_records=None,
+        page_size=None,
+        offset=None,
+    ) -> Iterator[AirtablePage]:
+        """Iterates over pages of raw records
+
+        `sort` is a list of field names, prefixed with "-" for descending
+        order. Iteration starts from `offset` when provided.
+        """
+        params = [("pageSize", page_size or self.page_size)]
+        if formula is not None:
+            params.append(("filterByFormula", formula))
+        for field in fields or []:
+            params.append(("fields[]", field))
+        for i, field in enumerate(sort or []):
+            direction = "desc" if field.startswith("-") else "asc"
+            params.append((f"sort[{i}][field]", field.lstrip("-")))
+            params.append((f"sort[{i}][direction]", direction))
+        if max_records is not None:
+            params.append(("maxRecords", max_records))
+
+        while True:
+            page_params = params
+            if offset is not None:
+                page_params = params + [("offset", offset)]
+
+            data = self._request("GET", self.url_table, params=page_params)
+            next_offset = data.get("offset")
+            yield AirtablePage(data.get("records", []), offset, next_offset)
+
+            if next_offset is None:
+                break
+            offset = next_offset
+
+    def get_iter(self, **options):
+        """Iterates over lists of raw records, see `iter_pages`"""
+        for page in self.iter_pages(**options):
+            yield page.records
+
+    def insert(self, fields):
+        return self.batch_insert([fields])[0]
+
+    def batch_insert(self, records):
+        """Creates records from a list of fields, returns the created records
+
+        Records are sent in batches of `AIRTABLE_BATCH_SIZE`.
+        """
+        res = []
+        for chunk in _chunked(records, AIRTABLE_BATCH_SIZE):
+            data = self._request(
+                "POST",
+                self.url_table,
+                json_data={"records": [{"fields": f} for f in chunk]},
+            )
+            res.extend(data["records"])
+        return res
+
+    def update(self, record_id, fields):
+        return self.batch_update([{"id": record_id, "fields": fields}])[0]
+
+    def batch_update(self, records):
+        """Updates records, each a dict with an "id" and "fields"
+
+        Records are sent in batches of `AIRTABLE_BATCH_SIZE`, only provided
+        fields are modified. Returns the updated records.
+        """
+        res = []
+        for chunk in _chunked(records, AIRTABLE_BATCH_SIZE):
+            data = self._request(
+                "PATCH", self.url_table, json_data={"records": chunk}
+            )
+            res.extend(data["records"])
+        return res
+
+
 #########
 # TABLE #
 #########
@@ -309,17 +1112,19 @@ class TableSpec(pydantic.BaseModel):
         read_only=False,
         secrets_client=None,
         settings=None,
+        page_size=DEFAULT_PAGE_SIZE,
     ):
         if secrets_client is None:
             secrets_client = SecretsClient()
         if settings is None:
-            settings = AirtableSettings()
+            settings = get_settings(AirtableSettings)
         return AirtableClient(
             settings.table_names[self.name],
             self,
             read_only,
             secrets_client=secrets_client,
             settings=settings,
+            page_size=page_size,
         )
 
     # TODO : add a `status_to_cb` validator that calls `get_valid_statuses`
@@ -330,10 +1135,398 @@ class TableSpec(pydantic.BaseModel):
 ##########
 
 
+def _modified_since_formula(modified_since):
+    return (
+        f'IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE("{modified_since}"))'
+    )
+
+
+def _record_ids_formula(record_ids):
+    return "OR({})".format(
+        ", ".join(f"RECORD_ID() = '{record_id}'" for record_id in record_ids)
+    )
+
+
+RECORD_ID_ALPHABET = (
+    "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+)
+"""Characters of the random part of airtable record ids"""
+
+
+class Shard(NamedTuple):
+    """One of `count` disjoint slices of a table's records, by record id
+
+    Records are assigned by hashing the last two characters of their id,
+    which are random, both in airtable formulas and locally.
+    """
+
+    index: int
+    count: int
+
+    @property
+    def key(self):
+        return f"shard-{self.index}-of-{self.count}"
+
+    def contains(self, record_id):
+        # NOTE that this must match `formula`, where FIND is 1-based and
+        # returns 0 for characters that aren't found
+        high, low = (RECORD_ID_ALPHABET.find(c) + 1 for c in record_id[-2:])
+        value = high * len(RECORD_ID_ALPHABET) + low
+        return value % self.count == self.index
+
+    def formula(self):
+        """Returns an airtable formula matching the records of the shard"""
+        find = 'FIND({}, "' + RECORD_ID_ALPHABET + '")'
+        value = "{} * {} + {}".format(
+            find.format("MID(RECORD_ID(), LEN(RECORD_ID()) - 1, 1)"),
+            len(RECORD_ID_ALPHABET),
+            find.format("RIGHT(RECORD_ID(), 1)"),
+        )
+        return f"MOD({value}, {self.count}) = {self.index}"
+
+    @classmethod
+    def parse(cls, value):
+        """Parses a shard given as "<index>/<count>", e.g. "0/4" """
+        index, count = (int(part) for part in value.split("/"))
+        if not 0 <= index < count:
+            raise ValueError(f"Invalid shard: {value}")
+        return cls(index, count)
+
+
+class FatalCallbackError(Exception):
+    """Raised by poll callbacks for failures that retrying won't fix"""
+
+
+DEFAULT_FATAL_CALLBACK_EXCEPTIONS = (FatalCallbackError,)
+"""Exceptions that are never retried, unless a `RetryPolicy` opts in to more
+
+NOTE that broad builtins like `ValueError` aren't included, since transient
+failures raise them too (e.g. `json.JSONDecodeError` on a truncated response).
+"""
+
+
+class RetryPolicy:
+    """Decides whether and when a failed poll callback is attempted again
+
+    Callbacks are attempted up to `max_num_retries` times in total, with
+    jittered exponential backoff between attempts. Instances of
+    `fatal_exceptions` (by default `DEFAULT_FATAL_CALLBACK_EXCEPTIONS`) are
+    never retried.
+    """
+
+    def __init__(
+        self,
+        max_num_retries=DEFAULT_POLL_TABLE_MAX_NUM_RETRIES,
+        base_delay=CALLBACK_RETRY_BASE_DELAY,
+        max_delay=CALLBACK_RETRY_MAX_DELAY,
+        fatal_exceptions=DEFAULT_FATAL_CALLBACK_EXCEPTIONS,
+    ):
+        self.max_num_retries = max_num_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.fatal_exceptions = fatal_exceptions
+
+    def is_retryable(self, error):
+        return not isinstance(error, self.fatal_exceptions)
+
+    def get_delay(self, num_retries):
+        """Returns the delay before retrying after `num_retries` retries"""
+        return _get_backoff_delay(num_retries, self.base_delay, self.max_delay)
+
+
+class _PollAttempt(NamedTuple):
+    record: BaseModel
+    original_id: str
+    original_status: str
+    num_retries: int
+
+
+class _PollResult(NamedTuple):
+    success: bool
+    """Whether every callback succeeded"""
+    completed: bool
+    """Whether every record was taken, i.e. the time budget didn't run out"""
+    processed_ids: Set[str]
+    """Ids of the records taken, including skipped ones"""
+    claimed_elsewhere: bool
+    """Whether records were skipped since another poll claimed them"""
+
+
+def _run_inline(func, *args):
+    """Calls `func` right away, returns its outcome as a completed future"""
+    future = concurrent.futures.Future()
+    try:
+        future.set_result(func(*args))
+    except BaseException as e:
+        future.set_exception(e)
+    return future
+
+
+class _CallbackRunner:
+    """Runs a poll callback on records, retrying failures with backoff
+
+    Records are processed on up to `max_workers` threads, or on the calling
+    thread when `max_workers` is 1. Failed attempts are scheduled for a retry
+    according to the `RetryPolicy`, and other records are processed while
+    they wait. Retries that would start after `deadline` (a `clock` time) are
+    given up.
+
+    `on_done(attempt, error)` is called on the calling thread once a record
+    is done, with the last exception raised by the callback if it failed.
+    """
+
+    def __init__(
+        self,
+        callback,
+        on_done,
+        retry_policy,
+        max_workers=1,
+        deadline=None,
+        name="poll",
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.callback = callback
+        self.on_done = on_done
+        self.retry_policy = retry_policy
+        self.max_workers = max_workers
+        self.deadline = deadline
+
+        self._clock = clock
+        self._sleep = sleep
+        self._in_flight: Dict[concurrent.futures.Future, _PollAttempt] = {}
+        # Heap of `(due time, sequence number, attempt)`
+        self._retries: List[Tuple[float, int, _PollAttempt]] = []
+        self._retry_seq = itertools.count()
+
+        self._executor = None
+        self._submit = _run_inline
+        if max_workers > 1:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=name
+            )
+            self._submit = self._executor.submit
+
+    def submit(self, record):
+        """Processes a record, once a worker is free"""
+        self._wait_for_worker()
+        self._start(_PollAttempt(record, record.id, record.status, 0))
+
+    def join(self):
+        """Waits until every record, including retries, is done"""
+        while self._in_flight or self._retries:
+            self._start_due_retries()
+            if self._in_flight:
+                self._wait(timeout=self._get_time_until_next_retry())
+            elif self._retries:
+                self._sleep(self._get_time_until_next_retry())
+
+    def close(self):
+        """Stops processing, returns the attempts of unfinished records
+
+        Running callbacks are allowed to finish first.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+        unfinished = [
+            *self._in_flight.values(),
+            *(attempt for _, _, attempt in self._retries),
+        ]
+        self._in_flight.clear()
+        self._retries.clear()
+        return unfinished
+
+    def _start(self, attempt):
+        future = self._submit(self.callback, attempt.record)
+        self._in_flight[future] = attempt
+
+    def _wait_for_worker(self):
+        while True:
+            self._start_due_retries()
+            if len(self._in_flight) < self.max_workers:
+                return
+            self._wait(timeout=self._get_time_until_next_retry())
+
+    def _wait(self, timeout=None):
+        done, _ = concurrent.futures.wait(
+            self._in_flight,
+            timeout=timeout,
+            return_when=concurrent.futures.FIRST_COMPLETED,
+        )
+        for future in done:
+            self._complete(future)
+
+    def _get_time_until_next_retry(self):
+        if not self._retries:
+            return None
+        return max(0.0, self._retries[0][0] - self._clock())
+
+    def _start_due_retries(self):
+        now = self._clock()
+        while (
+            self._retries
+            and self._retries[0][0] <= now
+            and len(self._in_flight) < self.max_workers
+        ):
+            _, _, attempt = heapq.heappop(self._retries)
+            self._start(attempt)
+
+    def _complete(self, future):
+        attempt = self._in_flight.pop(future)
+        record = attempt.record
+        error = future.exception()
+
+        if record.id != attempt.original_id:
+            error = ValueError(
+                f"Callback modified the ID of the "
+                f"record: original={attempt.original_id}, new={record.id}"
+            )
+            self.on_done(attempt, error)
+            raise error
+
+        if error is None:
+            self.on_done(attempt, None)
+            return
+
+        logger.error(
+            f"Callback for record failed "
+            f"(num retries {attempt.num_retries}): {record.id}",
+            exc_info=error,
+        )
+
+        if not self.retry_policy.is_retryable(error):
+            logger.error(f"Callback for record failed fatally: {record.id}")
+            self.on_done(attempt, error)
+            return
+
+        if attempt.num_retries + 1 >= self.retry_policy.max_num_retries:
+            logger.error(f"Callback for record did not succeed: {record.id}")
+            self.on_done(attempt, error)
+            return
+
+        due = self._clock() + self.retry_policy.get_delay(attempt.num_retries)
+        if self.deadline is not None and due > self.deadline:
+            logger.error(
+                f"Callback for record did not succeed before the deadline: "
+                f"{record.id}"
+            )
+            self.on_done(attempt, error)
+            return
+
+        heapq.heappush(
+            self._retries,
+            (
+                due,
+                next(self._retry_seq),
+                attempt._replace(num_retries=attempt.num_retries + 1),
+            ),
+        )
+
+
+class _DeadLetters:
+    """The dead letters of a table, see `AirtableClient.poll_table`"""
+
+    def __init__(
+        self,
+        dead_letter_queue,
+        queue_name,
+        max_num_failures=DEFAULT_DEAD_LETTER_MAX_NUM_FAILURES,
+    ):
+        self.dead_letter_queue = dead_letter_queue
+        self.queue_name = queue_name
+        self.max_num_failures = max_num_failures
+
+    def entries(self):
+        return self.dead_letter_queue.entries(self.queue_name)
+
+    def get_due_record_ids(self):
+        """Returns the ids of records that should be retried by this poll"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return [
+            record_id
+            for record_id, entry in self.entries().items()
+            if entry["retryable"]
+            and entry["num_failures"] < self.max_num_failures
+            and datetime.datetime.fromisoformat(entry["next_attempt_at"])
+            <= now
+        ]
+
+    def filter_records(self, records):
+        """Drops (and removes the dead letters of) records whose status
+        changed since they failed, since polling picks up the new status
+        """
+        res = []
+        for record in records:
+            entry = self.dead_letter_queue.get(self.queue_name, record.id)
+            if entry is not None and entry["status"] != record.status:
+                logger.info(
+                    f"Dead letter status changed, dropping it: {record.id}"
+                )
+                self.remove(record.id)
+            else:
+                res.append(record)
+        return res
+
+    def remove(self, record_id):
+        self.dead_letter_queue.remove(self.queue_name, record_id)
+
+    def on_done(self, attempt, error, retry_policy):
+        """Adds a failed record, or removes a record that succeeded"""
+        record_id = attempt.record.id
+        entry = self.dead_letter_queue.get(self.queue_name, record_id)
+
+        if error is None:
+            if entry is not None:
+                logger.info(f"Dead letter succeeded: {record_id}")
+                self.remove(record_id)
+            return
+
+        num_failures = entry["num_failures"] + 1 if entry is not None else 1
+        now = datetime.datetime.now(datetime.timezone.utc)
+        next_attempt_at = now + datetime.timedelta(
+            seconds=_get_backoff_delay(
+                num_failures - 1,
+                DEAD_LETTER_RETRY_BASE_DELAY,
+                DEAD_LETTER_RETRY_MAX_DELAY,
+            )
+        )
+
+        logger.error(
+            f"Adding record to dead letters (num failures {num_failures}): "
+            f"{record_id}"
+        )
+        self.dead_letter_queue.put(
+            self.queue_name,
+            record_id,
+            {
+                "status": attempt.original_status,
+                "num_failures": num_failures,
+                "retryable": retry_policy.is_retryable(error),
+                "error": repr(error),
+                "failed_at": now.isoformat(),
+                "next_attempt_at": next_attempt_at.isoformat(),
+            },
+        )
+
+
 class IncompatibleModelStateError(Exception):
     """Thrown when client operation is not compatible with model state"""
 
 
+class MissingRecordsError(Exception):
+    """Thrown when records looked up by id do not exist"""
+
+    def __init__(self, missing_ids, records):
+        super().__init__(
+            "Records not found: {}".format(", ".join(missing_ids))
+        )
+        self.missing_ids = missing_ids
+        """Ids of the missing records, in lookup order"""
+        self.records = records
+        """Records that were found, in lookup order"""
+
+
 class AirtableClient:
     def __init__(
         self,
@@ -342,34 +1535,185 @@ class AirtableClient:
         read_only,
         secrets_client=None,
         settings=None,
+        page_size=DEFAULT_PAGE_SIZE,
     ):
         if secrets_client is None:
             secrets_client = SecretsClient()
         if settings is None:
-            settings = AirtableSettings()
+            settings = get_settings(AirtableSettings)
         secrets = AirtableSecrets.load(secrets_client)
         self.read_only = read_only
-        self.client = Airtable(
-            settings.base_id, airtable_name, secrets.api_key.get_secret_value()
+        self.rate_limiter = get_rate_limiter(settings.base_id)
+        self.client = AirtableTransport(
+            settings.base_id,
+            airtable_name,
+            secrets.api_key.get_secret_value(),
+            rate_limiter=self.rate_limiter,
+            page_size=page_size,
         )
+        self.base_id = settings.base_id
         self.table_spec = table_spec
 
-    def get(self, record_id):
-        raw = self.client.get(record_id)
+    def _load(self, raw, read_only_records=False):
+        if read_only_records:
+            return self.table_spec.model_cls.from_airtable_read_only(**raw)
         return self.table_spec.model_cls.from_airtable(**raw)
 
-    def paginate_all(self, formula=None):
-        for page in self.client.get_iter(formula=formula):
-            page = [
-                self.table_spec.model_cls.from_airtable(**raw) for raw in page
-            ]
-            yield page
+    def get(self, record_id, read_only_records=False):
+        """Fetches a record, see `get_all` for `read_only_records`"""
+        return self._load(self.client.get(record_id), read_only_records)
+
+    def get_many(self, record_ids, read_only_records=False):
+        """Fetches records by id, in chunks of `GET_MANY_CHUNK_SIZE`
+
+        Ids are de-duplicated, and records are returned in the order their
+        ids first appear. Raises `MissingRecordsError` if any record doesn't
+        exist. See `get_all` for `read_only_records`.
+        """
+        record_ids = list(dict.fromkeys(record_ids))
+
+        raw_by_id = {}
+        for chunk in _chunked(record_ids, GET_MANY_CHUNK_SIZE):
+            for page in self.paginate_raw(
+                formula=_record_ids_formula(chunk), page_size=len(chunk)
+            ):
+                for raw in page.records:
+                    raw_by_id[raw["id"]] = raw
+
+        records = [
+            self._load(raw_by_id[record_id], read_only_records)
+            for record_id in record_ids
+            if record_id in raw_by_id
+        ]
+
+        if len(records) != len(record_ids):
+            raise MissingRecordsError(
+                [
+                    record_id
+                    for record_id in record_ids
+                    if record_id not in raw_by_id
+                ],
+                records,
+            )
+
+        return records
 
-    def get_all(self, formula=None):
-        for page in self.paginate_all(formula=formula):
+    def paginate_raw(
+        self,
+        formula=None,
+        fields=None,
+        page_size=None,
+        max_records=None,
+        offset=None,
+    ):
+        """Iterates over pages (`AirtablePage`) of raw records
+
+        Only the fields declared by the table's model are fetched, unless a
+        list of field names is provided in `fields`. Pass `ALL_FIELDS` to
+        fetch every field.
+
+        Iteration resumes from `offset` when provided, or restarts from the
+        first page if airtable no longer accepts it.
+        """
+        if fields is None:
+            fields = self.table_spec.model_cls.get_airtable_field_names()
+        elif fields is ALL_FIELDS:
+            fields = None
+
+        options = dict(
+            formula=formula,
+            fields=fields,
+            page_size=page_size,
+            max_records=max_records,
+        )
+        if offset is None:
+            return self.client.iter_pages(**options)
+        return self._resume_pages(offset, options)
+
+    def _resume_pages(self, offset, options):
+        pages = self.client.iter_pages(offset=offset, **options)
+        try:
+            first_page = next(pages)
+        except StopIteration:
+            return
+        except requests.exceptions.HTTPError as e:
+            # NOTE that airtable expires offsets after a while
+            if e.response is None or e.response.status_code != 422:
+                raise
+            logger.warning(
+                f"Offset {offset} not available, restarting from first page"
+            )
+            yield from self.client.iter_pages(**options)
+            return
+
+        yield first_page
+        yield from pages
+
+    def paginate_all(
+        self,
+        formula=None,
+        fields=None,
+        page_size=None,
+        read_only_records=False,
+        prefetch=0,
+        offset=None,
+    ):
+        """Iterates over pages (`ModelPage`) of records, see `get_all`
+
+        When `prefetch` is set, up to that many pages are fetched (and
+        loaded) ahead on a background thread while the caller processes the
+        current page. Close the iterator to stop prefetching early. See
+        `paginate_raw` for `offset`.
+        """
+        pages = (
+            ModelPage(
+                [self._load(raw, read_only_records) for raw in page.records],
+                offset=page.offset,
+                next_offset=page.next_offset,
+            )
+            for page in self.paginate_raw(
+                formula=formula,
+                fields=fields,
+                page_size=page_size,
+                offset=offset,
+            )
+        )
+        if prefetch:
+            pages = _prefetch(pages, prefetch)
+
+        yield from pages
+
+    def get_all(
+        self,
+        formula=None,
+        fields=None,
+        page_size=None,
+        read_only_records=False,
+    ):
+        """Iterates over records, see `paginate_raw` for `fields`
+
+        When `read_only_records` is set, records are loaded as immutable
+        `ReadOnlyRecord`s, which are cheaper to load and keep around than
+        models but can't be updated. Use it for scans that never write back.
+        """
+        for page in self.paginate_all(
+            formula=formula,
+            fields=fields,
+            page_size=page_size,
+            read_only_records=read_only_records,
+        ):
             yield from page
 
-    def paginate_all_with_new_status(self):
+    def paginate_all_with_new_status(
+        self, modified_since=None, prefetch=0, offset=None, shard=None
+    ):
+        """Iterates over pages of records whose status hasn't been seen
+
+        When `modified_since` (an ISO 8601 timestamp) is provided, only
+        records modified after it are considered. When a `shard` (`Shard`) is
+        provided, only records of that shard are considered. See
+        `paginate_all` for `prefetch` and `offset`.
+        """
         # TODO : sort by creation time asc
 
         # NOTE here is a formula for querying on a blank status
@@ -381,111 +1725,768 @@ class AirtableClient:
         # # If not blank...
         # "{{Status}} != {{_meta_last_seen_status}}"
         # ")"
-        return self.paginate_all(
-            formula=(
-                "AND({Status} != BLANK(), "
-                "{Status} != {_meta_last_seen_status})"
+        formula = (
+            "AND({Status} != BLANK(), {Status} != {_meta_last_seen_status})"
+        )
+        if modified_since is not None:
+            formula = "AND({}, {})".format(
+                formula, _modified_since_formula(modified_since)
             )
+        if shard is not None:
+            formula = "AND({}, {})".format(formula, shard.formula())
+
+        return self.paginate_all(
+            formula=formula, prefetch=prefetch, offset=offset
         )
 
-    def get_all_with_new_status(self):
-        for page in self.paginate_all_with_new_status():
+    def get_all_with_new_status(
+        self,
+        modified_since=None,
+        prefetch=0,
+        offset=None,
+        on_page=None,
+        shard=None,
+    ):
+        """Iterates over records whose status hasn't been seen
+
+        `on_page` is called with the offset of each page (`None` for the
+        first page) before its records are yielded.
+        """
+        for page in self.paginate_all_with_new_status(
+            modified_since=modified_since,
+            prefetch=prefetch,
+            offset=offset,
+            shard=shard,
+        ):
+            if on_page is not None:
+                on_page(page.offset)
             yield from page
 
+    def has_modified_since(self, modified_since):
+        """Checks whether any record was modified after a timestamp
+
+        Cheap compared to a full scan, fetches at most a single record.
+        """
+        pages = self.paginate_raw(
+            formula=_modified_since_formula(modified_since),
+            fields=["Status"],
+            page_size=1,
+            max_records=1,
+        )
+        return len(next(pages).records) != 0
+
     def insert(self, model):
+        self.insert_many([model])
+
+    def insert_many(self, models: Iterable[BaseModel]):
+        """Inserts models in batches of `AIRTABLE_BATCH_SIZE`
+
+        All models must be in the 'NEW' state. On success each model is
+        assigned its `id` and `created_at`, and is snapshotted.
+        """
+        models = list(models)
+
         if self.read_only:
-            logger.info(f"Not inserting {model.id} in read-only mode")
+            logger.info(
+                f"Not inserting {len(models)} model(s) in read-only mode"
+            )
             return
 
-        if model.state != BaseModelState.NEW:
-            raise IncompatibleModelStateError(
-                f"Cannot insert model in '{model.state}' state, must be "
-                "in 'NEW' state"
-            )
+        for model in models:
+            if model.state != BaseModelState.NEW:
+                raise IncompatibleModelStateError(
+                    f"Cannot insert model in '{model.state}' state, must be "
+                    "in 'NEW' state"
+                )
 
-        res = self.client.insert(
-            model.to_airtable()["fields"],
-        )
+        for chunk in _chunked(models, AIRTABLE_BATCH_SIZE):
+            res = self.client.batch_insert(
+                [model.to_airtable()["fields"] for model in chunk]
+            )
 
-        model.id = res["id"]
-        model.created_at = res["createdTime"]
+            # NOTE that airtable returns created records in request order
+            for model, raw in zip(chunk, res):
+                model.id = raw["id"]
+                model.created_at = raw["createdTime"]
 
-        # Airtable record has been created, take a new snapshot
-        model.snapshot()
-        model.state = BaseModelState.CLEAN
+                # Airtable record has been created, take a new snapshot
+                model.snapshot()
+                model.state = BaseModelState.CLEAN
 
     def update(self, model):
+        self.update_many([model])
+
+    def update_many(self, models: Iterable[BaseModel]):
+        """Updates dirty models in batches of `AIRTABLE_BATCH_SIZE`
+
+        Models in the 'CLEAN' state are skipped, only modified fields are sent
+        for the rest. On success each updated model is snapshotted.
+        """
+        models = list(models)
+
         if self.read_only:
-            logger.info(f"Not updating model '{model.id}' in read-only mode")
+            logger.info(
+                "Not updating model(s) in read-only mode: "
+                + ", ".join(str(model.id) for model in models)
+            )
             return
 
-        if model.state == BaseModelState.NEW:
-            raise IncompatibleModelStateError(
-                "Cannot update a model in 'NEW' state"
+        dirty_models: List[BaseModel] = []
+        for model in models:
+            # Catch fields that were modified in place (e.g. appending to a
+            # list), which assignment tracking can't see
+            model._update_modified_fields()
+
+            if model.state == BaseModelState.NEW:
+                raise IncompatibleModelStateError(
+                    "Cannot update a model in 'NEW' state"
+                )
+            elif model.state == BaseModelState.CLEAN:
+                logger.debug(
+                    f"Model '{model.id}' in 'CLEAN' state, skipping update."
+                )
+            elif model.state == BaseModelState.DIRTY:
+                dirty_models.append(model)
+            else:
+                raise RuntimeError(f"Unknown model state: {model.state}")
+
+        for chunk in _chunked(dirty_models, AIRTABLE_BATCH_SIZE):
+            self.client.batch_update(
+                [model.to_airtable(modified_only=True) for model in chunk]
             )
-        elif model.state == BaseModelState.CLEAN:
-            logger.debug("Provided model in 'CLEAN' state, skipping update.")
-            return
-        elif model.state == BaseModelState.DIRTY:
-            pass
-        else:
-            raise RuntimeError(f"Unknown model state: {model.state}")
 
-        self.client.update(
-            model.id,
-            model.to_airtable(modified_only=True)["fields"],
+            for model in chunk:
+                # Airtable record has been updated, take a new snapshot
+                model.snapshot()
+                model.state = BaseModelState.CLEAN
+
+    def _get_poll_key(self, kind, shard=None):
+        """Returns the key of a table's polling state, e.g. its watermark"""
+        key = f"{kind}/{self.base_id}/{self.table_spec.name}"
+        if shard is not None:
+            key = f"{key}/{shard.key}"
+        return key
+
+    def _get_dead_letters(self, dead_letter_queue):
+        if dead_letter_queue is None:
+            return None
+        return _DeadLetters(
+            dead_letter_queue, f"{self.base_id}/{self.table_spec.name}"
+        )
+
+    def _get_dead_letter_records(self, dead_letters, record_ids):
+        """Fetches the records of dead letters, dropping stale dead letters"""
+        try:
+            records = self.get_many(record_ids)
+        except MissingRecordsError as e:
+            logger.warning(
+                "Dropping dead letters of missing records: "
+                + ", ".join(e.missing_ids)
+            )
+            for record_id in e.missing_ids:
+                dead_letters.remove(record_id)
+            records = e.records
+
+        return dead_letters.filter_records(records)
+
+    def _process_records(
+        self,
+        callback,
+        records,
+        max_num_retries=DEFAULT_POLL_TABLE_MAX_NUM_RETRIES,
+        session=None,
+        max_workers=1,
+        retry_policy=None,
+        time_budget=None,
+        dead_letters=None,
+        skip_ids=(),
+        should_continue=None,
+        claim_record=None,
+        release_record=None,
+    ):
+        """Calls `callback` on records and writes back their seen status
+
+        Records in `skip_ids` are skipped, as are records for which
+        `claim_record` returns false. Claimed records are passed to
+        `release_record` once their seen status is written back. No new
+        records are taken once `should_continue` returns false. See
+        `poll_table` for the other options. Returns a `_PollResult`.
+        """
+        success = True
+        completed = True
+        claimed_elsewhere = False
+        deadline = (
+            time.monotonic() + time_budget if time_budget is not None else None
+        )
+        retry_policy = retry_policy or RetryPolicy(
+            max_num_retries=max_num_retries
+        )
+
+        # Records that have been processed but not yet written back, flushed
+        # in batches via `update_many`
+        pending = []
+        pending_since = None
+        # Whether no more records are taken, only waited for
+        draining = False
+
+        def flush():
+            nonlocal pending
+            if not pending:
+                return
+            records, pending = pending, []
+            self.update_many(records)
+            if release_record is not None:
+                for record in records:
+                    release_record(record)
+
+        def flush_if_due():
+            if (
+                draining
+                or len(pending) >= AIRTABLE_BATCH_SIZE
+                or (
+                    pending
+                    and time.monotonic() - pending_since
+                    >= WRITE_BACK_MAX_DELAY
+                )
+            ):
+                flush()
+
+        def on_done(attempt, error):
+            nonlocal pending_since, success
+
+            if error is not None:
+                success = False
+
+            # NOTE that read-only polls don't record seen statuses, so failed
+            # records are scanned again anyway
+            if dead_letters is not None and not self.read_only:
+                dead_letters.on_done(attempt, error, retry_policy)
+
+            attempt.record.meta_last_seen_status = attempt.original_status
+            if not pending:
+                pending_since = time.monotonic()
+            pending.append(attempt.record)
+            flush_if_due()
+
+        runner = _CallbackRunner(
+            callback,
+            on_done,
+            retry_policy,
+            max_workers=max_workers,
+            deadline=deadline,
+            name=f"poll-{self.table_spec.name}",
         )
 
-        # Airtable record has been updated, take a new snapshot
-        model.snapshot()
-        model.state = BaseModelState.CLEAN
+        # Dead letters may also be picked up by the scan
+        seen_ids = set(skip_ids)
+
+        try:
+            for record in records:
+                flush_if_due()
+
+                if record.id in seen_ids:
+                    continue
+
+                # NOTE that the record that crossed the deadline isn't taken,
+                # so it is picked up again by the next poll
+                if deadline is not None and time.monotonic() >= deadline:
+                    logger.info(
+                        f"Time budget of {time_budget}s exhausted, not taking "
+                        "new records"
+                    )
+                    completed = False
+                    break
+                if should_continue is not None and not should_continue():
+                    logger.warning("Lost the poll lease, not taking records")
+                    completed = False
+                    break
+
+                seen_ids.add(record.id)
+
+                if session is not None:
+                    record = session.add(self, record)
+
+                logger.info(
+                    f"Processing '{self.table_spec.name}' record: {record}"
+                )
+
+                if record.status is None:
+                    logger.error(f"Record {record.id}'s status is None!")
+                    success = False
+                    continue
+
+                # NOTE that records claimed by another poll aren't marked as
+                # seen, in case that poll fails before processing them
+                if claim_record is not None and not claim_record(record):
+                    logger.info(
+                        f"Record {record.id} is processed by another poll, "
+                        "skipping"
+                    )
+                    claimed_elsewhere = True
+                    continue
+
+                runner.submit(record)
+
+            # NOTE that records are written back as soon as they're done while
+            # waiting on the rest, in case the time budget or lease runs out
+            # meanwhile
+            draining = True
+            flush()
+            runner.join()
+        finally:
+            # Stop prefetching if we bailed out early
+            _close_iterator(records)
+
+            # NOTE that records we bailed out on are still marked as seen
+            for attempt in runner.close():
+                attempt.record.meta_last_seen_status = attempt.original_status
+                pending.append(attempt.record)
+
+            # Update the records in airtable to reflect local modifications
+            flush()
+
+        return _PollResult(success, completed, seen_ids, claimed_elsewhere)
 
     # TODO : handle missing statuses (e.g. airtable field was updated)
     def poll_table(
-        self, callback, max_num_retries=DEFAULT_POLL_TABLE_MAX_NUM_RETRIES
+        self,
+        callback,
+        max_num_retries=DEFAULT_POLL_TABLE_MAX_NUM_RETRIES,
+        watermark_store=None,
+        session=None,
+        max_workers=1,
+        retry_policy=None,
+        time_budget=None,
+        dead_letter_queue=None,
+        checkpoint_store=None,
+        lease_manager=None,
+        record_leases=False,
+        shard=None,
     ):
+        """Calls `callback` on every record with a new status
+
+        Callbacks run one at a time, unless `max_workers` is greater than 1,
+        in which case up to `max_workers` records are processed concurrently
+        on a thread pool. Callbacks must then be thread-safe. Either way, each
+        record's seen status is updated once its own callback is done.
+
+        Failed callbacks are retried according to `retry_policy` (by default
+        up to `max_num_retries` attempts), with backoff between attempts
+        while other records are processed.
+
+        Records are processed at least once: seen statuses are written back
+        in batches of `AIRTABLE_BATCH_SIZE`, within `WRITE_BACK_MAX_DELAY`
+        seconds of the callback, and right away once no more records are
+        taken (e.g. the time budget ran out). If the process is killed in
+        between, records whose callbacks already ran are processed again by
+        the next poll.
+
+        When a `time_budget` (in seconds) is provided, no new records are
+        taken once it runs out, and retries that wouldn't start within it are
+        given up. Pending callbacks are waited for and seen statuses written
+        back before returning. If a `checkpoint_store`
+        (`automation.stores.KeyValueStore`) is also provided, the page reached
+        and the records processed are saved to it, and the next poll resumes
+        from there instead of scanning from the start.
+
+        When a `dead_letter_queue` (`automation.stores.DeadLetterQueue`) is
+        provided, records that still fail are added to it. Later polls retry
+        them first, with backoff between polls, without scanning for them. See
+        `replay_dead_letters` to retry them manually.
+
+        When a `watermark_store` (`automation.stores.KeyValueStore`) is
+        provided, polling is incremental: only records modified since the
+        last completed poll are scanned, and the scan is skipped entirely when
+        no record has been modified.
+
+        When a `session` (`AirtableSession`) is provided, polled records are
+        added to it, so callbacks looking them up through the session get the
+        same instances.
+
+        When a `lease_manager` (`automation.stores.LeaseManager`) is provided,
+        overlapping polls of the table don't process the same records. By
+        default, the poll takes a lease on the table, and is skipped if
+        another poll holds it. With `record_leases`, polls instead take a
+        lease on each record's status before processing it, so overlapping
+        polls split the records between them. Record leases are released once
+        the record's seen status is written back, and pruned once expired.
+
+        When a `shard` (`Shard`) is provided, only the records of that shard
+        are polled, so that polls of different shards can run side by side.
+        Each shard has its own watermark, checkpoint and lease.
+        """
         logger.info("Polling table: {}".format(self.table_spec.name))
 
-        success = True
+        options = dict(
+            max_num_retries=max_num_retries,
+            watermark_store=watermark_store,
+            session=session,
+            max_workers=max_workers,
+            retry_policy=retry_policy,
+            time_budget=time_budget,
+            dead_letter_queue=dead_letter_queue,
+            checkpoint_store=checkpoint_store,
+            shard=shard,
+        )
+        if lease_manager is None:
+            return self._poll(callback, **options)
+
+        lease_name = self._get_poll_key("poll", shard)
+        if record_leases:
+            # Record leases of past polls are only kept until they expire
+            lease_manager.prune(f"{lease_name}/")
+
+            record_leases_by_id = {}
+
+            def claim_record(record):
+                record_lease = lease_manager.acquire(
+                    f"{lease_name}/{record.id}/{record.status}",
+                    RECORD_LEASE_TTL,
+                )
+                if record_lease is None:
+                    return False
+                record_leases_by_id[record.id] = record_lease
+                return True
+
+            def release_record(record):
+                record_lease = record_leases_by_id.pop(record.id, None)
+                if record_lease is not None:
+                    lease_manager.release(record_lease)
+
+            return self._poll(
+                callback,
+                claim_record=claim_record,
+                release_record=release_record,
+                **options,
+            )
 
-        for record in self.get_all_with_new_status():
+        lease = lease_manager.acquire(lease_name, POLL_LEASE_TTL)
+        if lease is None:
             logger.info(
-                f"Processing '{self.table_spec.name}' record: {record}"
+                f"Table {self.table_spec.name} is polled by another poll, "
+                "skipping"
             )
+            return True
+
+        # NOTE that the lease's fencing token is checked (and the lease
+        # renewed) before taking each record, so a poll that lost its lease
+        # stops rather than racing the poll that took it over
+        current_lease = lease
+
+        def should_continue():
+            nonlocal current_lease
+            if current_lease is not None:
+                current_lease = lease_manager.keep(
+                    current_lease, POLL_LEASE_TTL
+                )
+            return current_lease is not None
 
-            if record.status is None:
-                logger.error(f"Record {record.id}'s status is None!")
-                success = False
-                continue
+        try:
+            return self._poll(
+                callback, should_continue=should_continue, **options
+            )
+        finally:
+            lease_manager.release(lease)
 
-            try:
-                original_id = record.id
-                original_status = record.status
-
-                for num_retries in range(max_num_retries):
-                    try:
-                        callback(record)
-                        break
-                    except Exception:
-                        logger.exception(
-                            f"Callback for record failed "
-                            f"(num retries {num_retries}): {record.id}"
-                        )
-                else:
-                    logger.error(
-                        f"Callback for record did not succeed: {record.id}"
-                    )
-                    success = False
+    def _poll(
+        self,
+        callback,
+        max_num_retries,
+        watermark_store,
+        session,
+        max_workers,
+        retry_policy,
+        time_budget,
+        dead_letter_queue,
+        checkpoint_store,
+        shard,
+        should_continue=None,
+        claim_record=None,
+        release_record=None,
+    ):
 
-                if original_id != record.id:
-                    raise ValueError(
-                        f"Callback modified the ID of the "
-                        f"record: original={original_id}, new={record.id}"
-                    )
-            finally:
-                record.meta_last_seen_status = original_status
+        dead_letters = None
+        dead_letter_ids = []
+        if not self.read_only:
+            dead_letters = self._get_dead_letters(dead_letter_queue)
+        if dead_letters is not None:
+            dead_letter_ids = [
+                record_id
+                for record_id in dead_letters.get_due_record_ids()
+                if shard is None or shard.contains(record_id)
+            ]
 
-                # Update the record in airtable to reflect local modifications
-                self.update(record)
+        # NOTE that read-only polls don't record seen statuses, so they never
+        # checkpoint either
+        checkpoint = None
+        checkpoint_key = self._get_poll_key("checkpoint", shard)
+        if self.read_only:
+            checkpoint_store = None
+        if checkpoint_store is not None:
+            checkpoint = checkpoint_store.get(checkpoint_key)
+
+        watermark = None
+        next_watermark = None
+        watermark_key = self._get_poll_key("watermark", shard)
+        skip_scan = False
+        if checkpoint is not None:
+            # Resume the interrupted scan, with the same formula
+            logger.info(
+                f"Resuming poll from checkpoint, skipping "
+                f"{len(checkpoint['processed_ids'])} processed record(s)"
+            )
+            watermark = checkpoint["modified_since"]
+            next_watermark = checkpoint["next_watermark"]
+        elif watermark_store is not None:
+            # NOTE that records modified while we scan are picked up by the
+            # next poll, since the new watermark is the start of this scan
+            next_watermark = (
+                datetime.datetime.now(datetime.timezone.utc)
+                - WATERMARK_SAFETY_MARGIN
+            ).isoformat()
+
+            watermark = watermark_store.get(watermark_key)
+            if watermark is not None and not self.has_modified_since(
+                watermark
+            ):
+                logger.info(
+                    f"No records modified since {watermark}, skipping scan"
+                )
+                skip_scan = True
 
-        return success
+        if skip_scan and not dead_letter_ids:
+            return True
+
+        records = []
+        if dead_letter_ids:
+            logger.info(f"Retrying {len(dead_letter_ids)} dead letter(s)")
+            records = self._get_dead_letter_records(
+                dead_letters, dead_letter_ids
+            )
+
+        # Offset of the page being processed, `None` for the first page
+        offset = checkpoint["offset"] if checkpoint is not None else None
+
+        def on_page(page_offset):
+            nonlocal offset
+            offset = page_offset
+
+        if not skip_scan:
+            # NOTE that the next page is fetched while callbacks run on this
+            # one
+            scanned = self.get_all_with_new_status(
+                modified_since=watermark,
+                prefetch=DEFAULT_POLL_TABLE_PREFETCH_PAGES,
+                offset=offset,
+                on_page=on_page,
+                shard=shard,
+            )
+            records = _chain_closing(records, scanned)
+
+        result = self._process_records(
+            callback,
+            records,
+            max_num_retries=max_num_retries,
+            session=session,
+            max_workers=max_workers,
+            retry_policy=retry_policy,
+            time_budget=time_budget,
+            dead_letters=dead_letters,
+            skip_ids=checkpoint["processed_ids"] if checkpoint else (),
+            should_continue=should_continue,
+            claim_record=claim_record,
+            release_record=release_record,
+        )
+
+        if not result.completed:
+            if checkpoint_store is not None and not skip_scan:
+                checkpoint_store.set(
+                    checkpoint_key,
+                    {
+                        "offset": offset,
+                        "processed_ids": sorted(result.processed_ids),
+                        "modified_since": watermark,
+                        "next_watermark": next_watermark,
+                    },
+                )
+            return result.success
+
+        if checkpoint is not None:
+            checkpoint_store.delete(checkpoint_key)
+
+        # NOTE that read-only polls don't record seen statuses, so the same
+        # records must be scanned again next time. Neither do records claimed
+        # by another poll, in case that poll fails before processing them
+        if (
+            watermark_store is not None
+            and next_watermark is not None
+            and not self.read_only
+            and not result.claimed_elsewhere
+        ):
+            watermark_store.set(watermark_key, next_watermark)
+
+        return result.success
+
+    def list_dead_letters(self, dead_letter_queue):
+        """Returns the dead letters of the table, by record id"""
+        return self._get_dead_letters(dead_letter_queue).entries()
+
+    def replay_dead_letters(
+        self, callback, dead_letter_queue, record_ids=None, **options
+    ):
+        """Calls `callback` on dead letters right away, even those that
+        aren't due or retryable
+
+        Replays every dead letter of the table, unless `record_ids` is
+        provided. See `poll_table` for the other options.
+        """
+        dead_letters = self._get_dead_letters(dead_letter_queue)
+        if record_ids is None:
+            record_ids = list(dead_letters.entries())
+        if not record_ids:
+            return True
+
+        logger.info(f"Replaying {len(record_ids)} dead letter(s)")
+        return self._process_records(
+            callback,
+            self._get_dead_letter_records(dead_letters, record_ids),
+            dead_letters=dead_letters,
+            **options,
+        ).success
+
+
+###########
+# SESSION #
+###########
+
+
+class AirtableSession:
+    """A unit of work over the models of one or more tables
+
+    Holds an identity map of the models loaded through the session, keyed by
+    table name and record id: looking up a record again returns the same
+    instance, without a request. `commit` writes every modified model back,
+    in batches per table, and inserts models added in the 'NEW' state.
+
+    Example:
+
+        with AirtableSession() as session:
+            member = session.get(member_table, record_id)
+            member.status = "Processed"
+        # Modified models are committed on exit, unless an exception was raised
+    """
+
+    def __init__(self):
+        self._identity_map: Dict[Tuple[str, str], BaseModel] = {}
+        self._new_models: List[Tuple[AirtableClient, BaseModel]] = []
+        self._clients: Dict[str, AirtableClient] = {}
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+    def _register(self, client, model):
+        # NOTE that the first instance loaded wins, later loads of the same
+        # record (with possibly more recent remote data) are discarded so
+        # local modifications are never lost
+        key = (client.table_spec.name, model.id)
+        self._clients.setdefault(client.table_spec.name, client)
+        return self._identity_map.setdefault(key, model)
+
+    def add(self, client, model):
+        """Tracks a model, returns the session's instance of its record
+
+        Models in the 'NEW' state are inserted on commit.
+        """
+        with self._lock:
+            if model.state == BaseModelState.NEW:
+                self._new_models.append((client, model))
+                return model
+
+            return self._register(client, model)
+
+    def get(self, client, record_id):
+        """Fetches a record, unless the session already holds it"""
+        return self.get_many(client, [record_id])[0]
+
+    def get_many(self, client, record_ids):
+        """Fetches records like `AirtableClient.get_many`, reusing the ones
+        the session already holds
+        """
+        record_ids = list(dict.fromkeys(record_ids))
+        table_name = client.table_spec.name
+
+        with self._lock:
+            missing_ids = [
+                record_id
+                for record_id in record_ids
+                if (table_name, record_id) not in self._identity_map
+            ]
+
+        error = None
+        if missing_ids:
+            try:
+                fetched = client.get_many(missing_ids)
+            except MissingRecordsError as e:
+                error = e
+                fetched = e.records
+
+            with self._lock:
+                for model in fetched:
+                    self._register(client, model)
+
+        with self._lock:
+            records = [
+                self._identity_map[(table_name, record_id)]
+                for record_id in record_ids
+                if (table_name, record_id) in self._identity_map
+            ]
+
+        if error is not None:
+            raise MissingRecordsError(error.missing_ids, records)
+
+        return records
+
+    def get_all(self, client, **options):
+        """Iterates over records like `AirtableClient.get_all`, yielding the
+        session's instance of records it already holds
+        """
+        for model in client.get_all(**options):
+            with self._lock:
+                yield self._register(client, model)
+
+    def commit(self):
+        """Inserts new models and updates modified ones, in batches"""
+        with self._lock:
+            new_models = self._new_models
+            self._new_models = []
+            models_by_table = defaultdict(list)
+            for (table_name, _), model in self._identity_map.items():
+                models_by_table[table_name].append(model)
+
+        new_models_by_client = defaultdict(list)
+        for client, model in new_models:
+            new_models_by_client[client].append(model)
+        for client, models in new_models_by_client.items():
+            client.insert_many(models)
+            with self._lock:
+                for model in models:
+                    if model.state != BaseModelState.NEW:
+                        self._register(client, model)
+
+        for table_name, models in models_by_table.items():
+            for model in models:
+                # Catch fields that were modified in place
+                model._update_modified_fields()
+
+            dirty_models = [
+                model
+                for model in models
+                if model.state == BaseModelState.DIRTY
+            ]
+            if dirty_models:
+                self._clients[table_name].update_many(dirty_models)
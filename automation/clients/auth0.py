@@ -1,9 +1,11 @@
+import threading
+
 from pydantic import BaseSettings, SecretStr, constr
 import requests
 import tenacity
 
 from ..secrets import BaseSecret, SecretsClient
-from ..settings import BaseConfig
+from ..settings import BaseConfig, get_settings
 
 ##########
 # CLIENT #
@@ -37,17 +39,21 @@ class Auth0Client:
         if secrets_client is None:
             secrets_client = SecretsClient()
         if settings is None:
-            settings = Auth0Settings()
+            settings = get_settings(Auth0Settings)
         self._base_url = "https://" + settings.domain
         self._api_url = self._base_url + "/api/v2"
         self._secrets_client = secrets_client
         self._secret_obj = None
+        # NOTE that clients are shared by concurrent callbacks, which may
+        # all try to refresh an expired token at once
+        self._lock = threading.RLock()
 
     @property
     def _secret(self):
-        if self._secret_obj is None:
-            self._secret_obj = Auth0Secrets.load(self._secrets_client)
-        return self._secret_obj
+        with self._lock:
+            if self._secret_obj is None:
+                self._secret_obj = Auth0Secrets.load(self._secrets_client)
+            return self._secret_obj
 
     @property
     def _client_id(self):
@@ -66,27 +72,35 @@ class Auth0Client:
         self._secret.api_token._secret_value = new_token
         self._secret.save()
 
-    def _refresh_token(self):
-        res = requests.post(
-            self._base_url + "/oauth/token",
-            json={
-                "client_id": self._client_id,
-                "client_secret": self._client_secret,
-                "audience": self._api_url + "/",
-                "grant_type": "client_credentials",
-            },
-        )
-        res.raise_for_status()
-        self._token = res.json()["access_token"]
+    def _refresh_token(self, expired_token=None):
+        """Refreshes the token, unless another thread already replaced
+        `expired_token`
+        """
+        with self._lock:
+            if expired_token is not None and self._token != expired_token:
+                return
+
+            res = requests.post(
+                self._base_url + "/oauth/token",
+                json={
+                    "client_id": self._client_id,
+                    "client_secret": self._client_secret,
+                    "audience": self._api_url + "/",
+                    "grant_type": "client_credentials",
+                },
+            )
+            res.raise_for_status()
+            self._token = res.json()["access_token"]
 
     @tenacity.retry(
         retry=tenacity.retry_if_exception(is_unauthorized),
         stop=tenacity.stop_after_attempt(1),
     )
     def api_call(self, method, path, json):
+        token = self._token
         try:
             headers = {
-                "Authorization": "Bearer %s" % self._token,
+                "Authorization": "Bearer %s" % token,
             }
             res = requests.request(
                 method, self._api_url + path, headers=headers, json=json
@@ -95,7 +109,7 @@ class Auth0Client:
             return res.json()
         except requests.exceptions.HTTPError as e:
             if is_unauthorized(e):
-                self._refresh_token()
+                self._refresh_token(token)
             raise e
 
     # TODO : support creating users with phone numbers
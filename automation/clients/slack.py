@@ -7,7 +7,7 @@ import slack_sdk
 import structlog
 
 from ..secrets import BaseSecret, SecretsClient
-from ..settings import BaseConfig
+from ..settings import BaseConfig, get_settings
 
 log = structlog.get_logger("slack_api")
 
@@ -109,7 +109,7 @@ class SlackClient:
         if secrets_client is None:
             secrets_client = SecretsClient()
         if settings is None:
-            settings = SlackSettings()
+            settings = get_settings(SlackSettings)
         secrets = SlackSecrets.load(secrets_client)
         self._slack_sdk_client = slack_sdk.WebClient(
             token=secrets.api_key.get_secret_value()
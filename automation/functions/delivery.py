@@ -1,3 +1,6 @@
+from array import array
+
+from automation.clients.airtable import FatalCallbackError, MissingRecordsError
 from automation.clients.sendgrid import SendgridClient
 from pydantic import BaseSettings, EmailStr
 
@@ -7,11 +10,16 @@ from sendgrid.helpers.mail import Mail
 import structlog
 from structlog.contextvars import bind_contextvars
 
-from ..settings import BaseConfig
+from ..settings import BaseConfig, get_settings
 from ..utils.templates import render
 
 log = structlog.get_logger("send_delivery_email")
 
+MAX_HOUSEHOLD_SIZE = 10
+"""Largest household size with quantities in the items by household size
+table, see `ItemsByHouseholdSizeModel`
+"""
+
 
 class DeliverySettings(BaseSettings):
 
@@ -30,9 +38,10 @@ def on_assigned(
     inventory,
     sendgrid_client,
     settings=None,
+    session=None,
 ):
     if settings is None:
-        settings = DeliverySettings()
+        settings = get_settings(DeliverySettings)
     bind_contextvars(ticket_id=ticket.ticket_id)
     log.info("Sending delivery email")
 
@@ -42,7 +51,9 @@ def on_assigned(
         log.error(msg, problem=problem)
         return
 
-    delivery_volunteers = get_delivery_volunteers(ticket, member_table)
+    delivery_volunteers = get_delivery_volunteers(
+        ticket, member_table, session=session
+    )
     email = render_email_template(ticket, delivery_volunteers, inventory)
     email.from_email = settings.from_email
     email.add_cc(settings.reply_to)
@@ -76,29 +87,27 @@ def check_ready_to_send(ticket):
     return None
 
 
-def get_delivery_volunteers(ticket, member_table):
-    delivery_volunteers = []
-    for r in ticket.delivery_volunteer:
-        try:
-            delivery_volunteers.append(member_table.get(r))
-        except HTTPError as e:
-            msg = f"Error finding delivery volunteer {r}: {e.response.text}"
-            log.error(msg, exc_info=True)
-            raise DeliveryEmailError(msg)
-
-    return delivery_volunteers
+def get_delivery_volunteers(ticket, member_table, session=None):
+    try:
+        if session is not None:
+            return session.get_many(member_table, ticket.delivery_volunteer)
+        return member_table.get_many(ticket.delivery_volunteer)
+    except MissingRecordsError as e:
+        msg = "Error finding delivery volunteers {}".format(
+            ", ".join(e.missing_ids)
+        )
+        log.error(msg, exc_info=True)
+        raise DeliveryEmailError(msg)
+    except HTTPError as e:
+        msg = f"Error finding delivery volunteers: {e.response.text}"
+        log.error(msg, exc_info=True)
+        raise DeliveryEmailError(msg)
 
 
 def render_email_template(ticket, delivery_volunteers, inventory):
-    shopping_list = [
-        {
-            "name": item,
-            "category": inventory.category(item),
-            "quantity": inventory.quantity(item, ticket.household_size),
-            "unit": inventory.unit(item),
-        }
-        for item in ticket.food_options
-    ]
+    shopping_list = inventory.shopping_list(
+        ticket.food_options, ticket.household_size
+    )
     message = Mail(
         to_emails=[f"{v.name} <{v.email}>" for v in delivery_volunteers],
         subject=(
@@ -115,41 +124,89 @@ def render_email_template(ticket, delivery_volunteers, inventory):
 
 
 class Inventory:
+    """Items to shop for, with their quantities by household size
+
+    Items are indexed by name, and the quantities of all items are kept in a
+    single array, with a row of `MAX_HOUSEHOLD_SIZE` quantities per item.
+    Households larger than that get the quantities of the largest household,
+    scaled by their size and rounded up. Households without a size get the
+    quantities of a single person (with a warning), invalid sizes raise a
+    `DeliveryEmailError`.
+    """
+
     def __init__(self, items_by_household_size_table):
-        self.categories = {}
-        self.quantities = {}
-        self.units = {}
+        self.items = {}
+        """Rows of the items, by name"""
+        self.categories = []
+        self.units = []
+        self.quantities = array("l")
         for record in items_by_household_size_table.get_all(
-            '{Category} != "Children / Babies"'
+            '{Category} != "Children / Babies"', read_only_records=True
         ):
-            self.categories[record.item] = record.category
-            self.quantities[record.item] = [
-                0,
-                record.size_1,
-                record.size_2,
-                record.size_3,
-                record.size_4,
-                record.size_5,
-                record.size_6,
-                record.size_7,
-                record.size_8,
-                record.size_9,
-                record.size_10,
-            ]
-            self.units[record.item] = record.unit
+            self.items[record.item] = len(self.categories)
+            self.categories.append(record.category)
+            self.units.append(record.unit)
+            self.quantities.extend(
+                getattr(record, f"size_{size}")
+                for size in range(1, MAX_HOUSEHOLD_SIZE + 1)
+            )
+
+    def _get_quantities(self, rows, household_size):
+        if household_size is None:
+            log.warning(
+                "Household size is missing, using the quantities of a single "
+                "person"
+            )
+            household_size = 1
+        elif household_size < 1:
+            raise DeliveryEmailError(
+                f"Invalid household size: {household_size}"
+            )
+
+        col = min(household_size, MAX_HOUSEHOLD_SIZE) - 1
+        quantities = [
+            self.quantities[row * MAX_HOUSEHOLD_SIZE + col] for row in rows
+        ]
+        if household_size <= MAX_HOUSEHOLD_SIZE:
+            return quantities
+        return [
+            -(-quantity * household_size // MAX_HOUSEHOLD_SIZE)
+            for quantity in quantities
+        ]
 
     def category(self, item):
-        return self.categories[item]
+        return self.categories[self.items[item]]
 
     def quantity(self, item, household_size):
-        return self.quantities[item][household_size]
+        return self._get_quantities([self.items[item]], household_size)[0]
 
     def unit(self, item):
-        return self.units[item]
-
-
-class DeliveryEmailError(Exception):
-    """Error constructing delivery email."""
+        return self.units[self.items[item]]
+
+    def shopping_list(self, items, household_size):
+        """Returns the name, category, quantity and unit of every item, for a
+        household of `household_size`
+        """
+        rows = [self.items[item] for item in items]
+        return [
+            {
+                "name": item,
+                "category": self.categories[row],
+                "quantity": quantity,
+                "unit": self.units[row],
+            }
+            for item, row, quantity in zip(
+                items, rows, self._get_quantities(rows, household_size)
+            )
+        ]
+
+
+class DeliveryEmailError(FatalCallbackError):
+    """Error constructing delivery email.
+
+    NOTE that these errors fail the same way every time, so polls don't retry
+    them.
+    """
 
 
 if __name__ == "__main__":
@@ -163,12 +220,17 @@ if __name__ == "__main__":
     intake = tables.Intake.get_airtable(read_only=True)
     try:
         ticket = next(
-            intake.get_all(formula=f'{{Ticket ID}} = "{sys.argv[1]}"')
+            intake.get_all(
+                formula=f'{{Ticket ID}} = "{sys.argv[1]}"',
+                read_only_records=True,
+            )
         )
     except StopIteration:
         sys.exit(f"Ticket {sys.argv[1]} not found!")
     members = tables.Members.get_airtable(read_only=True)
-    volunteers = [members.get(v) for v in ticket.delivery_volunteer]
+    volunteers = members.get_many(
+        ticket.delivery_volunteer, read_only_records=True
+    )
     ibhs = tables.ITEMS_BY_HOUSEHOLD_SIZE.get_airtable_client(read_only=True)
     inventory = Inventory(ibhs)
     sendgrid_client = SendgridClient()
@@ -0,0 +1,102 @@
+"""A registry of clients and derived data, reused across invocations
+
+Cloud Functions keep module state between invocations served by the same warm
+instance, so clients and data that are expensive to set up (e.g. the loaded
+inventory) are kept in a registry instead of being rebuilt on every
+invocation. Entries are rebuilt once they expire, or if they fail their
+health check.
+
+Example:
+
+    REGISTRY = Registry()
+
+    def poll(event, context):
+        client = REGISTRY.get("slack", SlackClient, ttl=60 * 60)
+"""
+
+import concurrent.futures
+import threading
+import time
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_TTL = 60 * 60.0
+"""How long registry entries are reused for, in seconds"""
+
+
+class Registry:
+    """A thread-safe registry of values built on first use
+
+    Concurrent lookups of a missing value share a single build.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._pending = {}
+        self.num_hits = 0
+        self.num_builds = 0
+
+    def get(self, key, factory, ttl=DEFAULT_TTL, health_check=None):
+        """Returns the value of `key`, calling `factory` to build it if it's
+        missing, expired, or if `health_check` returns false for it
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > self._clock() and _is_healthy(
+                key, value, health_check
+            ):
+                with self._lock:
+                    self.num_hits += 1
+                return value
+
+        with self._lock:
+            # NOTE that another thread may have rebuilt the entry meanwhile
+            current = self._entries.get(key)
+            if current not in (None, entry) and current[1] > self._clock():
+                self.num_hits += 1
+                return current[0]
+            future = self._pending.get(key)
+            is_building = future is None
+            if is_building:
+                future = self._pending[key] = concurrent.futures.Future()
+
+        if not is_building:
+            return future.result()
+
+        try:
+            value = factory()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            self._entries[key] = (value, self._clock() + ttl)
+            self.num_builds += 1
+        future.set_result(value)
+        return value
+
+    def invalidate(self, predicate=None):
+        """Drops the entries whose key matches `predicate`, or every entry"""
+        with self._lock:
+            for key in list(self._entries):
+                if predicate is None or predicate(key):
+                    del self._entries[key]
+
+
+def _is_healthy(key, value, health_check):
+    if health_check is None:
+        return True
+    try:
+        return health_check(value)
+    except Exception:
+        logger.warning("Registry health check raised", key=key, exc_info=True)
+        return False
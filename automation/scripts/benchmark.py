@@ -0,0 +1,746 @@
+"""Benchmarks for performance sensitive parts of the automation
+
+Example:
+
+    python -m automation.scripts.benchmark transport --num-records 1000
+
+Benchmarks that talk to airtable run against a local fake server (see
+`automation.scripts.fake_airtable`), so they don't need credentials.
+"""
+
+import argparse
+import json
+import multiprocessing
+from pathlib import Path
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from typing import Optional
+
+import pydantic
+
+from ..clients import airtable
+from ..models import IntakeModel, MemberModel
+from ..utils import templates
+from . import build_templates
+from .fake_airtable import FakeAirtable
+
+FAKE_BASE_ID = "fakebaseid"
+FAKE_API_KEY = "fakeapikey"
+FAKE_TABLE_NAME = "Members"
+
+FAKE_MEMBERS = airtable.TableSpec(name="members", model_cls=MemberModel)
+
+ROOT_PATH = Path(__file__).resolve().parents[2]
+
+
+#########
+# UTILS #
+#########
+
+
+def timed(func):
+    """Returns the wall time of calling `func`, in seconds"""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def print_table(header, rows):
+    widths = [
+        max(len(str(row[i])) for row in [header, *rows])
+        for i in range(len(header))
+    ]
+    for row in [header, *rows]:
+        print(
+            "  ".join(
+                str(cell).ljust(width) for cell, width in zip(row, widths)
+            )
+        )
+
+
+def get_fake_member_fields(i):
+    return {
+        "Name": f"Member {i}",
+        "Email Address": f"member{i}@example.com",
+        "Phone Number": f"555-{i:04d}",
+        "Status": "Processed",
+        "_meta_last_seen_status": "Processed",
+    }
+
+
+def get_fake_intake_fields(i):
+    return {
+        "Ticket ID": f"{i:04d}",
+        "record ID": f"rec{i:014d}",
+        "Status": "Seeking Volunteer",
+        "_meta_last_seen_status": "Seeking Volunteer",
+        "Requestor First Name and Last Initial": "Grace H",
+        "Address (won't post in Slack)": "123 Fake St",
+        "Phone Number": "555-0000",
+        "Household Size": 3,
+        "Food Options": ["Rice", "Beans", "Eggs"],
+        "Language": ["English"],
+        "Completion_Date": "2021-01-01",
+    }
+
+
+class FakeSecretsClient:
+    def get_secret(self, name):
+        return json.dumps({"api_key": FAKE_API_KEY})
+
+
+def get_fake_client(table_spec, api_url):
+    """Returns a client of a table of the fake server, without rate limits"""
+    client = table_spec.get_airtable_client(
+        secrets_client=FakeSecretsClient(),
+        settings=airtable.AirtableSettings(
+            base_id=FAKE_BASE_ID,
+            table_names={table_spec.name: FAKE_TABLE_NAME},
+        ),
+    )
+    client.client = airtable.AirtableTransport(
+        FAKE_BASE_ID, FAKE_TABLE_NAME, FAKE_API_KEY, api_url=api_url
+    )
+    return client
+
+
+def new_status_formula_filter(formula, record):
+    """Evaluates `paginate_all_with_new_status` formulas for the fake server"""
+    fields = record["fields"]
+    if fields.get("Status") == fields.get("_meta_last_seen_status"):
+        return False
+    if match := re.search(r", (\d+)\) = (\d+)", formula):
+        shard = airtable.Shard(int(match[2]), int(match[1]))
+        return shard.contains(record["id"])
+    return True
+
+
+def parse_importtime(output):
+    """Parses `python -X importtime` output into a list of
+    `(package, depth, self_us, cumulative_us)`
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, package = line[len("import time:") :].split(
+            "|"
+        )
+        depth = (len(package) - len(package.lstrip()) - 1) // 2
+        entries.append(
+            (package.strip(), depth, int(self_us), int(cumulative_us))
+        )
+    return entries
+
+
+def measure_imports(code):
+    """Runs `code` in a new interpreter, returns its wall time in seconds and
+    its imports (see `parse_importtime`)
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, parse_importtime(proc.stderr)
+
+
+def get_fake_raw_intake_record(i):
+    return {
+        "id": f"rec{i:014d}",
+        "createdTime": "2021-01-01T00:00:00.000Z",
+        "fields": get_fake_intake_fields(i),
+    }
+
+
+def get_fake_intake_model():
+    return IntakeModel.from_airtable(**get_fake_raw_intake_record(0))
+
+
+##############
+# BENCHMARKS #
+##############
+
+
+def bench_transport(args):
+    """Compares `AirtableTransport` with airtable-python-wrapper"""
+    try:
+        from airtable import Airtable
+    except ImportError:
+        sys.exit(
+            "The transport benchmark compares against airtable-python-wrapper"
+            ", install it with: pip install airtable-python-wrapper==0.15.0"
+        )
+
+    with FakeAirtable(latency=args.latency) as fake:
+        records = fake.add_records(
+            FAKE_TABLE_NAME,
+            [get_fake_member_fields(i) for i in range(args.num_records)],
+        )
+        record_ids = [r["id"] for r in records[: args.num_lookups]]
+
+        class FakeAirtableWrapper(Airtable):
+            API_URL = fake.api_url
+            # Don't sleep between pages, the transport isn't rate limited in
+            # this benchmark either
+            API_LIMIT = 0
+
+        def new_wrapper():
+            return FakeAirtableWrapper(
+                FAKE_BASE_ID, FAKE_TABLE_NAME, FAKE_API_KEY
+            )
+
+        def new_transport():
+            return airtable.AirtableTransport(
+                FAKE_BASE_ID,
+                FAKE_TABLE_NAME,
+                FAKE_API_KEY,
+                api_url=fake.api_url,
+            )
+
+        def wrapper_list():
+            new_wrapper().get_all()
+
+        def transport_list():
+            for _ in new_transport().iter_pages():
+                pass
+
+        # NOTE that each lookup uses a new client, like each table's client
+        # and each poll does in the automation
+        def wrapper_lookups():
+            for record_id in record_ids:
+                new_wrapper().get(record_id)
+
+        def transport_lookups():
+            for record_id in record_ids:
+                new_transport().get(record_id)
+
+        def wrapper_updates():
+            wrapper = new_wrapper()
+            for record_id in record_ids:
+                wrapper.update(record_id, {"Status": "Processed"})
+
+        def transport_updates():
+            new_transport().batch_update(
+                [
+                    {"id": record_id, "fields": {"Status": "Processed"}}
+                    for record_id in record_ids
+                ]
+            )
+
+        rows = []
+        for name, wrapper_func, transport_func in [
+            (
+                f"list {args.num_records} records",
+                wrapper_list,
+                transport_list,
+            ),
+            (
+                f"get {len(record_ids)} records",
+                wrapper_lookups,
+                transport_lookups,
+            ),
+            (
+                f"update {len(record_ids)} records",
+                wrapper_updates,
+                transport_updates,
+            ),
+        ]:
+            results = []
+            for func in [wrapper_func, transport_func]:
+                num_connections = fake.num_connections
+                num_requests = sum(fake.request_counts.values())
+                elapsed = min(timed(func) for _ in range(args.repeat))
+                results.append(
+                    (
+                        elapsed,
+                        (fake.num_connections - num_connections)
+                        // args.repeat,
+                        (sum(fake.request_counts.values()) - num_requests)
+                        // args.repeat,
+                    )
+                )
+
+            (wrapper_time, wrapper_conns, wrapper_reqs), (
+                transport_time,
+                transport_conns,
+                transport_reqs,
+            ) = results
+            rows.append(
+                [
+                    name,
+                    f"{wrapper_time * 1000:.1f}ms",
+                    f"{transport_time * 1000:.1f}ms",
+                    f"{wrapper_time / transport_time:.2f}x",
+                    f"{wrapper_conns} / {transport_conns}",
+                    f"{wrapper_reqs} / {transport_reqs}",
+                ]
+            )
+
+    print_table(
+        [
+            "scenario",
+            "wrapper",
+            "transport",
+            "speedup",
+            "connections",
+            "requests",
+        ],
+        rows,
+    )
+
+
+def bench_assignment(args):
+    """Measures the cost of assigning a field of a loaded model"""
+    model = get_fake_intake_model()
+
+    # A plain pydantic model with the same fields and assignment validation,
+    # i.e. the cost of an assignment without any dirty tracking
+    reference_cls = pydantic.create_model(
+        "ReferenceIntakeModel",
+        __config__=type(
+            "Config",
+            (),
+            {
+                "validate_assignment": True,
+                "allow_population_by_field_name": True,
+            },
+        ),
+        **{
+            name: (
+                (
+                    Optional[field.outer_type_]
+                    if field.allow_none
+                    else field.outer_type_
+                ),
+                field.field_info,
+            )
+            for name, field in IntakeModel.__fields__.items()
+            if name not in airtable.BaseModel.__fields__
+        },
+    )
+    reference = reference_cls(
+        **model.dict(include=set(reference_cls.__fields__))
+    )
+
+    values = ["Grace H", "Ada L"]
+
+    def assign(target):
+        def func():
+            for value in values:
+                target.request_name = value
+
+        return func
+
+    rows = []
+    for name, target in [
+        ("IntakeModel", model),
+        ("pydantic reference", reference),
+    ]:
+        elapsed = min(
+            timeit.repeat(
+                assign(target), number=args.number, repeat=args.repeat
+            )
+        )
+        per_assignment = elapsed / (args.number * len(values))
+        rows.append([name, f"{per_assignment * 1e6:.2f}us"])
+
+    assert model.state == airtable.BaseModelState.DIRTY
+    print_table(["model", "per assignment"], rows)
+
+
+def bench_load(args):
+    """Measures the time and memory needed to load a page of records"""
+    raw_records = [
+        get_fake_raw_intake_record(i) for i in range(args.num_records)
+    ]
+
+    rows = []
+    for name, load in [
+        ("model", IntakeModel.from_airtable),
+        ("read-only record", IntakeModel.from_airtable_read_only),
+    ]:
+        elapsed = min(
+            timed(lambda: [load(**raw) for raw in raw_records])
+            for _ in range(args.repeat)
+        )
+
+        tracemalloc.start()
+        records = [load(**raw) for raw in raw_records]
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert len(records) == args.num_records
+        rows.append(
+            [
+                name,
+                args.num_records,
+                f"{elapsed * 1000:.1f}ms",
+                f"{elapsed / args.num_records * 1e6:.1f}us",
+                f"{retained / 2 ** 20:.1f}MiB",
+                f"{peak / 2 ** 20:.1f}MiB",
+            ]
+        )
+        del records
+
+    print_table(
+        [
+            "loaded as",
+            "records",
+            "load time",
+            "per record",
+            "retained",
+            "peak",
+        ],
+        rows,
+    )
+
+
+def bench_serialize(args):
+    """Compares `to_airtable` with dumping and reloading the model's json"""
+    model = get_fake_intake_model()
+    model.meta = json.dumps({"last_processed": "2021-01-01", "retries": 0})
+    model.food_options = ["Rice", "Beans"]
+    model.household_size = 4
+
+    # How `to_airtable` serialized models before it was precompiled
+    def json_round_trip(modified_only):
+        return json.loads(
+            model.json(
+                by_alias=True,
+                exclude_none=True,
+                include=model.modified_fields if modified_only else None,
+                exclude={
+                    "state",
+                    "id",
+                    "created_at",
+                    "modified_fields",
+                    "_meta",
+                },
+            )
+        )
+
+    rows = []
+    for modified_only in [False, True]:
+        assert json.dumps(
+            model.to_airtable(modified_only=modified_only)["fields"]
+        ) == json.dumps(json_round_trip(modified_only))
+
+        results = []
+        for func in [
+            lambda: json_round_trip(modified_only),
+            lambda: model.to_airtable(modified_only=modified_only),
+        ]:
+            elapsed = min(
+                timeit.repeat(func, number=args.number, repeat=args.repeat)
+            )
+            results.append(elapsed / args.number)
+
+        round_trip_time, compiled_time = results
+        rows.append(
+            [
+                "modified fields" if modified_only else "all fields",
+                f"{round_trip_time * 1e6:.1f}us",
+                f"{compiled_time * 1e6:.1f}us",
+                f"{round_trip_time / compiled_time:.2f}x",
+            ]
+        )
+
+    print_table(["fields", "json round trip", "compiled", "speedup"], rows)
+
+
+def poll_shard(api_url, shard, callback_time):
+    """Polls a shard of the fake members table, returns the ids processed"""
+    client = get_fake_client(FAKE_MEMBERS, api_url)
+    processed = []
+
+    def callback(record):
+        time.sleep(callback_time)
+        processed.append(record.id)
+
+    client.poll_table(callback, shard=shard)
+    return processed
+
+
+def bench_shards(args):
+    """Measures how polling scales with the number of shards"""
+    with FakeAirtable(
+        latency=args.latency, formula_filter=new_status_formula_filter
+    ) as fake:
+        records = fake.add_records(
+            FAKE_TABLE_NAME,
+            [
+                {**get_fake_member_fields(i), "Status": "New"}
+                for i in range(args.num_records)
+            ],
+        )
+        record_ids = sorted(r["id"] for r in records)
+
+        # NOTE that workers are forked, so they don't pay for imports, much
+        # like warm function instances
+        context = multiprocessing.get_context("fork")
+
+        rows = []
+        base_time = None
+        for num_shards in args.shards:
+            for record in fake.tables[FAKE_TABLE_NAME].values():
+                record["fields"]["_meta_last_seen_status"] = None
+
+            with context.Pool(num_shards) as pool:
+                start = time.perf_counter()
+                results = pool.starmap(
+                    poll_shard,
+                    [
+                        (
+                            fake.api_url,
+                            airtable.Shard(i, num_shards),
+                            args.callback_time,
+                        )
+                        for i in range(num_shards)
+                    ],
+                )
+                elapsed = time.perf_counter() - start
+
+            # Every record is processed exactly once across shards
+            processed = sorted(r for result in results for r in result)
+            assert processed == record_ids, "Shards overlap or miss records"
+
+            if base_time is None:
+                base_time = elapsed * num_shards
+            speedup = base_time / elapsed
+            rows.append(
+                [
+                    num_shards,
+                    f"{elapsed:.2f}s",
+                    f"{len(record_ids) / elapsed:.0f}/s",
+                    f"{speedup:.2f}x",
+                    f"{speedup / num_shards:.0%}",
+                    min(len(result) for result in results),
+                    max(len(result) for result in results),
+                ]
+            )
+
+    print_table(
+        [
+            "shards",
+            "poll time",
+            "records",
+            "speedup",
+            "efficiency",
+            "min per shard",
+            "max per shard",
+        ],
+        rows,
+    )
+
+
+def bench_startup(args):
+    """Measures the time to import a module in a new interpreter, e.g. the
+    cloud functions' entry point
+    """
+    base_time, base_imports = min(
+        (measure_imports("pass") for _ in range(args.repeat)),
+        key=lambda result: result[0],
+    )
+    wall_time, imports = min(
+        (measure_imports(f"import {args.module}") for _ in range(args.repeat)),
+        key=lambda result: result[0],
+    )
+
+    # NOTE that imports done by the interpreter itself (e.g. site) are
+    # excluded, only what importing the module adds is reported
+    base_packages = {package for package, *_ in base_imports}
+    imports = [entry for entry in imports if entry[0] not in base_packages]
+    import_time = sum(
+        cumulative_us / 1e6
+        for _, depth, _, cumulative_us in imports
+        if depth == 0
+    )
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "module": args.module,
+                    "wall_time": wall_time - base_time,
+                    "import_time": import_time,
+                    "num_modules": len(imports),
+                }
+            )
+        )
+        return
+
+    print_table(
+        ["module", "wall time", "import time", "modules"],
+        [
+            [
+                args.module,
+                f"{(wall_time - base_time) * 1000:.0f}ms",
+                f"{import_time * 1000:.0f}ms",
+                len(imports),
+            ]
+        ],
+    )
+    print()
+
+    # Top-level packages, by the time spent importing them
+    packages = sorted(
+        (
+            (cumulative_us, package)
+            for package, _, _, cumulative_us in imports
+            if "." not in package
+        ),
+        reverse=True,
+    )
+    print_table(
+        ["package", "cumulative"],
+        [
+            [package, f"{cumulative_us / 1000:.1f}ms"]
+            for cumulative_us, package in packages[: args.top]
+        ],
+    )
+
+
+def bench_render(args):
+    """Compares rendering emails with their CSS inlined when rendering them,
+    and ahead of time by `build_templates`
+    """
+    with tempfile.TemporaryDirectory() as compiled_path:
+        build_templates.build(Path(compiled_path) / "compiled")
+        source_env, _ = templates.get_environment(None)
+        compiled_env, inlined = templates.get_environment(
+            Path(compiled_path) / "compiled"
+        )
+
+        rows = []
+        for name in sorted(inlined):
+            context = build_templates.SAMPLE_CONTEXTS[name]
+            results = []
+            for env, env_inlined in [
+                (source_env, frozenset()),
+                (compiled_env, inlined),
+            ]:
+                elapsed = min(
+                    timeit.repeat(
+                        lambda: templates.render_with(
+                            env, env_inlined, name, True, context
+                        ),
+                        number=args.number,
+                        repeat=args.repeat,
+                    )
+                )
+                results.append(elapsed / args.number)
+
+            runtime_time, compiled_time = results
+            rows.append(
+                [
+                    name,
+                    f"{runtime_time * 1000:.2f}ms",
+                    f"{compiled_time * 1000:.2f}ms",
+                    f"{runtime_time / compiled_time:.0f}x",
+                ]
+            )
+
+    print_table(["template", "inlined on render", "built", "speedup"], rows)
+
+
+########
+# MAIN #
+########
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        "Runs benchmarks for performance sensitive code"
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    transport_parser = subparsers.add_parser(
+        "transport", help=bench_transport.__doc__
+    )
+    transport_parser.set_defaults(func=bench_transport)
+    transport_parser.add_argument("--num-records", type=int, default=1000)
+    transport_parser.add_argument("--num-lookups", type=int, default=50)
+    transport_parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Artificial latency added to every request, in seconds",
+    )
+    transport_parser.add_argument("--repeat", type=int, default=3)
+
+    assignment_parser = subparsers.add_parser(
+        "assignment", help=bench_assignment.__doc__
+    )
+    assignment_parser.set_defaults(func=bench_assignment)
+    assignment_parser.add_argument("--number", type=int, default=10000)
+    assignment_parser.add_argument("--repeat", type=int, default=5)
+
+    load_parser = subparsers.add_parser("load", help=bench_load.__doc__)
+    load_parser.set_defaults(func=bench_load)
+    load_parser.add_argument("--num-records", type=int, default=10000)
+    load_parser.add_argument("--repeat", type=int, default=3)
+
+    serialize_parser = subparsers.add_parser(
+        "serialize", help=bench_serialize.__doc__
+    )
+    serialize_parser.set_defaults(func=bench_serialize)
+    serialize_parser.add_argument("--number", type=int, default=10000)
+    serialize_parser.add_argument("--repeat", type=int, default=5)
+
+    shards_parser = subparsers.add_parser("shards", help=bench_shards.__doc__)
+    shards_parser.set_defaults(func=bench_shards)
+    shards_parser.add_argument("--num-records", type=int, default=500)
+    shards_parser.add_argument(
+        "--shards", type=int, nargs="+", default=[1, 2, 4, 8]
+    )
+    shards_parser.add_argument(
+        "--callback-time",
+        type=float,
+        default=0.01,
+        help="Time spent by the callback on each record, in seconds",
+    )
+    shards_parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Artificial latency added to every request, in seconds",
+    )
+
+    startup_parser = subparsers.add_parser(
+        "startup", help=bench_startup.__doc__
+    )
+    startup_parser.set_defaults(func=bench_startup)
+    startup_parser.add_argument("--module", default="main")
+    startup_parser.add_argument("--repeat", type=int, default=5)
+    startup_parser.add_argument(
+        "--top",
+        type=int,
+        default=15,
+        help="Number of slowest packages to list",
+    )
+    startup_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the results as a JSON line, for tracking them over time",
+    )
+
+    render_parser = subparsers.add_parser("render", help=bench_render.__doc__)
+    render_parser.set_defaults(func=bench_render)
+    render_parser.add_argument("--number", type=int, default=100)
+    render_parser.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
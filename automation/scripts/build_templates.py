@@ -0,0 +1,242 @@
+"""Builds the email templates, to ship them precompiled with deploys
+
+Templates are compiled to python modules (loaded with jinja's `ModuleLoader`)
+so they aren't compiled again on every cold start. Templates with a <style>
+also get a variant with their CSS inlined, so emails rendered with
+`inline_css=True` don't go through premailer (which parses the whole email
+and its CSS) every time.
+
+CSS is inlined by running premailer on the template's source, with the
+templates it extends filled in and its jinja tags swapped for placeholders.
+Every inlined template is checked against inlining its rendered output, with
+`SAMPLE_CONTEXTS`.
+
+Example:
+
+    python -m automation.scripts.build_templates
+"""
+
+import argparse
+import json
+import logging
+from pathlib import Path
+import re
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+import jinja2
+
+from ..utils import templates
+
+EXTENDS_RE = re.compile(r'^\s*{%-?\s*extends\s+"([^"]+)"\s*-?%}')
+BLOCK_RE = re.compile(
+    r"({%-?\s*block\s+(\w+)\s*-?%})(.*?)({%-?\s*endblock(?:\s+\w+)?\s*-?%})",
+    re.DOTALL,
+)
+JINJA_TAG_RE = re.compile(r"{%.*?%}|{{.*?}}|{#.*?#}", re.DOTALL)
+PLACEHOLDER_RE = re.compile(r"jinja-placeholder-(\d+)-")
+
+SAMPLE_CONTEXTS = {
+    "email_template.html.jinja": {},
+    "new_member_email.html.jinja": {
+        "subject": "Welcome to Bed-Stuy Strong!",
+        "member": SimpleNamespace(name="Grace Hopper"),
+    },
+}
+"""Contexts to check inlined templates with, by template name"""
+
+
+class TemplateBuildError(Exception):
+    """A template can't be built, or doesn't render as expected once built"""
+
+
+#########
+# BUILD #
+#########
+
+
+def flatten(env, name):
+    """Returns the source of a template, with the templates it extends filled
+    in with its blocks
+
+    Only supports blocks that aren't nested and don't call `super()`.
+    """
+    source, _, _ = env.loader.get_source(env, name)
+    match = EXTENDS_RE.match(source)
+    if match is None:
+        return source
+
+    blocks = {m.group(2): m.group(3) for m in BLOCK_RE.finditer(source)}
+    parent = flatten(env, match.group(1))
+    parent_blocks = [m.group(3) for m in BLOCK_RE.finditer(parent)]
+    for body in [*blocks.values(), *parent_blocks]:
+        if "super()" in body or re.search(r"{%-?\s*block\s", body):
+            raise TemplateBuildError(
+                f"Can't flatten {name}, its blocks are nested or call super()"
+            )
+
+    return BLOCK_RE.sub(
+        lambda m: m.group(1) + blocks.get(m.group(2), m.group(3)) + m.group(4),
+        parent,
+    )
+
+
+def inline_css(source):
+    """Inlines the CSS of a template's (flattened) source"""
+    from premailer import transform
+
+    tags = []
+
+    def protect(match):
+        tags.append(match.group(0))
+        return f"jinja-placeholder-{len(tags) - 1}-"
+
+    inlined = transform(
+        JINJA_TAG_RE.sub(protect, source), **templates.PREMAILER_OPTIONS
+    )
+
+    restored = []
+
+    def restore(match):
+        restored.append(int(match.group(1)))
+        return tags[int(match.group(1))]
+
+    inlined = PLACEHOLDER_RE.sub(restore, inlined)
+    if sorted(restored) != list(range(len(tags))):
+        raise TemplateBuildError("Inlining CSS moved or dropped jinja tags")
+    return inlined
+
+
+def _normalize(html):
+    import lxml.html
+
+    html = lxml.html.tostring(
+        lxml.html.document_fromstring(html), encoding="unicode"
+    )
+    return re.sub(r"\s+", " ", re.sub(r">\s+<", "><", html)).strip()
+
+
+def check(source_env, compiled_env, name, context):
+    """Checks that an inlined template renders like inlining the CSS of the
+    rendered template
+    """
+    from premailer import transform
+
+    expected = transform(
+        source_env.get_template(name).render(**context),
+        **templates.PREMAILER_OPTIONS,
+    )
+    actual = compiled_env.get_template(templates.INLINED_PREFIX + name).render(
+        **context
+    )
+    if _normalize(actual) != _normalize(expected):
+        raise TemplateBuildError(
+            f"{name} renders differently once its CSS is inlined"
+        )
+
+
+def build(target=templates.COMPILED_PATH):
+    """Builds every template of `templates.STATIC_PATH` to `target`"""
+    target = Path(target)
+    source_loader = jinja2.FileSystemLoader(str(templates.STATIC_PATH))
+    source_env = templates.create_environment(source_loader)
+    names = [
+        name
+        for name in source_loader.list_templates()
+        if name.endswith(".jinja")
+    ]
+
+    inlined = {}
+    for name in names:
+        source = flatten(source_env, name)
+        if "<style" in source:
+            logging.info("Inlining CSS of %s...", name)
+            inlined[name] = inline_css(source)
+
+    env = templates.create_environment(
+        jinja2.ChoiceLoader(
+            [
+                source_loader,
+                jinja2.DictLoader(
+                    {
+                        templates.INLINED_PREFIX + name: source
+                        for name, source in inlined.items()
+                    }
+                ),
+            ]
+        )
+    )
+
+    # Build next to the target and swap it in at the end, so a failed build
+    # doesn't leave a partial one behind
+    target.parent.mkdir(parents=True, exist_ok=True)
+    build_path = Path(tempfile.mkdtemp(dir=target.parent, prefix=target.name))
+    try:
+        env.compile_templates(
+            str(build_path),
+            filter_func=lambda name: name.endswith(".jinja"),
+            zip=None,
+            ignore_errors=False,
+            log_function=logging.debug,
+        )
+
+        compiled_env = templates.create_environment(
+            jinja2.ModuleLoader(str(build_path))
+        )
+        for name in inlined:
+            if name not in SAMPLE_CONTEXTS:
+                raise TemplateBuildError(
+                    f"{name} has no sample context to check it with"
+                )
+            check(source_env, compiled_env, name, SAMPLE_CONTEXTS[name])
+
+        manifest = {
+            "jinja2": jinja2.__version__,
+            "sources": {
+                name: templates.hash_source(templates.STATIC_PATH / name)
+                for name in names
+            },
+            "inlined": sorted(inlined),
+        }
+        with (build_path / templates.MANIFEST_NAME).open("w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        shutil.rmtree(target, ignore_errors=True)
+        build_path.rename(target)
+    except BaseException:
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise
+
+    logging.info(
+        "Built %d templates (%d inlined) to %s",
+        len(names),
+        len(inlined),
+        target,
+    )
+    return manifest
+
+
+########
+# MAIN #
+########
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompiles templates, inlining their CSS"
+    )
+    parser.add_argument(
+        "--target",
+        type=Path,
+        default=templates.COMPILED_PATH,
+        help="Directory to build templates to",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    build(args.target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""A fake airtable REST API server, for benchmarks and tests
+
+Supports listing records (with pagination, `fields[]` and `maxRecords`),
+fetching, creating and updating records. Airtable formulas are not evaluated:
+pass a `formula_filter` to decide which records match a formula, by default
+every record matches.
+
+Like airtable, listing records creates an iterator over the records matching
+at the time of the first request, which later pages (requested by offset)
+read from. Use `expire_iterators` to simulate airtable expiring them.
+
+Example:
+
+    with FakeAirtable() as fake:
+        fake.add_records("members", [{"Name": "Grace Hopper"}])
+        transport = AirtableTransport(
+            "fakebaseid", "members", "fakeapikey", api_url=fake.api_url
+        )
+"""
+
+import argparse
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import socket
+import threading
+import time
+from urllib.parse import parse_qsl, unquote, urlparse
+
+MAX_RECORDS_PER_REQUEST = 10
+MAX_PAGE_SIZE = 100
+
+
+class FakeAirtable:
+    def __init__(self, latency=0.0, formula_filter=None, gzip_responses=True):
+        self.latency = latency
+        """Artificial delay added to every request, in seconds"""
+        self.formula_filter = formula_filter
+        """Called with `(formula, record)`, returns whether a record matches"""
+        self.gzip_responses = gzip_responses
+
+        self.tables = defaultdict(dict)
+        self.request_counts = Counter()
+        self.num_connections = 0
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._iterator_ids = itertools.count()
+        self._iterators = {}
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def api_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v0"
+
+    def start(self, host="127.0.0.1", port=0):
+        fake = self
+
+        class Handler(_Handler):
+            airtable = fake
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def new_record(self, fields):
+        # NOTE that real airtable ids are "rec" followed by 14 base62
+        # characters, ours are sequential to keep ordering simple
+        return {
+            "id": "rec{:014d}".format(next(self._ids)),
+            "createdTime": datetime.now(timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z"),
+            "fields": dict(fields),
+        }
+
+    def add_records(self, table_name, records):
+        """Adds records, given as dicts of fields, returns the new records"""
+        with self._lock:
+            new_records = [self.new_record(fields) for fields in records]
+            for record in new_records:
+                self.tables[table_name][record["id"]] = record
+        return new_records
+
+    def expire_iterators(self):
+        """Makes every pending offset invalid"""
+        with self._lock:
+            self._iterators.clear()
+
+    # Request handlers, all called with the lock held
+
+    def list_records(self, table_name, params):
+        table = self.tables[table_name]
+
+        if "offset" in params:
+            iterator_id, start = params["offset"].split("/")
+            start = int(start)
+            record_ids = self._iterators.get(iterator_id)
+            if record_ids is None:
+                return 422, {
+                    "error": {
+                        "type": "LIST_RECORDS_ITERATOR_NOT_AVAILABLE",
+                        "message": "The iterator is not available",
+                    }
+                }
+        else:
+            records = list(table.values())
+
+            formula = params.get("filterByFormula")
+            if formula and self.formula_filter is not None:
+                records = [
+                    r for r in records if self.formula_filter(formula, r)
+                ]
+
+            if "maxRecords" in params:
+                records = records[: int(params["maxRecords"])]
+
+            iterator_id = "itr{:014d}".format(next(self._iterator_ids))
+            record_ids = [r["id"] for r in records]
+            self._iterators[iterator_id] = record_ids
+            start = 0
+
+        page_size = min(int(params.get("pageSize", MAX_PAGE_SIZE)), 100)
+        page = [
+            table[record_id]
+            for record_id in record_ids[start : start + page_size]
+            if record_id in table
+        ]
+
+        fields = params.get("fields[]")
+        if fields is not None:
+            page = [
+                {
+                    **record,
+                    "fields": {
+                        k: v
+                        for k, v in record["fields"].items()
+                        if k in fields
+                    },
+                }
+                for record in page
+            ]
+
+        res = {"records": page}
+        if start + page_size < len(record_ids):
+            res["offset"] = f"{iterator_id}/{start + page_size}"
+        return 200, res
+
+    def get_record(self, table_name, record_id):
+        record = self.tables[table_name].get(record_id)
+        if record is None:
+            return 404, {"error": "NOT_FOUND"}
+        return 200, record
+
+    def create_records(self, table_name, body):
+        if "fields" in body:
+            record = self.new_record(body["fields"])
+            self.tables[table_name][record["id"]] = record
+            return 200, record
+        if len(body["records"]) > MAX_RECORDS_PER_REQUEST:
+            return 422, {"error": "INVALID_RECORDS"}
+        records = [self.new_record(r["fields"]) for r in body["records"]]
+        for record in records:
+            self.tables[table_name][record["id"]] = record
+        return 200, {"records": records}
+
+    def update_records(self, table_name, body):
+        if len(body["records"]) > MAX_RECORDS_PER_REQUEST:
+            return 422, {"error": "INVALID_RECORDS"}
+        table = self.tables[table_name]
+        if any(r["id"] not in table for r in body["records"]):
+            return 404, {"error": "NOT_FOUND"}
+        for r in body["records"]:
+            table[r["id"]]["fields"].update(r["fields"])
+        return 200, {"records": [table[r["id"]] for r in body["records"]]}
+
+    def update_record(self, table_name, record_id, body):
+        record = self.tables[table_name].get(record_id)
+        if record is None:
+            return 404, {"error": "NOT_FOUND"}
+        record["fields"].update(body["fields"])
+        return 200, record
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    airtable: FakeAirtable
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately, so without this, delayed
+        # ACKs stall every request on a kept-alive connection
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.airtable._lock:
+            self.airtable.num_connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _route(self, method):
+        url = urlparse(self.path)
+        # Path is /v0/<base id>/<table name>[/<record id>]
+        parts = [unquote(part) for part in url.path.split("/")[3:]]
+        params = {}
+        for key, value in parse_qsl(url.query):
+            if key.endswith("[]"):
+                params.setdefault(key, []).append(value)
+            else:
+                params[key] = value
+
+        body = None
+        if length := int(self.headers.get("Content-Length") or 0):
+            body = json.loads(self.rfile.read(length))
+
+        if self.airtable.latency:
+            time.sleep(self.airtable.latency)
+
+        with self.airtable._lock:
+            self.airtable.request_counts[method] += 1
+
+            if method == "GET" and len(parts) == 1:
+                status, res = self.airtable.list_records(parts[0], params)
+            elif method == "GET" and len(parts) == 2:
+                status, res = self.airtable.get_record(*parts)
+            elif method == "POST" and len(parts) == 1:
+                status, res = self.airtable.create_records(parts[0], body)
+            elif method == "PATCH" and len(parts) == 1:
+                status, res = self.airtable.update_records(parts[0], body)
+            elif method == "PATCH" and len(parts) == 2:
+                status, res = self.airtable.update_record(*parts, body)
+            else:
+                status, res = 404, {"error": "NOT_FOUND"}
+
+        self._respond(status, res)
+
+    def _respond(self, status, res):
+        data = json.dumps(res).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if self.airtable.gzip_responses and "gzip" in self.headers.get(
+            "Accept-Encoding", ""
+        ):
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PATCH(self):
+        self._route("PATCH")
+
+
+def main():
+    parser = argparse.ArgumentParser("Runs a fake airtable API server")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeAirtable(latency=args.latency)
+    fake.start(port=args.port)
+    print(f"Serving fake airtable API at {fake.api_url}")
+    try:
+        fake._thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 import argparse
+import json
 import logging
 import sys
 
-from .. import tables
+from .. import stores, tables
+from ..clients import airtable
 
 logging.basicConfig(level=logging.INFO)
 
@@ -11,42 +13,162 @@ def main():
     parser = argparse.ArgumentParser(
         "A tool for running the automation locally"
     )
-    parser.add_argument("action", choices=["poll", "migrate-meta"])
+    parser.add_argument(
+        "action",
+        choices=[
+            "poll",
+            "poll-all",
+            "migrate-meta",
+            "list-dead-letters",
+            "replay-dead-letters",
+        ],
+    )
     parser.add_argument(
         "--table",
-        required=True,
-        help="Which Airtable table to use",
+        help="Which Airtable table to use, required unless polling all",
     )
     parser.add_argument(
         "--live",
         action="store_true",
         help="Enables updating airtable records",
     )
+    parser.add_argument(
+        "--watermark-file",
+        help=(
+            "Poll incrementally, only scanning records modified since the "
+            "last poll, as recorded in this file"
+        ),
+    )
+    parser.add_argument(
+        "--checkpoint-file",
+        help=(
+            "Save how far a poll got in this file when it runs out of time, "
+            "and resume from there in the next poll"
+        ),
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="Stop taking new records after this many seconds of polling",
+    )
+    parser.add_argument(
+        "--lease-db",
+        help=(
+            "Take leases in this SQLite database, so that overlapping polls "
+            "don't process the same records"
+        ),
+    )
+    parser.add_argument(
+        "--record-leases",
+        action="store_true",
+        help=(
+            "Lease records instead of whole tables, so that overlapping "
+            "polls split the records between them"
+        ),
+    )
+    parser.add_argument(
+        "--shard",
+        type=airtable.Shard.parse,
+        help=(
+            'Only poll one shard of the records, given as "<index>/<count>", '
+            'e.g. "0/4"'
+        ),
+    )
+    parser.add_argument(
+        "--dead-letter-db",
+        help=(
+            "Keep records whose callbacks failed in this SQLite database, "
+            "and retry them in later polls"
+        ),
+    )
+    parser.add_argument(
+        "--record-id",
+        action="append",
+        dest="record_ids",
+        help="Only replay the dead letters of these records",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        help="Number of records to process concurrently when polling",
+    )
 
     args = parser.parse_args()
 
-    table = tables.POLLABLE_TABLES[args.table](read_only=not args.live)
+    watermark_store = None
+    if args.watermark_file is not None:
+        watermark_store = stores.JsonFileStore(args.watermark_file)
+
+    checkpoint_store = None
+    if args.checkpoint_file is not None:
+        checkpoint_store = stores.JsonFileStore(args.checkpoint_file)
+
+    lease_manager = None
+    if args.lease_db is not None:
+        lease_manager = stores.LeaseManager(stores.SqliteStore(args.lease_db))
+    elif args.record_leases:
+        parser.error("--record-leases requires --lease-db")
+
+    dead_letter_queue = None
+    if args.dead_letter_db is not None:
+        dead_letter_queue = stores.DeadLetterQueue(
+            stores.SqliteStore(args.dead_letter_db)
+        )
+    elif args.action in {"list-dead-letters", "replay-dead-letters"}:
+        parser.error(f"{args.action} requires --dead-letter-db")
+
+    table_options = dict(
+        read_only=not args.live,
+        watermark_store=watermark_store,
+        dead_letter_queue=dead_letter_queue,
+        checkpoint_store=checkpoint_store,
+        time_budget=args.time_budget,
+        lease_manager=lease_manager,
+        record_leases=args.record_leases,
+        shard=args.shard,
+        max_workers=args.max_workers,
+    )
+
+    table = None
+    if args.action != "poll-all":
+        if args.table is None:
+            parser.error(f"{args.action} requires --table")
+        table = tables.POLLABLE_TABLES[args.table](**table_options)
 
     succeeded = True
     if args.action == "poll":
         succeeded = table.poll_table()
+    elif args.action == "poll-all":
+        results = tables.poll_tables(**table_options)
+        for name, table_succeeded in results.items():
+            print(f"{name}: {'Succeeded' if table_succeeded else 'Failed'}")
+        succeeded = all(results.values())
     elif args.action == "migrate-meta":
         client = table.get_airtable(read_only=not args.live)
-        # TODO: once airtable-python-wrapper releases a version with batched
-        # updates, make this use a paginated query and batched updates
-        for record in client.get_all_with_new_status():
-            if (
-                record.meta_last_seen_status is None
-                and record.meta is not None
-            ):
-                last_seen_status = record.meta["lastSeenStatus"]
-                logging.info(
-                    f"Updating {record.id} to have last seen status "
-                    f"{last_seen_status}"
-                )
-                client.client.update(
-                    record.id, {"_meta_last_seen_status": last_seen_status}
-                )
+        for page in client.paginate_all_with_new_status():
+            to_update = []
+            for record in page:
+                if (
+                    record.meta_last_seen_status is None
+                    and record.meta is not None
+                ):
+                    last_seen_status = record.meta["lastSeenStatus"]
+                    logging.info(
+                        f"Updating {record.id} to have last seen status "
+                        f"{last_seen_status}"
+                    )
+                    record.meta_last_seen_status = last_seen_status
+                    to_update.append(record)
+
+            client.update_many(to_update)
+    elif args.action == "list-dead-letters":
+        client = table.get_airtable(read_only=True)
+        entries = client.list_dead_letters(dead_letter_queue)
+        for record_id, entry in entries.items():
+            print(f"{record_id}: {json.dumps(entry)}")
+        print(f"{len(entries)} dead letter(s)")
+    elif args.action == "replay-dead-letters":
+        succeeded = table.replay_dead_letters(record_ids=args.record_ids)
     else:
         raise ValueError("Unsupported action: {}".format(args.action))
 
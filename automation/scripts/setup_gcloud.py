@@ -7,6 +7,7 @@ import logging
 from pathlib import Path
 
 from .. import settings
+from . import build_templates
 
 logging.basicConfig(level=logging.INFO)
 
@@ -17,7 +18,10 @@ logging.basicConfig(level=logging.INFO)
 RUNTIME = "python39"
 SOURCE = str(Path(__file__).resolve().parents[2])
 
-POLL_FUNCTION_NAMES = set(["poll_members", "poll_intake"])
+POLL_FUNCTION_NAMES = set(["poll_all"])
+# NOTE that these poll the same tables as `poll_all`, so they're deleted when
+# deploying
+RETIRED_FUNCTION_NAMES = set(["poll_members", "poll_intake"])
 HTTP_FUNCTION_NAMES = set([])
 
 POLL_TOPIC_NAME = "POLL_TOPIC"
@@ -125,6 +129,10 @@ def list_functions():
 def deploy(env):
     logging.info("Deploying...")
 
+    # NOTE that the build is uploaded with the source, see .gcloudignore
+    logging.info("Building templates...")
+    build_templates.build()
+
     topics = list_topics()
 
     if POLL_TOPIC_NAME not in topics:
@@ -155,6 +163,14 @@ def deploy(env):
             check=True,
         )
 
+    for func_name in list_functions() & RETIRED_FUNCTION_NAMES:
+        logging.info("Deleting retired function: {}...".format(func_name))
+        subprocess.run(
+            ["gcloud", "-q", "functions", "delete", func_name],
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+
     jobs = list_scheduler_jobs()
 
     if POLL_TRIGGER_JOB_NAME not in jobs:
@@ -218,7 +234,7 @@ def reset():
         )
 
     deployed_functions = list_functions() & (
-        POLL_FUNCTION_NAMES | HTTP_FUNCTION_NAMES
+        POLL_FUNCTION_NAMES | HTTP_FUNCTION_NAMES | RETIRED_FUNCTION_NAMES
     )
 
     for func_name in deployed_functions:
@@ -268,7 +284,7 @@ def main():
     if not env:
         parser.error("Please set AUTOMATION_ENV to either 'prod' or 'staging'")
 
-    google_cloud_settings = settings.GoogleCloudSettings()
+    google_cloud_settings = settings.get_settings(settings.GoogleCloudSettings)
 
     with use_gcloud_project(google_cloud_settings.project_id):
         if args.command == "deploy":
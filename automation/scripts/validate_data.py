@@ -13,12 +13,10 @@ from .. import tables
 def validate_table(client):
     validation_issues = defaultdict(list)
 
-    # TODO: Don't reach inside our client wrapper, maybe move this to
-    # AirtableClient?
-    for page in client.client.get_iter():
-        for raw in page:
+    for page in client.paginate_raw():
+        for raw in page.records:
             try:
-                client.table_spec.model_cls.from_airtable(**raw)
+                client.table_spec.model_cls.from_airtable_read_only(**raw)
             except pydantic.error_wrappers.ValidationError as e:
                 for issue in e.errors():
                     validation_issues[(issue["loc"], issue["type"])].append(
@@ -1,40 +1,126 @@
+import concurrent.futures
+import threading
+import time
 from typing import ClassVar, Text
 
-from google.auth.exceptions import DefaultCredentialsError
-from google.cloud import secretmanager
 from pydantic import BaseModel, SecretBytes, SecretStr
 import structlog
 
-from .settings import GoogleCloudSettings
+from .settings import GoogleCloudSettings, get_settings
 
 
 logger = structlog.get_logger(__name__)
 
+DEFAULT_SECRETS_TTL = 10 * 60.0
+"""How long fetched secrets are cached for, in seconds"""
+
 
 class InvalidCredentialsError(Exception):
     """No valid credentials for Secret Manager API available."""
 
 
-class SecretsClient:
-    def __init__(self, settings=GoogleCloudSettings()):
-        # If we don't have credentials, construct a non-working SecretsClient,
-        # we'll fail later if something tries to fetch secrets, but that
-        # doesn't happen during unit tests.
+class SecretsCache:
+    """A thread-safe cache of secret values, which expire after a TTL
+
+    Concurrent lookups of a missing value share a single fetch.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._values = {}
+        self._pending = {}
+        # Bumped by invalidations, so that fetches started before an
+        # invalidation don't cache stale values
+        self._generation = 0
+
+    def get(self, key, fetch, ttl):
+        """Returns the cached value of `key`, calling `fetch` if needed"""
+        with self._lock:
+            if key in self._values:
+                value, expires_at = self._values[key]
+                if expires_at > self._clock():
+                    return value
+            future = self._pending.get(key)
+            is_fetching = future is None
+            if is_fetching:
+                future = self._pending[key] = concurrent.futures.Future()
+            generation = self._generation
+
+        if not is_fetching:
+            return future.result()
+
         try:
-            self._client = secretmanager.SecretManagerServiceClient()
-        except DefaultCredentialsError:
-            logger.warning(
-                "Could not connect to Secret manager with default "
-                "credentials. Secrets will be unavailable."
-            )
-            self._client = None
-        self._project_id = settings.project_id
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            if generation == self._generation:
+                self._values[key] = (value, self._clock() + ttl)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, predicate=None):
+        """Drops the values whose key matches `predicate`, or every value"""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._values):
+                if predicate is None or predicate(key):
+                    del self._values[key]
+
+
+_SECRETS_CACHE = SecretsCache()
+
+
+class SecretsClient:
+    """Fetches and stores secrets in Secret Manager
+
+    The Secret Manager client (and its dependencies) is only loaded when a
+    secret is first accessed, so constructing a `SecretsClient` is cheap.
+
+    Secrets are cached for `ttl` seconds, in a cache shared by the whole
+    process unless a `cache` (`SecretsCache`) is provided. Storing a secret
+    invalidates it, see `invalidate` to do so explicitly.
+    """
+
+    def __init__(self, settings=None, ttl=DEFAULT_SECRETS_TTL, cache=None):
+        self._settings = settings
+        self._client = None
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self._cache = cache if cache is not None else _SECRETS_CACHE
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from google.auth.exceptions import DefaultCredentialsError
+                from google.cloud import secretmanager
+
+                try:
+                    self._client = secretmanager.SecretManagerServiceClient()
+                except DefaultCredentialsError as e:
+                    logger.warning(
+                        "Could not connect to Secret manager with default "
+                        "credentials."
+                    )
+                    raise InvalidCredentialsError() from e
+            return self._client
+
+    @property
+    def _project_id(self):
+        if self._settings is None:
+            self._settings = get_settings(GoogleCloudSettings)
+        return self._settings.project_id
 
     def set_secret(self, name, value):
-        if self._client is None:
-            raise InvalidCredentialsError()
-        secret_path = self._client.secret_path(self._project_id, name)
-        self._client.add_secret_version(
+        client = self._get_client()
+        secret_path = client.secret_path(self._project_id, name)
+        client.add_secret_version(
             {
                 "parent": secret_path,
                 "payload": {
@@ -42,17 +128,46 @@ class SecretsClient:
                 },
             }
         )
+        self.invalidate(name)
         return self.get_secret(name)
 
-    def get_secret(self, name):
-        if self._client is None:
-            raise InvalidCredentialsError()
-        latest_secret_path = self._client.secret_version_path(
+    def _fetch_secret(self, name):
+        client = self._get_client()
+        latest_secret_path = client.secret_version_path(
             self._project_id, name, "latest"
         )
-        res = self._client.access_secret_version({"name": latest_secret_path})
+        res = client.access_secret_version({"name": latest_secret_path})
         return res.payload.data.decode("UTF-8")
 
+    def get_secret(self, name):
+        project_id = self._project_id
+        return self._cache.get(
+            (project_id, name), lambda: self._fetch_secret(name), self.ttl
+        )
+
+    def invalidate(self, name=None):
+        """Drops a cached secret, or every cached secret of the project"""
+        project_id = self._project_id
+
+        def matches(key):
+            return key[0] == project_id and (name is None or key[1] == name)
+
+        self._cache.invalidate(matches)
+
+    def preload(self, names):
+        """Fetches secrets concurrently, so that later lookups are cached
+
+        Typically called at startup, with every secret an invocation needs.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(names), thread_name_prefix="preload-secrets"
+        ) as executor:
+            # NOTE that this raises the first error, if any
+            list(executor.map(self.get_secret, names))
+
 
 class BaseSecret(BaseModel):
     """Helper base class for loading secrets and validating with pydantic.
@@ -69,8 +184,10 @@ class BaseSecret(BaseModel):
         underscore_attrs_are_private = True
 
     @classmethod
-    def load(cls, secrets_client=SecretsClient()):
+    def load(cls, secrets_client=None):
         """Load a secret from Secret Manager."""
+        if secrets_client is None:
+            secrets_client = SecretsClient()
         data = secrets_client.get_secret(cls._secret_name)
         secrets = cls.parse_raw(data)
         secrets._secrets_client = secrets_client
@@ -91,7 +208,10 @@ class BaseSecret(BaseModel):
         return value
 
     def save(self):
-        """Save the current secret back to Secret Manager."""
+        """Save the current secret back to Secret Manager.
+
+        The secret's cached value is invalidated, so later loads see it.
+        """
         payload = self.json(encoder=self._plaintext_encode)
         self._secrets_client.set_secret(self._secret_name, payload)
 
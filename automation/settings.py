@@ -1,6 +1,9 @@
 import os
+from pathlib import Path
+import threading
 
 import pydantic
+from pydantic.env_settings import SettingsError, read_env_file
 
 
 AUTOMATION_ENV = os.environ.get("AUTOMATION_ENV", "dev")
@@ -24,10 +27,22 @@ class BaseConfig:
 
     This way, in .env files or in the process environment, `foo_my_var` will
     control that setting.
+
+    Env files are only read once per process, see `reload_settings`.
     """
 
     env_file = f"environments/{AUTOMATION_ENV}.env"
 
+    @classmethod
+    def customise_sources(
+        cls, init_settings, env_settings, file_secret_settings
+    ):
+        return (
+            init_settings,
+            _CachedEnvSettingsSource(env_settings.env_file),
+            file_secret_settings,
+        )
+
 
 class GoogleCloudSettings(pydantic.BaseSettings):
     project_id: str
@@ -36,11 +51,108 @@ class GoogleCloudSettings(pydantic.BaseSettings):
         env_prefix = "google_cloud_"
 
 
+###########
+# LOADING #
+###########
+
+_ENV_VARS = {}
+"""Variables of the env files and environment, by env file"""
+
+_SETTINGS_VALUES = {}
+"""Parsed values of settings classes, by settings class and env file"""
+
+_SETTINGS = {}
+"""Settings loaded by `get_settings`, by settings class"""
+
+_LOCK = threading.Lock()
+
+
+def get_settings(settings_cls):
+    """Returns the settings of a class, only loaded once per process"""
+    with _LOCK:
+        settings = _SETTINGS.get(settings_cls)
+    if settings is None:
+        settings = settings_cls()
+        # NOTE that settings loaded concurrently are equal, whichever is kept
+        with _LOCK:
+            settings = _SETTINGS.setdefault(settings_cls, settings)
+    return settings
+
+
+def reload_settings():
+    """Reloads env files, the environment and settings when next used
+
+    For tests which modify them.
+    """
+    with _LOCK:
+        _ENV_VARS.clear()
+        _SETTINGS_VALUES.clear()
+        _SETTINGS.clear()
+
+
+def _get_env_vars(env_file, case_sensitive):
+    key = (env_file, case_sensitive)
+    with _LOCK:
+        if key not in _ENV_VARS:
+            env_vars = dict(os.environ)
+            if not case_sensitive:
+                env_vars = {k.lower(): v for k, v in env_vars.items()}
+            env_path = Path(env_file).expanduser() if env_file else None
+            if env_path is not None and env_path.is_file():
+                # Like pydantic, the environment overrides env files
+                env_vars = {
+                    **read_env_file(env_path, case_sensitive=case_sensitive),
+                    **env_vars,
+                }
+            _ENV_VARS[key] = env_vars
+        return _ENV_VARS[key]
+
+
+class _CachedEnvSettingsSource:
+    """Replaces pydantic's `EnvSettingsSource`, parsing every env file and
+    (JSON) value once rather than for every settings instance
+    """
+
+    def __init__(self, env_file):
+        self.env_file = env_file
+
+    def __call__(self, settings):
+        key = (type(settings), self.env_file)
+        with _LOCK:
+            values = _SETTINGS_VALUES.get(key)
+        if values is None:
+            values = self._parse(settings)
+            with _LOCK:
+                _SETTINGS_VALUES[key] = values
+        return dict(values)
+
+    def _parse(self, settings):
+        config = settings.__config__
+        env_vars = _get_env_vars(self.env_file, config.case_sensitive)
+        values = {}
+        for field in settings.__fields__.values():
+            for env_name in field.field_info.extra["env_names"]:
+                value = env_vars.get(env_name)
+                if value is not None:
+                    break
+            else:
+                continue
+            if field.is_complex():
+                try:
+                    value = config.json_loads(value)
+                except ValueError as e:
+                    raise SettingsError(
+                        f'error parsing JSON for "{env_name}"'
+                    ) from e
+            values[field.alias] = value
+        return values
+
+
 if __name__ == "__main__":
     from .clients import airtable, auth0, sendgrid, slack
 
-    print("Google Cloud:", GoogleCloudSettings())
-    print("Airtable:", airtable.AirtableSettings())
-    print("Auth0:", auth0.Auth0Settings())
-    print("Sendgrid:", sendgrid.SendgridSettings())
-    print("Slack:", slack.SlackSettings())
+    print("Google Cloud:", get_settings(GoogleCloudSettings))
+    print("Airtable:", get_settings(airtable.AirtableSettings))
+    print("Auth0:", get_settings(auth0.Auth0Settings))
+    print("Sendgrid:", get_settings(sendgrid.SendgridSettings))
+    print("Slack:", get_settings(slack.SlackSettings))
@@ -0,0 +1,398 @@
+"""Pluggable stores for state that outlives a single invocation
+
+For example, polling watermarks. Stores hold JSON-serializable values by key,
+backends can be swapped depending on where the automation runs:
+
+- `MemoryStore`, for a single process and tests
+- `JsonFileStore`, a local file, for running locally and tests
+- `SqliteStore`, a local SQLite database, for larger or frequently updated
+  state (e.g. dead letters)
+
+Also includes, on top of any store:
+
+- `DeadLetterQueue`, of failed records
+- `LeaseManager`, of expiring leases (e.g. on polling a table), so that
+  overlapping invocations don't do the same work. Leases are only exclusive
+  across processes with a store shared by those processes, like `SqliteStore`
+"""
+
+import abc
+import json
+import os
+from pathlib import Path
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import NamedTuple
+import uuid
+
+
+class KeyValueStore(abc.ABC):
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        ...
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key):
+        ...
+
+    @abc.abstractmethod
+    def keys(self, prefix=""):
+        """Returns the sorted keys starting with `prefix`"""
+        ...
+
+    @abc.abstractmethod
+    def compare_and_set(self, key, expected, value):
+        """Atomically sets a key to `value` if its value is `expected`
+
+        `None` stands for a missing key, both as `expected` and `value`.
+        Returns whether the key was set.
+        """
+        ...
+
+
+class MemoryStore(KeyValueStore):
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key, value):
+        # Round trip through json so values behave like other backends
+        with self._lock:
+            self._data[key] = json.loads(json.dumps(value))
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def keys(self, prefix=""):
+        with self._lock:
+            return sorted(k for k in self._data if k.startswith(prefix))
+
+    def compare_and_set(self, key, expected, value):
+        with self._lock:
+            if self._data.get(key) != expected:
+                return False
+            if value is None:
+                self._data.pop(key, None)
+            else:
+                self._data[key] = json.loads(json.dumps(value))
+            return True
+
+
+class JsonFileStore(KeyValueStore):
+    """Stores all values in a single JSON file
+
+    Writes replace the file atomically, so a crash never leaves a partially
+    written file behind. NOTE that `compare_and_set` is only atomic within a
+    process.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with self.path.open() as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, data):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.path.parent, prefix=self.path.name
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._read().get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            data = self._read()
+            data[key] = value
+            self._write(data)
+
+    def delete(self, key):
+        with self._lock:
+            data = self._read()
+            if key in data:
+                del data[key]
+                self._write(data)
+
+    def keys(self, prefix=""):
+        with self._lock:
+            return sorted(k for k in self._read() if k.startswith(prefix))
+
+    def compare_and_set(self, key, expected, value):
+        with self._lock:
+            data = self._read()
+            if data.get(key) != expected:
+                return False
+            if value is None:
+                data.pop(key, None)
+            else:
+                data[key] = value
+            self._write(data)
+            return True
+
+
+class SqliteStore(KeyValueStore):
+    """Stores values as JSON in a table of a SQLite database
+
+    Unlike `JsonFileStore`, writes only touch the modified key, and
+    `compare_and_set` is atomic across processes sharing the database.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            str(self.path), check_same_thread=False
+        )
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS store "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM store WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+    def set(self, key, value):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO store (key, value) VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+
+    def delete(self, key):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM store WHERE key = ?", (key,))
+
+    def keys(self, prefix=""):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key FROM store WHERE substr(key, 1, ?) = ? "
+                "ORDER BY key",
+                (len(prefix), prefix),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def compare_and_set(self, key, expected, value):
+        with self._lock:
+            # Take the database's write lock before reading, so no other
+            # process can write in between
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT value FROM store WHERE key = ?", (key,)
+                ).fetchone()
+                current = json.loads(row[0]) if row is not None else None
+                if current != expected:
+                    self._connection.rollback()
+                    return False
+
+                if value is None:
+                    self._connection.execute(
+                        "DELETE FROM store WHERE key = ?", (key,)
+                    )
+                else:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO store (key, value) "
+                        "VALUES (?, ?)",
+                        (key, json.dumps(value)),
+                    )
+                self._connection.commit()
+                return True
+            except BaseException:
+                self._connection.rollback()
+                raise
+
+    def close(self):
+        self._connection.close()
+
+
+class DeadLetterQueue:
+    """Records whose callbacks failed, kept until they're retried
+
+    Entries are JSON-serializable dicts, stored in a `KeyValueStore` by queue
+    (e.g. a base and table) and record id.
+    """
+
+    def __init__(self, store, prefix="dead_letter"):
+        self.store = store
+        self.prefix = prefix
+
+    def _key(self, queue, record_id):
+        return f"{self.prefix}/{queue}/{record_id}"
+
+    def get(self, queue, record_id):
+        return self.store.get(self._key(queue, record_id))
+
+    def put(self, queue, record_id, entry):
+        self.store.set(self._key(queue, record_id), entry)
+
+    def remove(self, queue, record_id):
+        self.store.delete(self._key(queue, record_id))
+
+    def entries(self, queue):
+        """Returns the entries of a queue, by record id"""
+        prefix = self._key(queue, "")
+        return {
+            key[len(prefix) :]: entry
+            for key in self.store.keys(prefix)
+            if (entry := self.store.get(key)) is not None
+        }
+
+
+class Lease(NamedTuple):
+    name: str
+    owner: str
+    token: int
+    """Fencing token, increases every time the lease changes hands"""
+    expires_at: float
+    """Expiry, as a `time.time` timestamp"""
+
+
+def get_default_lease_owner():
+    """Returns an owner name unique to this process and invocation"""
+    return f"{socket.gethostname()}/{os.getpid()}/{uuid.uuid4().hex[:8]}"
+
+
+class LeaseManager:
+    """Expiring leases, stored in a `KeyValueStore` by name
+
+    A lease is held by a single owner until it's released or expires. Every
+    acquisition gets a higher fencing token than the previous one, so an owner
+    whose lease expired can't renew or release the lease of the next owner.
+    Released leases are kept (expired) in the store for that reason.
+    """
+
+    def __init__(self, store, prefix="lease", owner=None, clock=time.time):
+        self.store = store
+        self.prefix = prefix
+        self.owner = owner or get_default_lease_owner()
+        self._clock = clock
+
+    def _key(self, name):
+        return f"{self.prefix}/{name}"
+
+    def _replace(self, lease, entry):
+        """Replaces the entry of a lease that is still held"""
+        key = self._key(lease.name)
+        current = self.store.get(key)
+        if (
+            current is None
+            or current["owner"] != lease.owner
+            or current["token"] != lease.token
+        ):
+            return False
+        return self.store.compare_and_set(key, current, entry)
+
+    def acquire(self, name, ttl):
+        """Acquires a lease for `ttl` seconds, returns `None` if it's held"""
+        key = self._key(name)
+        current = self.store.get(key)
+        now = self._clock()
+        if current is not None and current["expires_at"] > now:
+            return None
+
+        lease = Lease(
+            name,
+            self.owner,
+            (current["token"] if current is not None else 0) + 1,
+            now + ttl,
+        )
+        entry = {
+            "owner": lease.owner,
+            "token": lease.token,
+            "expires_at": lease.expires_at,
+        }
+        # NOTE that if another owner acquired the lease since we read it, the
+        # entry changed and we lose the race
+        if not self.store.compare_and_set(key, current, entry):
+            return None
+        return lease
+
+    def renew(self, lease, ttl):
+        """Extends a lease by `ttl` seconds from now, returns the renewed
+        lease or `None` if it was lost
+        """
+        if lease.expires_at <= self._clock():
+            return None
+        renewed = lease._replace(expires_at=self._clock() + ttl)
+        entry = {
+            "owner": renewed.owner,
+            "token": renewed.token,
+            "expires_at": renewed.expires_at,
+        }
+        return renewed if self._replace(lease, entry) else None
+
+    def keep(self, lease, ttl):
+        """Renews a lease once less than half of `ttl` is left, returns the
+        current lease or `None` if it was lost
+        """
+        if lease.expires_at - self._clock() >= ttl / 2:
+            return lease
+        return self.renew(lease, ttl)
+
+    def release(self, lease):
+        """Releases a lease, unless it was lost"""
+        self._replace(
+            lease,
+            {"owner": lease.owner, "token": lease.token, "expires_at": 0},
+        )
+
+    def prune(self, prefix=""):
+        """Deletes the expired leases whose name starts with `prefix`, returns
+        the number of leases deleted
+
+        NOTE that pruned leases start over from the first fencing token, so
+        only leases that are short-lived and owned once (e.g. on processing a
+        record) should be pruned.
+        """
+        num_pruned = 0
+        now = self._clock()
+        for key in self.store.keys(self._key(prefix)):
+            current = self.store.get(key)
+            if current is None or current["expires_at"] > now:
+                continue
+            # NOTE that leases acquired since we read them are kept
+            if self.store.compare_and_set(key, current, None):
+                num_pruned += 1
+        return num_pruned
+
+    def is_held(self, lease):
+        """Returns whether a lease is still held by its owner"""
+        current = self.store.get(self._key(lease.name))
+        return (
+            current is not None
+            and current["owner"] == lease.owner
+            and current["token"] == lease.token
+            and current["expires_at"] > self._clock()
+        )
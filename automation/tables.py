@@ -1,39 +1,93 @@
 import abc
+import concurrent.futures
+import functools
 from functools import cached_property
 
+import structlog
+
 from . import models
-from .functions import delivery, inbound, members
-from .clients import airtable, auth0, sendgrid, slack
+from .clients import airtable
+from .registry import Registry
 from .secrets import SecretsClient
 
+# NOTE that the other clients and the functions are imported when first used,
+# since their dependencies (sendgrid, slack_sdk, jinja2, etc.) are slow to
+# import and not every table needs them
+
+logger = structlog.get_logger(__name__)
+
+CLIENT_TTL = 60 * 60.0
+"""How long clients are reused for when shared through a registry"""
+
+INVENTORY_TTL = 10 * 60.0
+"""How long the inventory is reused for, since it can be edited at any time
+"""
+
 
 class PollableTable(abc.ABC):
 
     table_spec = ...
 
+    max_workers = 1
+    """Number of records processed concurrently, callbacks must be
+    thread-safe if greater than 1
+    """
+
+    secret_names = ("airtable",)
+    """Secrets needed to poll the table, preloaded before polling"""
+
     def __init__(
         self,
         read_only=False,
         *,
-        secrets_client=SecretsClient(),
-        airtable_settings=airtable.AirtableSettings(),
-        auth0_settings=auth0.Auth0Settings(),
-        slack_settings=slack.SlackSettings(),
-        delivery_settings=delivery.DeliverySettings(),
+        secrets_client=None,
+        airtable_settings=None,
+        auth0_settings=None,
+        slack_settings=None,
+        delivery_settings=None,
+        watermark_store=None,
+        dead_letter_queue=None,
+        checkpoint_store=None,
+        time_budget=None,
+        lease_manager=None,
+        record_leases=False,
+        shard=None,
+        max_workers=None,
+        registry=None,
     ):
         self.read_only = read_only
-        self.secrets_client = secrets_client
+        # NOTE that settings left as `None` are loaded by the clients using
+        # them
+        self.secrets_client = (
+            secrets_client if secrets_client is not None else SecretsClient()
+        )
         self.airtable_settings = airtable_settings
         self.auth0_settings = auth0_settings
         self.slack_settings = slack_settings
         self.delivery_settings = delivery_settings
+        self.watermark_store = watermark_store
+        self.dead_letter_queue = dead_letter_queue
+        self.checkpoint_store = checkpoint_store
+        self.time_budget = time_budget
+        self.lease_manager = lease_manager
+        self.record_leases = record_leases
+        self.shard = shard
+        if max_workers is not None:
+            self.max_workers = max_workers
+        self.registry = registry if registry is not None else Registry()
+        """Clients (and the inventory) used to poll the table, can be shared
+        between tables with the same settings and kept between invocations
+        """
+
+        self.session = None
+        """The `airtable.AirtableSession` of the current poll"""
 
     @classmethod
     def get_airtable(
         cls,
         read_only=False,
-        secrets_client=SecretsClient(),
-        settings=airtable.AirtableSettings(),
+        secrets_client=None,
+        settings=None,
     ):
         return cls.table_spec.get_airtable_client(
             read_only=read_only,
@@ -41,13 +95,68 @@ class PollableTable(abc.ABC):
             settings=settings,
         )
 
+    def get_table_client(self, table_spec, read_only):
+        """Returns the (possibly shared) airtable client for a table"""
+        return self.registry.get(
+            ("airtable", table_spec.name, read_only),
+            functools.partial(
+                table_spec.get_airtable_client,
+                read_only=read_only,
+                secrets_client=self.secrets_client,
+                settings=self.airtable_settings,
+            ),
+            ttl=CLIENT_TTL,
+        )
+
+    def _get_client(self):
+        return self.get_table_client(self.table_spec, self.read_only)
+
+    def _run_in_session(self, func, **kwargs):
+        # Records looked up by callbacks are shared for the whole poll, and
+        # any modifications to them are written back at the end
+        with airtable.AirtableSession() as session:
+            self.session = session
+            try:
+                return func(
+                    self.on_status_update,
+                    session=session,
+                    max_workers=self.max_workers,
+                    **kwargs,
+                )
+            finally:
+                self.session = None
+
     def poll_table(self):
-        client = self.get_airtable(
-            self.read_only,
-            secrets_client=self.secrets_client,
-            settings=self.airtable_settings,
+        _preload_secrets(self.secrets_client, self.secret_names)
+        try:
+            return self._run_in_session(
+                self._get_client().poll_table,
+                watermark_store=self.watermark_store,
+                dead_letter_queue=self.dead_letter_queue,
+                checkpoint_store=self.checkpoint_store,
+                time_budget=self.time_budget,
+                lease_manager=self.lease_manager,
+                record_leases=self.record_leases,
+                shard=self.shard,
+            )
+        except Exception:
+            # Start the next poll of the table from a fresh client, in case it
+            # is what broke (e.g. expired credentials). NOTE that clients
+            # shared with other tables are kept, since their polls may be
+            # running fine
+            self.registry.invalidate(
+                lambda key: key[:2] == ("airtable", self.table_spec.name)
+            )
+            raise
+
+    def replay_dead_letters(self, record_ids=None):
+        return self._run_in_session(
+            functools.partial(
+                self._get_client().replay_dead_letters,
+                dead_letter_queue=self.dead_letter_queue,
+                record_ids=record_ids,
+            )
         )
-        return client.poll_table(self.on_status_update)
 
     @abc.abstractmethod
     def on_status_update(self, record):
@@ -55,24 +164,48 @@ class PollableTable(abc.ABC):
 
 
 class SlackMixin:
-    @cached_property
+    @property
     def slack_client(self):
-        return slack.SlackClient(
-            secrets_client=self.secrets_client, settings=self.slack_settings
+        from .clients import slack
+
+        return self.registry.get(
+            ("slack",),
+            functools.partial(
+                slack.SlackClient,
+                secrets_client=self.secrets_client,
+                settings=self.slack_settings,
+            ),
+            ttl=CLIENT_TTL,
         )
 
 
 class EmailMixin:
-    @cached_property
+    @property
     def sendgrid_client(self):
-        return sendgrid.SendgridClient(secrets_client=self.secrets_client)
+        from .clients import sendgrid
+
+        return self.registry.get(
+            ("sendgrid",),
+            functools.partial(
+                sendgrid.SendgridClient, secrets_client=self.secrets_client
+            ),
+            ttl=CLIENT_TTL,
+        )
 
 
 class Auth0Mixin:
-    @cached_property
+    @property
     def auth0_client(self):
-        return auth0.Auth0Client(
-            secrets_client=self.secrets_client, settings=self.auth0_settings
+        from .clients import auth0
+
+        return self.registry.get(
+            ("auth0",),
+            functools.partial(
+                auth0.Auth0Client,
+                secrets_client=self.secrets_client,
+                settings=self.auth0_settings,
+            ),
+            ttl=CLIENT_TTL,
         )
 
 
@@ -84,6 +217,8 @@ class Inbound(PollableTable):
     )
 
     def on_status_update(self, record):
+        from .functions import inbound
+
         inbound.on_new(record)
 
 
@@ -94,7 +229,15 @@ class Members(PollableTable, SlackMixin, EmailMixin, Auth0Mixin):
         model_cls=models.MemberModel,
     )
 
+    # NOTE that new members wait on slack, auth0 and sendgrid, so they are
+    # processed concurrently
+    max_workers = 4
+
+    secret_names = ("airtable", "slack", "sendgrid", "auth0")
+
     def on_status_update(self, record):
+        from .functions import members
+
         if record.status == "New":
             members.on_new(
                 record,
@@ -111,24 +254,32 @@ class Intake(PollableTable, EmailMixin):
         model_cls=models.IntakeModel,
     )
 
-    @cached_property
+    secret_names = ("airtable", "sendgrid")
+
+    @property
     def member_table(self):
-        return Members.get_airtable(
-            True,
-            secrets_client=self.secrets_client,
-            settings=self.airtable_settings,
-        )
+        return self.get_table_client(Members.table_spec, True)
 
     @cached_property
     def inventory(self):
-        items = ITEMS_BY_HOUSEHOLD_SIZE.get_airtable_client(
-            True,
-            secrets_client=self.secrets_client,
-            settings=self.airtable_settings,
+        from .functions import delivery
+
+        def load():
+            items = self.get_table_client(ITEMS_BY_HOUSEHOLD_SIZE, True)
+            return delivery.Inventory(items)
+
+        # NOTE that the inventory is cached for the whole poll, so every
+        # record of a poll gets the same one
+        return self.registry.get(
+            ("inventory",),
+            load,
+            ttl=INVENTORY_TTL,
+            health_check=lambda inventory: bool(inventory.categories),
         )
-        return delivery.Inventory(items)
 
     def on_status_update(self, record):
+        from .functions import delivery
+
         if record.status == "Assigned / In Progress":
             delivery.on_assigned(
                 record,
@@ -136,6 +287,7 @@ class Intake(PollableTable, EmailMixin):
                 inventory=self.inventory,
                 sendgrid_client=self.sendgrid_client,
                 settings=self.delivery_settings,
+                session=self.session,
             )
 
 
@@ -156,3 +308,81 @@ POLLABLE_TABLES = {
     "members": Members,
     "intake": Intake,
 }
+
+# NOTE that inbound isn't polled by default until it has a handler that does
+# more than printing its records
+DEFAULT_POLLED_TABLES = ("members", "intake")
+"""Tables polled by `poll_tables` unless others are provided"""
+
+
+def _preload_secrets(secrets_client, secret_names):
+    # NOTE that secrets which fail to load here are loaded again when used,
+    # so that a poll only fails if it actually needs them
+    try:
+        secrets_client.preload(secret_names)
+    except Exception:
+        logger.warning("Could not preload secrets", exc_info=True)
+
+
+def poll_tables(names=None, **options):
+    """Polls tables concurrently, returns whether each poll succeeded by name
+
+    Every table in `DEFAULT_POLLED_TABLES` is polled, unless `names` is
+    provided. Tables share one secrets client and one registry of clients
+    (and so each base's rate limiter and connections). `options` are passed
+    to every table, see `PollableTable`. How much each base's rate limiter
+    throttled the polls is logged once they're done.
+    """
+    if names is None:
+        names = list(DEFAULT_POLLED_TABLES)
+    if options.get("secrets_client") is None:
+        options["secrets_client"] = SecretsClient()
+    if options.get("registry") is None:
+        options["registry"] = Registry()
+
+    # Fetch the secrets of every table at once, rather than one table after
+    # the other
+    _preload_secrets(
+        options["secrets_client"],
+        [
+            secret_name
+            for name in names
+            for secret_name in POLLABLE_TABLES[name].secret_names
+        ],
+    )
+
+    rate_limiter_stats = airtable.get_rate_limiter_stats()
+
+    def poll(name):
+        try:
+            return POLLABLE_TABLES[name](**options).poll_table()
+        except Exception:
+            logger.exception("Polling raised", table=name)
+            return False
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(names), thread_name_prefix="poll-tables"
+    ) as executor:
+        results = dict(zip(names, executor.map(poll, names)))
+
+    for name, success in results.items():
+        logger.info(
+            "Polling complete" if success else "Polling failed", table=name
+        )
+    _log_rate_limiter_stats(rate_limiter_stats)
+    return results
+
+
+def _log_rate_limiter_stats(previous_stats):
+    # NOTE that rate limiters are shared by the whole process, so only what
+    # they counted since `previous_stats` is logged
+    for base_id, stats in airtable.get_rate_limiter_stats().items():
+        previous = previous_stats.get(base_id, {})
+        logger.info(
+            "Airtable rate limiter stats",
+            base_id=base_id,
+            **{
+                name: value - previous.get(name, 0)
+                for name, value in stats.items()
+            },
+        )
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 import random
+import re
 import string
 
 from automation.clients.airtable import BaseModelState
@@ -10,6 +11,15 @@ from ..models import MemberModel
 
 TEST_ENV = "environments/test.env"
 
+SHARD_FORMULA_RE = re.compile(
+    r"MOD\(FIND\(MID\(RECORD_ID\(\), LEN\(RECORD_ID\(\)\) - 1, 1\), "
+    r'"(\w+)"\) \* (\d+) \+ FIND\(RIGHT\(RECORD_ID\(\), 1\), "(\w+)"\), '
+    r"(\d+)\) = (\d+)"
+)
+"""Matches `airtable.Shard` formulas, capturing their alphabets, base, count
+and index
+"""
+
 
 class MockSecretsClient:
     def __init__(self, **secrets):
@@ -21,6 +31,10 @@ class MockSecretsClient:
     def get_secret(self, name):
         return self.secrets[name]
 
+    def preload(self, names):
+        for name in names:
+            self.get_secret(name)
+
 
 def get_random_string(length=16):
     return "".join(random.choices(list(string.ascii_lowercase), k=length))
@@ -63,3 +77,26 @@ def get_random_slack_user_from_member(member):
             display_name=get_random_string(),
         ),
     )
+
+
+def _airtable_find(needle, haystack):
+    # NOTE that airtable's FIND is 1-based, and returns 0 when not found
+    return haystack.find(needle) + 1
+
+
+def new_status_formula_filter(formula, record):
+    """Evaluates `paginate_all_with_new_status` formulas for the fake server
+
+    Shard formulas are evaluated like airtable would, rather than with
+    `Shard.contains`, so tests check the formula actually sent.
+    """
+    fields = record["fields"]
+    if fields.get("Status") == fields.get("_meta_last_seen_status"):
+        return False
+    match = SHARD_FORMULA_RE.search(formula)
+    if match is None:
+        return True
+    high_alphabet, base, low_alphabet, count, index = match.groups()
+    high = _airtable_find(record["id"][-2], high_alphabet)
+    low = _airtable_find(record["id"][-1], low_alphabet)
+    return (high * int(base) + low) % int(count) == int(index)
@@ -1,9 +1,16 @@
 import json
+import threading
+import time
 
+import pydantic
 import pytest
+import requests
 from unittest import mock
 
 from ..clients import airtable
+from ..models import IntakeModel
+from ..scripts.fake_airtable import FakeAirtable
+from ..stores import DeadLetterQueue, LeaseManager, MemoryStore
 
 from .helpers import (
     TEST_ENV,
@@ -11,6 +18,7 @@ from .helpers import (
     get_random_string,
     get_random_airtable_id,
     get_random_created_at,
+    new_status_formula_filter,
 )
 
 #########
@@ -39,6 +47,18 @@ TEST_SECRETS_CLIENT = MockSecretsClient(airtable=json.dumps({"api_key": ""}))
 TEST_SETTINGS = airtable.AirtableSettings(_env_file=TEST_ENV)
 
 
+def to_airtable_by_json_round_trip(model, modified_only=False):
+    """How `BaseModel.to_airtable` used to serialize models"""
+    return json.loads(
+        model.json(
+            by_alias=True,
+            exclude_none=True,
+            include=model.modified_fields if modified_only else None,
+            exclude={"state", "id", "created_at", "modified_fields", "_meta"},
+        )
+    )
+
+
 #########
 # TESTS #
 #########
@@ -87,6 +107,30 @@ def test_model_modified_fields_empty_on_new():
     assert test_model.modified_fields == set()
 
 
+def test_model_modified_fields_multiple():
+    test_model = FooModel(
+        state=airtable.BaseModelState.CLEAN,
+        id=get_random_airtable_id(),
+        created_at=get_random_created_at(),
+        name="foo",
+        status="New",
+    )
+    test_model.name = "bar"
+    test_model.status = "Processed"
+    assert test_model.modified_fields == {"name", "status"}
+    test_model.name = "foo"
+    assert test_model.modified_fields == {"status"}
+    assert test_model.state == airtable.BaseModelState.DIRTY
+    test_model.status = "New"
+    assert test_model.modified_fields == set()
+    assert test_model.state == airtable.BaseModelState.CLEAN
+
+    # Setting the state doesn't override modifications
+    test_model.name = "bar"
+    test_model.state = airtable.BaseModelState.CLEAN
+    assert test_model.state == airtable.BaseModelState.DIRTY
+
+
 def test_model_new_invalid_field_error():
     # Control
     FooModel.new(status="New")
@@ -125,10 +169,133 @@ def test_snapshot_basic():
     assert test_model.modified_fields == set()
 
 
-def test_incompatible_state_errors():
-    with mock.patch("airtable.Airtable.insert"), mock.patch(
-        "airtable.Airtable.update"
+def test_snapshot_copies():
+    test_model = FooModel(
+        state=airtable.BaseModelState.CLEAN,
+        id=get_random_airtable_id(),
+        created_at=get_random_created_at(),
+        status="New",
+    )
+    test_model.name = "bar"
+    copy = test_model.copy()
+
+    # Copies don't share their snapshot or modified fields with the original
+    copy.snapshot()
+    copy.status = "Processed"
+    assert test_model.modified_fields == {"name"}
+    assert test_model.state == airtable.BaseModelState.DIRTY
+    assert test_model.last_snapshot["name"] != "bar"
+    assert copy.modified_fields == {"status"}
+
+
+def test_snapshot_frozen():
+    test_model = IntakeModel.from_airtable(
+        id=get_random_airtable_id(),
+        createdTime=get_random_created_at().isoformat(),
+        fields={
+            "Ticket ID": "1234",
+            "record ID": "rec1234",
+            "Food Options": ["Rice"],
+        },
+    )
+
+    assert test_model.last_snapshot["food_options"] == ("Rice",)
+    with pytest.raises(TypeError):
+        test_model.last_snapshot["food_options"] = ("Beans",)
+
+    # Modifying the model in place doesn't modify the snapshot
+    test_model.food_options.append("Beans")
+    assert test_model.last_snapshot["food_options"] == ("Rice",)
+
+    test_model.snapshot()
+    assert test_model.last_snapshot["food_options"] == ("Rice", "Beans")
+    assert test_model.state == airtable.BaseModelState.CLEAN
+
+
+def test_read_only_records():
+    raw = {
+        "id": get_random_airtable_id(),
+        "createdTime": get_random_created_at().isoformat(),
+        "fields": {
+            "Ticket ID": "1234",
+            "record ID": "rec1234",
+            "Status": "Seeking Volunteer",
+            "Household Size": "3",
+            "Food Options": ["Rice", "Beans"],
+        },
+    }
+
+    with mock.patch.object(
+        airtable.AirtableTransport, "_request", return_value=raw
     ):
+        client = airtable.TableSpec(
+            name="foo", model_cls=IntakeModel
+        ).get_airtable_client(
+            read_only=True,
+            secrets_client=TEST_SECRETS_CLIENT,
+            settings=TEST_SETTINGS,
+        )
+        record = client.get(raw["id"], read_only_records=True)
+
+    model = IntakeModel.from_airtable(**raw)
+    assert isinstance(record, airtable.ReadOnlyRecord)
+    assert record.model_cls is IntakeModel
+    assert record.id == model.id
+    assert record.created_at == model.created_at
+    assert record.household_size == 3
+    assert record.food_options == ("Rice", "Beans")
+    assert record == IntakeModel.from_airtable_read_only(**raw)
+
+    # Records are immutable and don't keep a `__dict__`
+    with pytest.raises(TypeError):
+        record.household_size = 4
+    assert not hasattr(record, "__dict__")
+
+    # Records are validated like models
+    with pytest.raises(pydantic.ValidationError):
+        IntakeModel.from_airtable_read_only(
+            **{**raw, "fields": {**raw["fields"], "Status": "Invalid"}}
+        )
+
+
+def test_to_airtable_matches_json_round_trip():
+    test_model = IntakeModel.from_airtable(
+        id=get_random_airtable_id(),
+        createdTime=get_random_created_at().isoformat(),
+        fields={
+            "Ticket ID": "1234",
+            "record ID": "rec1234",
+            "Status": "Seeking Volunteer",
+            "_meta": json.dumps({"a": [1, 2.5, None], "b": {"c": True}}),
+            "Household Size": 3,
+            "Food Options": ["Rice", "Beans"],
+            "Completion_Date": "2021-01-01",
+        },
+    )
+
+    def assert_matches(modified_only):
+        fields = test_model.to_airtable(modified_only=modified_only)["fields"]
+        # Compare the dumped JSON, so that key order and types must match
+        assert json.dumps(fields) == json.dumps(
+            to_airtable_by_json_round_trip(test_model, modified_only)
+        )
+
+    assert_matches(modified_only=False)
+    assert_matches(modified_only=True)
+
+    test_model.food_options = ["Rice", "Beans", "Eggs"]
+    test_model.household_size = 4
+    test_model.date_completed = None
+    assert_matches(modified_only=False)
+    assert_matches(modified_only=True)
+    assert test_model.to_airtable(modified_only=True)["fields"] == {
+        "Household Size": 4,
+        "Food Options": ["Rice", "Beans", "Eggs"],
+    }
+
+
+def test_incompatible_state_errors():
+    with mock.patch.object(airtable.AirtableTransport, "_request"):
         client = FOO.get_airtable_client(
             secrets_client=TEST_SECRETS_CLIENT,
             settings=TEST_SETTINGS,
@@ -155,12 +322,383 @@ def test_incompatible_state_errors():
             )
 
 
+def fake_airtable_request(method, url, params=None, json_data=None):
+    """Stand-in for `AirtableTransport._request` that echoes batch writes"""
+    if method == "POST":
+        return {
+            "records": [
+                {
+                    "id": get_random_airtable_id(),
+                    "createdTime": get_random_created_at().isoformat(),
+                    **record,
+                }
+                for record in json_data["records"]
+            ]
+        }
+    elif method == "PATCH":
+        return {
+            "records": [
+                {"createdTime": get_random_created_at().isoformat(), **record}
+                for record in json_data["records"]
+            ]
+        }
+    else:
+        raise NotImplementedError(method)
+
+
+def test_update_many_batches():
+    test_models = [
+        FooModel(
+            state=airtable.BaseModelState.CLEAN,
+            id=get_random_airtable_id(),
+            created_at=get_random_created_at(),
+            status="New",
+        )
+        for _ in range(airtable.AIRTABLE_BATCH_SIZE + 5)
+    ]
+    # Leave the last model clean, it should not be sent
+    for test_model in test_models[:-1]:
+        test_model.status = "Processed"
+
+    with mock.patch.object(
+        airtable.AirtableTransport,
+        "_request",
+        side_effect=fake_airtable_request,
+    ) as mock_request:
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT,
+            settings=TEST_SETTINGS,
+        )
+        client.update_many(test_models)
+
+    assert mock_request.call_count == 2
+    sent = [
+        record
+        for call in mock_request.call_args_list
+        for record in call.kwargs["json_data"]["records"]
+    ]
+    assert [record["id"] for record in sent] == [
+        test_model.id for test_model in test_models[:-1]
+    ]
+    assert all(record["fields"] == {"Status": "Processed"} for record in sent)
+    assert all(
+        test_model.state == airtable.BaseModelState.CLEAN
+        for test_model in test_models
+    )
+
+
+def test_update_many_in_place_modification():
+    test_model = IntakeModel(
+        state=airtable.BaseModelState.CLEAN,
+        id=get_random_airtable_id(),
+        created_at=get_random_created_at(),
+        ticket_id="1234",
+        recordID="rec1234",
+    )
+    test_model.delivery_volunteer.append("rec5678")
+
+    with mock.patch.object(
+        airtable.AirtableTransport,
+        "_request",
+        side_effect=fake_airtable_request,
+    ) as mock_request:
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT,
+            settings=TEST_SETTINGS,
+        )
+        client.update(test_model)
+
+    assert mock_request.call_count == 1
+    (sent,) = mock_request.call_args.kwargs["json_data"]["records"]
+    assert sent["fields"] == {"Delivery Volunteer": ["rec5678"]}
+    assert test_model.state == airtable.BaseModelState.CLEAN
+
+
+def test_insert_many_batches():
+    test_models = [
+        FooModel.new(status="New")
+        for _ in range(airtable.AIRTABLE_BATCH_SIZE + 1)
+    ]
+
+    with mock.patch.object(
+        airtable.AirtableTransport,
+        "_request",
+        side_effect=fake_airtable_request,
+    ) as mock_request:
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT,
+            settings=TEST_SETTINGS,
+        )
+        client.insert_many(test_models)
+
+    assert mock_request.call_count == 2
+    for test_model in test_models:
+        assert test_model.state == airtable.BaseModelState.CLEAN
+        assert test_model.id is not None
+        assert test_model.created_at is not None
+        assert test_model.modified_fields == set()
+
+
+def test_transport_against_fake_server():
+    with FakeAirtable() as fake:
+        fake.add_records(
+            "foo", [{"name": f"foo {i}", "Status": "New"} for i in range(25)]
+        )
+        transport = airtable.AirtableTransport(
+            "fakebaseid", "foo", "fakeapikey", api_url=fake.api_url
+        )
+
+        pages = list(transport.iter_pages(page_size=10, fields=["name"]))
+        assert [len(page.records) for page in pages] == [10, 10, 5]
+        assert pages[0].offset is None
+        assert pages[1].offset == pages[0].next_offset
+        assert pages[-1].next_offset is None
+        assert all(
+            record["fields"].keys() == {"name"}
+            for page in pages
+            for record in page.records
+        )
+
+        record_ids = [r["id"] for page in pages for r in page.records]
+        assert transport.get(record_ids[0])["fields"]["name"] == "foo 0"
+
+        updated = transport.batch_update(
+            [{"id": i, "fields": {"Status": "Processed"}} for i in record_ids]
+        )
+        assert len(updated) == 25
+        assert fake.request_counts["PATCH"] == 3
+
+        inserted = transport.batch_insert([{"name": "bar"}])
+        assert inserted[0]["fields"] == {"name": "bar"}
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            transport.get("recmissing")
+
+    # All requests share a single kept-alive connection
+    assert fake.num_connections == 1
+
+
+def test_get_many():
+    def formula_filter(formula, record):
+        return f"RECORD_ID() = '{record['id']}'" in formula
+
+    with FakeAirtable(formula_filter=formula_filter) as fake:
+        records = fake.add_records(
+            "foo",
+            [{"name": f"foo {i}", "Status": "New"} for i in range(60)],
+        )
+        record_ids = [r["id"] for r in records]
+
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
+        )
+        client.client = airtable.AirtableTransport(
+            "fakebaseid", "foo", "fakeapikey", api_url=fake.api_url
+        )
+
+        # Duplicates are dropped, order is preserved
+        lookup_ids = record_ids[::-1] + record_ids[:5]
+        models = client.get_many(lookup_ids)
+        assert [m.id for m in models] == record_ids[::-1]
+        assert models[0].name == "foo 59"
+        assert fake.request_counts["GET"] == 2
+
+        with pytest.raises(airtable.MissingRecordsError) as e:
+            client.get_many(
+                [record_ids[0], "recmissing", record_ids[1]],
+                read_only_records=True,
+            )
+        assert e.value.missing_ids == ["recmissing"]
+        assert [r.id for r in e.value.records] == record_ids[:2]
+
+
+def test_session_identity_map():
+    def formula_filter(formula, record):
+        return f"RECORD_ID() = '{record['id']}'" in formula
+
+    with FakeAirtable(formula_filter=formula_filter) as fake:
+        record_ids = [
+            r["id"]
+            for r in fake.add_records(
+                "foo",
+                [{"name": f"foo {i}", "Status": "New"} for i in range(3)],
+            )
+        ]
+
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
+        )
+        client.client = airtable.AirtableTransport(
+            "fakebaseid", "foo", "fakeapikey", api_url=fake.api_url
+        )
+
+        with airtable.AirtableSession() as session:
+            model = session.get(client, record_ids[0])
+            assert session.get(client, record_ids[0]) is model
+            assert fake.request_counts["GET"] == 1
+
+            # Records loaded again are the session's instances
+            models = list(session.get_all(client))
+            assert models[0] is model
+            assert session.get_many(client, record_ids[::-1]) == models[::-1]
+            assert fake.request_counts["GET"] == 2
+
+            for m in models:
+                m.status = "Processed"
+            session.add(client, FooModel.new(name="bar", status="New"))
+
+        # Modifications and new models are written back in batches
+        assert fake.request_counts["PATCH"] == 1
+        assert fake.request_counts["POST"] == 1
+        assert all(m.state == airtable.BaseModelState.CLEAN for m in models)
+        assert [
+            r["fields"]["Status"] for r in fake.tables["foo"].values()
+        ] == ["Processed"] * 3 + ["New"]
+
+
+def test_prefetch():
+    fetched = []
+
+    def pages():
+        try:
+            for i in range(100):
+                fetched.append(i)
+                yield i
+        finally:
+            fetched.append("closed")
+
+    prefetched = airtable._prefetch(pages(), 2)
+    assert next(prefetched) == 0
+
+    # The buffer is bounded, at most one more page is fetched and waiting
+    time.sleep(0.2)
+    assert len(fetched) <= 4
+
+    prefetched.close()
+    time.sleep(2 * airtable.PREFETCH_POLL_INTERVAL + 0.1)
+    assert fetched[-1] == "closed"
+
+    def failing_pages():
+        yield 1
+        raise ValueError("failed to fetch page")
+
+    assert list(airtable._prefetch(range(5), 1)) == list(range(5))
+    with pytest.raises(ValueError):
+        list(airtable._prefetch(failing_pages(), 1))
+
+
+def test_paginate_all_projects_model_fields():
+    with mock.patch.object(
+        airtable.AirtableTransport,
+        "_request",
+        return_value={"records": []},
+    ) as mock_request:
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT,
+            settings=TEST_SETTINGS,
+        )
+
+        list(client.get_all_with_new_status())
+        list(client.get_all(fields=["name"]))
+        list(client.get_all(fields=airtable.ALL_FIELDS))
+
+    def get_fields(call):
+        return [v for k, v in call.kwargs["params"] if k == "fields[]"]
+
+    default, override, all_fields = mock_request.call_args_list
+    assert get_fields(default) == [
+        "_meta",
+        "_meta_last_seen_status",
+        "Status",
+        "name",
+    ]
+    assert get_fields(override) == ["name"]
+    assert get_fields(all_fields) == []
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter_throttles_bursts():
+    clock = FakeClock()
+    limiter = airtable.RateLimiter(rate=5, clock=clock, sleep=clock.sleep)
+
+    for _ in range(10):
+        limiter.acquire()
+
+    # The first second's worth of requests go through immediately, the rest
+    # are spaced out at the refill rate
+    assert clock.sleeps == pytest.approx([0.2] * 5)
+    stats = limiter.stats()
+    assert stats["num_requests"] == 10
+    assert stats["num_throttled"] == 5
+    assert stats["throttled_seconds"] == pytest.approx(1.0)
+
+
+def test_rate_limiter_retries_throttled_responses():
+    clock = FakeClock()
+    limiter = airtable.RateLimiter(rate=5, clock=clock, sleep=clock.sleep)
+
+    responses = [
+        mock.Mock(status_code=429, headers={"Retry-After": "30"}),
+        mock.Mock(status_code=503, headers={}),
+        mock.Mock(status_code=200, headers={}),
+    ]
+    send_request = mock.Mock(side_effect=responses)
+
+    res = limiter.send(send_request)
+
+    assert res.status_code == 200
+    assert send_request.call_count == 3
+    assert clock.now >= 30
+    stats = limiter.stats()
+    assert stats["num_retries"] == 2
+    assert stats["backoff_seconds"] >= 30
+
+
+def test_rate_limiter_server_errors_not_retried():
+    clock = FakeClock()
+    limiter = airtable.RateLimiter(rate=5, clock=clock, sleep=clock.sleep)
+
+    responses = [
+        mock.Mock(status_code=429, headers={}),
+        mock.Mock(status_code=503, headers={}),
+        mock.Mock(status_code=200, headers={}),
+    ]
+    send_request = mock.Mock(side_effect=responses)
+
+    # e.g. for POSTs, which may have been applied despite the 5xx
+    res = limiter.send(send_request, retry_server_errors=False)
+
+    assert res.status_code == 503
+    assert send_request.call_count == 2
+
+
+def test_rate_limiter_shared_per_base():
+    assert airtable.get_rate_limiter("base1") is airtable.get_rate_limiter(
+        "base1"
+    )
+    assert airtable.get_rate_limiter("base1") is not (
+        airtable.get_rate_limiter("base2")
+    )
+
+
 def test_poll_table_basic():
     # TODO: refactor AirtableClient logic more and get rid of the mocks
     with mock.patch(
         f"{airtable.__name__}.AirtableClient.get_all_with_new_status"
     ) as mock_get, mock.patch(
-        f"{airtable.__name__}.AirtableClient.update"
+        f"{airtable.__name__}.AirtableClient.update_many"
     ) as mock_update:
         # Test data
         test_model = FooModel(
@@ -188,7 +726,7 @@ def test_poll_table_basic():
                 on_processed(record)
 
         # Mocks
-        def mock_poll():
+        def mock_poll(**kwargs):
             if test_model.status != test_model.meta_last_seen_status:
                 return [test_model]
             else:
@@ -227,7 +765,7 @@ def test_poll_table_retries():
     with mock.patch(
         f"{airtable.__name__}.AirtableClient.get_all_with_new_status"
     ) as mock_get, mock.patch(
-        f"{airtable.__name__}.AirtableClient.update"
+        f"{airtable.__name__}.AirtableClient.update_many"
     ) as mock_update:
         test_model = FooModel(
             state=airtable.BaseModelState.CLEAN,
@@ -236,7 +774,7 @@ def test_poll_table_retries():
             status="New",
         )
 
-        mock_get.side_effect = lambda: [test_model]
+        mock_get.side_effect = lambda **kwargs: [test_model]
 
         # NOTE that we have to create the mock from a no-op lambda to set magic
         # attributes used for logging in `poll_table`
@@ -251,7 +789,12 @@ def test_poll_table_retries():
         client = FOO.get_airtable_client(
             secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
         )
-        poll_res = client.poll_table(on_status_update, max_num_retries=3)
+        poll_res = client.poll_table(
+            on_status_update,
+            retry_policy=airtable.RetryPolicy(
+                max_num_retries=3, base_delay=0, max_delay=0
+            ),
+        )
 
         assert not poll_res
         assert test_model.status == "New"
@@ -265,7 +808,7 @@ def test_poll_table_retries_transient():
     with mock.patch(
         f"{airtable.__name__}.AirtableClient.get_all_with_new_status"
     ) as mock_get, mock.patch(
-        f"{airtable.__name__}.AirtableClient.update"
+        f"{airtable.__name__}.AirtableClient.update_many"
     ) as mock_update:
         test_model = FooModel(
             state=airtable.BaseModelState.CLEAN,
@@ -274,7 +817,7 @@ def test_poll_table_retries_transient():
             status="New",
         )
 
-        mock_get.side_effect = lambda: [test_model]
+        mock_get.side_effect = lambda **kwargs: [test_model]
 
         # NOTE that we have to create the mock from a no-op lambda to set magic
         # attributes used for logging in `poll_table`
@@ -294,10 +837,496 @@ def test_poll_table_retries_transient():
         client = FOO.get_airtable_client(
             secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
         )
-        poll_res = client.poll_table(on_status_update, max_num_retries=3)
+        poll_res = client.poll_table(
+            on_status_update,
+            retry_policy=airtable.RetryPolicy(
+                max_num_retries=3, base_delay=0, max_delay=0
+            ),
+        )
 
         assert poll_res
         assert test_model.status == "New"
         assert test_model.meta_last_seen_status == "New"
         assert mock_update.call_count == 1
         assert on_new_mock.call_count == 3
+
+
+def test_poll_table_concurrent():
+    with mock.patch(
+        f"{airtable.__name__}.AirtableClient.get_all_with_new_status"
+    ) as mock_get, mock.patch(
+        f"{airtable.__name__}.AirtableClient.update_many"
+    ) as mock_update:
+        test_models = [
+            FooModel(
+                state=airtable.BaseModelState.CLEAN,
+                id=get_random_airtable_id(),
+                created_at=get_random_created_at(),
+                status="New",
+            )
+            for _ in range(20)
+        ]
+        mock_get.side_effect = lambda **kwargs: iter(test_models)
+
+        lock = threading.Lock()
+        num_running = 0
+        max_num_running = 0
+
+        def on_status_update(record):
+            nonlocal num_running, max_num_running
+            with lock:
+                num_running += 1
+                max_num_running = max(max_num_running, num_running)
+            time.sleep(0.01)
+            with lock:
+                num_running -= 1
+
+            record.status = "Processed"
+            if record is test_models[0]:
+                raise Exception("Fuuuuuu")
+
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
+        )
+        poll_res = client.poll_table(
+            on_status_update, max_num_retries=1, max_workers=4
+        )
+
+        # One record failed, but every record was processed
+        assert not poll_res
+        assert 1 < max_num_running <= 4
+        assert all(m.meta_last_seen_status == "New" for m in test_models)
+        assert sorted(
+            m.id for call in mock_update.call_args_list for m in call.args[0]
+        ) == sorted(m.id for m in test_models)
+
+
+def test_poll_table_write_back():
+    with mock.patch(
+        f"{airtable.__name__}.AirtableClient.get_all_with_new_status"
+    ) as mock_get, mock.patch(
+        f"{airtable.__name__}.AirtableClient.update_many"
+    ) as mock_update:
+        fast, slow = [
+            FooModel(
+                state=airtable.BaseModelState.CLEAN,
+                id=get_random_airtable_id(),
+                created_at=get_random_created_at(),
+                status="New",
+            )
+            for _ in range(2)
+        ]
+        mock_get.side_effect = lambda **kwargs: [fast, slow]
+
+        written = threading.Event()
+        mock_update.side_effect = lambda models: (
+            written.set() if fast in models else None
+        )
+
+        def on_status_update(record):
+            if record is slow:
+                assert written.wait(timeout=5)
+
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
+        )
+
+        # Processed records are written back before waiting on the others,
+        # rather than once their batch is full
+        assert client.poll_table(on_status_update, max_workers=2)
+        assert [call.args[0] for call in mock_update.call_args_list] == [
+            [fast],
+            [slow],
+        ]
+
+        # Or once they waited long enough
+        mock_update.reset_mock()
+        with mock.patch.object(airtable, "WRITE_BACK_MAX_DELAY", 0):
+            assert client.poll_table(lambda record: None)
+        assert [call.args[0] for call in mock_update.call_args_list] == [
+            [fast],
+            [slow],
+        ]
+
+
+def test_poll_table_retry_scheduling():
+    with mock.patch(
+        f"{airtable.__name__}.AirtableClient.get_all_with_new_status"
+    ) as mock_get, mock.patch(
+        f"{airtable.__name__}.AirtableClient.update_many"
+    ):
+        flaky, fatal, healthy = [
+            FooModel(
+                state=airtable.BaseModelState.CLEAN,
+                id=get_random_airtable_id(),
+                created_at=get_random_created_at(),
+                name=name,
+                status="New",
+            )
+            for name in ["flaky", "fatal", "healthy"]
+        ]
+        mock_get.side_effect = lambda **kwargs: [flaky, fatal, healthy]
+
+        calls = []
+
+        def on_status_update(record):
+            calls.append(record.name)
+            if record is flaky and calls.count("flaky") == 1:
+                raise requests.exceptions.ConnectionError()
+            elif record is fatal:
+                raise airtable.FatalCallbackError()
+
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
+        )
+        poll_res = client.poll_table(
+            on_status_update,
+            retry_policy=airtable.RetryPolicy(
+                max_num_retries=3, base_delay=0.01
+            ),
+        )
+
+        # Other records are processed while the failed record waits, fatal
+        # errors aren't retried
+        assert not poll_res
+        assert calls == ["flaky", "fatal", "healthy", "flaky"]
+        assert all(
+            m.meta_last_seen_status == "New" for m in [flaky, fatal, healthy]
+        )
+
+        # Retries that would run past the time budget are given up
+        calls.clear()
+        poll_res = client.poll_table(
+            on_status_update,
+            retry_policy=airtable.RetryPolicy(base_delay=60),
+            time_budget=1,
+        )
+        assert not poll_res
+        assert calls == ["flaky", "fatal", "healthy"]
+
+
+def test_retry_policy_fatal_exceptions():
+    # Only `FatalCallbackError` is fatal by default, callers opt in to more
+    policy = airtable.RetryPolicy()
+    assert not policy.is_retryable(airtable.FatalCallbackError())
+    assert policy.is_retryable(json.JSONDecodeError("truncated", "{", 1))
+    assert policy.is_retryable(KeyError("id"))
+
+    policy = airtable.RetryPolicy(
+        fatal_exceptions=(airtable.FatalCallbackError, KeyError)
+    )
+    assert not policy.is_retryable(KeyError("id"))
+    assert policy.is_retryable(ValueError())
+
+
+def test_poll_table_dead_letters():
+    def formula_filter(formula, record):
+        if "RECORD_ID()" in formula:
+            return f"'{record['id']}'" in formula
+        fields = record["fields"]
+        return fields.get("Status") != fields.get("_meta_last_seen_status")
+
+    with FakeAirtable(formula_filter=formula_filter) as fake:
+        flaky_id, healthy_id = [
+            r["id"]
+            for r in fake.add_records(
+                "foo",
+                [{"name": name, "Status": "New"} for name in ["a", "b"]],
+            )
+        ]
+
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
+        )
+        client.client = airtable.AirtableTransport(
+            "fakebaseid", "foo", "fakeapikey", api_url=fake.api_url
+        )
+        dead_letter_queue = DeadLetterQueue(MemoryStore())
+
+        calls = []
+        fail = True
+
+        def on_status_update(record):
+            calls.append(record.id)
+            if record.id == flaky_id and fail:
+                raise requests.exceptions.ConnectionError()
+
+        def poll():
+            return client.poll_table(
+                on_status_update,
+                retry_policy=airtable.RetryPolicy(
+                    max_num_retries=2, base_delay=0.01
+                ),
+                dead_letter_queue=dead_letter_queue,
+            )
+
+        # Records that keep failing are added to the dead letters, and still
+        # marked as seen
+        assert not poll()
+        assert calls == [flaky_id, healthy_id, flaky_id]
+        entry = client.list_dead_letters(dead_letter_queue)[flaky_id]
+        assert entry["status"] == "New"
+        assert entry["num_failures"] == 1
+        assert entry["retryable"]
+        flaky_fields = fake.tables["foo"][flaky_id]["fields"]
+        assert flaky_fields["_meta_last_seen_status"] == "New"
+
+        # Dead letters aren't retried until they're due
+        calls.clear()
+        assert poll()
+        assert calls == []
+
+        # Due dead letters are retried by id, and removed once they succeed
+        dead_letter_queue.put(
+            f"fakebaseid/{FOO.name}",
+            flaky_id,
+            {**entry, "next_attempt_at": "2021-01-01T00:00:00+00:00"},
+        )
+        fail = False
+        assert poll()
+        assert calls == [flaky_id]
+        assert client.list_dead_letters(dead_letter_queue) == {}
+
+        # Dead letters can be replayed manually, even when not retryable
+        dead_letter_queue.put(
+            f"fakebaseid/{FOO.name}",
+            healthy_id,
+            {**entry, "retryable": False},
+        )
+        calls.clear()
+        assert client.replay_dead_letters(on_status_update, dead_letter_queue)
+        assert calls == [healthy_id]
+        assert client.list_dead_letters(dead_letter_queue) == {}
+
+
+def test_poll_table_incremental():
+    store = MemoryStore()
+
+    with mock.patch.object(
+        airtable.AirtableTransport,
+        "_request",
+        return_value={"records": []},
+    ) as mock_request:
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT,
+            settings=TEST_SETTINGS,
+        )
+
+        # The first poll has no watermark, so it does a full scan
+        assert client.poll_table(lambda record: None, watermark_store=store)
+        assert mock_request.call_count == 1
+        watermark = store.get("watermark/fakebaseid/foo")
+        assert watermark is not None
+
+        # Nothing was modified, so only the probe is sent
+        assert client.poll_table(lambda record: None, watermark_store=store)
+        assert mock_request.call_count == 2
+        probe_params = dict(mock_request.call_args.kwargs["params"])
+        assert probe_params["maxRecords"] == 1
+        assert watermark in probe_params["filterByFormula"]
+
+        # Something was modified, so the scan is limited to modified records
+        mock_request.side_effect = [
+            {"records": [{"id": "rec1", "fields": {}}]},
+            {"records": []},
+        ]
+        assert client.poll_table(lambda record: None, watermark_store=store)
+        assert mock_request.call_count == 4
+        scan_params = dict(mock_request.call_args.kwargs["params"])
+        assert "_meta_last_seen_status" in scan_params["filterByFormula"]
+        assert watermark in scan_params["filterByFormula"]
+
+
+def test_poll_table_checkpoint():
+    def formula_filter(formula, record):
+        fields = record["fields"]
+        return fields.get("Status") != fields.get("_meta_last_seen_status")
+
+    with FakeAirtable(formula_filter=formula_filter) as fake:
+        record_ids = [
+            r["id"]
+            for r in fake.add_records(
+                "foo",
+                [{"name": f"foo {i}", "Status": "New"} for i in range(25)],
+            )
+        ]
+
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
+        )
+        client.client = airtable.AirtableTransport(
+            "fakebaseid",
+            "foo",
+            "fakeapikey",
+            page_size=5,
+            api_url=fake.api_url,
+        )
+        store = MemoryStore()
+        time_budget = 1.0
+
+        calls = []
+
+        def on_status_update(record):
+            calls.append(record.id)
+            # Use up the time budget in the middle of the third page
+            if len(calls) == 12:
+                time.sleep(time_budget)
+
+        # No new records are taken once the time budget runs out, and the
+        # records taken are checkpointed
+        assert client.poll_table(
+            on_status_update,
+            watermark_store=store,
+            checkpoint_store=store,
+            time_budget=time_budget,
+        )
+        assert calls == record_ids[:12]
+        checkpoint = store.get("checkpoint/fakebaseid/foo")
+        assert checkpoint["offset"] is not None
+        assert checkpoint["processed_ids"] == sorted(record_ids[:12])
+        assert store.get("watermark/fakebaseid/foo") is None
+
+        # The next poll resumes from the checkpoint
+        assert client.poll_table(
+            on_status_update, watermark_store=store, checkpoint_store=store
+        )
+        assert calls == record_ids
+        assert store.get("checkpoint/fakebaseid/foo") is None
+        assert store.get("watermark/fakebaseid/foo") == (
+            checkpoint["next_watermark"]
+        )
+
+        # Expired offsets restart the scan from the first page
+        store.set("checkpoint/fakebaseid/foo", checkpoint)
+        fake.expire_iterators()
+        for record_id in record_ids[:15]:
+            fake.tables["foo"][record_id]["fields"]["Status"] = "Processed"
+        calls.clear()
+        assert client.poll_table(
+            on_status_update, watermark_store=store, checkpoint_store=store
+        )
+        assert calls == record_ids[12:15]
+
+
+def test_poll_table_leases():
+    with mock.patch(
+        f"{airtable.__name__}.AirtableClient.get_all_with_new_status"
+    ) as mock_get, mock.patch(
+        f"{airtable.__name__}.AirtableClient.update_many"
+    ):
+        test_models = [
+            FooModel(
+                state=airtable.BaseModelState.CLEAN,
+                id=get_random_airtable_id(),
+                created_at=get_random_created_at(),
+                status="New",
+            )
+            for _ in range(3)
+        ]
+        mock_get.side_effect = lambda **kwargs: test_models
+
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
+        )
+        store = MemoryStore()
+        other = LeaseManager(store, owner="other")
+        calls = []
+
+        def poll(**kwargs):
+            return client.poll_table(
+                lambda record: calls.append(record.id),
+                lease_manager=LeaseManager(store, owner="us"),
+                **kwargs,
+            )
+
+        # Tables polled by another poll are skipped
+        lease = other.acquire("poll/fakebaseid/foo", 60)
+        assert poll()
+        assert calls == []
+
+        # And polled once the lease is released
+        other.release(lease)
+        assert poll()
+        assert calls == [m.id for m in test_models]
+        assert other.acquire("poll/fakebaseid/foo", 60) is not None
+
+        # With record leases, records claimed by another poll are skipped and
+        # not marked as seen, and the watermark isn't advanced past them
+        for m in test_models:
+            m.meta_last_seen_status = None
+        calls.clear()
+        watermark_store = MemoryStore()
+        other.acquire(f"poll/fakebaseid/foo/{test_models[1].id}/New", 60)
+        assert poll(record_leases=True, watermark_store=watermark_store)
+        assert calls == [test_models[0].id, test_models[2].id]
+        assert test_models[1].meta_last_seen_status is None
+        assert watermark_store.keys() == []
+
+        # Record leases are released once the seen status is written back
+        assert (
+            other.acquire(f"poll/fakebaseid/foo/{test_models[0].id}/New", 60)
+            is not None
+        )
+
+        # Records still claimed aren't processed
+        calls.clear()
+        assert poll(record_leases=True, watermark_store=watermark_store)
+        assert calls == [test_models[2].id]
+        assert watermark_store.keys() == []
+
+
+def test_shards():
+    record_ids = ["rec" + get_random_string(14) for _ in range(1000)]
+    record_ids += ["rec00000000000000", "recZZZZZZZZZZZZZZ"]
+    shards = [airtable.Shard(i, 4) for i in range(4)]
+
+    # Every record belongs to exactly one shard, and shards are balanced
+    counts = [sum(map(shard.contains, record_ids)) for shard in shards]
+    assert sum(counts) == len(record_ids)
+    assert min(counts) > len(record_ids) / 4 * 0.7
+
+    assert airtable.Shard.parse("1/4") == shards[1]
+    with pytest.raises(ValueError):
+        airtable.Shard.parse("4/4")
+    alphabet = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+    assert shards[1].formula() == (
+        f'MOD(FIND(MID(RECORD_ID(), LEN(RECORD_ID()) - 1, 1), "{alphabet}") '
+        f'* 62 + FIND(RIGHT(RECORD_ID(), 1), "{alphabet}"), 4) = 1'
+    )
+
+
+def test_poll_table_shards():
+    with FakeAirtable(formula_filter=new_status_formula_filter) as fake:
+        record_ids = [
+            r["id"]
+            for r in fake.add_records(
+                "foo",
+                [{"name": f"foo {i}", "Status": "New"} for i in range(20)],
+            )
+        ]
+
+        client = FOO.get_airtable_client(
+            secrets_client=TEST_SECRETS_CLIENT, settings=TEST_SETTINGS
+        )
+        client.client = airtable.AirtableTransport(
+            "fakebaseid", "foo", "fakeapikey", api_url=fake.api_url
+        )
+        store = MemoryStore()
+
+        processed = []
+        for i in range(3):
+            shard = airtable.Shard(i, 3)
+            calls = []
+            assert client.poll_table(
+                lambda record: calls.append(record.id),
+                watermark_store=store,
+                shard=shard,
+            )
+            assert all(shard.contains(record_id) for record_id in calls)
+            processed += calls
+
+        # Shards split the records between them, each with its own watermark
+        assert sorted(processed) == record_ids
+        assert store.keys("watermark/") == [
+            f"watermark/fakebaseid/foo/shard-{i}-of-3" for i in range(3)
+        ]
@@ -0,0 +1,65 @@
+import json
+import threading
+import time
+from unittest import mock
+
+import requests
+
+from ..clients import auth0
+from .helpers import TEST_ENV, MockSecretsClient
+
+#########
+# TESTS #
+#########
+
+
+def test_concurrent_token_refresh():
+    secrets_client = MockSecretsClient(
+        auth0=json.dumps(
+            {"api_token": "expired", "client_id": "", "client_secret": ""}
+        )
+    )
+    client = auth0.Auth0Client(
+        secrets_client=secrets_client,
+        settings=auth0.Auth0Settings(_env_file=TEST_ENV),
+    )
+    num_threads = 4
+    barrier = threading.Barrier(num_threads)
+
+    def mock_request(method, url, headers, json):
+        # Every thread sends its request with the expired token
+        barrier.wait()
+        response = requests.Response()
+        response.status_code = 401
+        return response
+
+    def mock_post(url, json):
+        time.sleep(0.05)
+        response = mock.Mock()
+        response.json.return_value = {"access_token": "refreshed"}
+        return response
+
+    def create_user():
+        try:
+            client.create_user("user@example.com", "User")
+        except Exception:
+            pass
+
+    with mock.patch.object(
+        auth0.requests, "request", side_effect=mock_request
+    ), mock.patch.object(
+        auth0.requests, "post", side_effect=mock_post
+    ) as post:
+        threads = [
+            threading.Thread(target=create_user) for _ in range(num_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # The token is only refreshed once
+    assert post.call_count == 1
+    assert json.loads(secrets_client.get_secret("auth0"))["api_token"] == (
+        "refreshed"
+    )
@@ -1,4 +1,5 @@
 from datetime import datetime
+from types import SimpleNamespace
 from unittest import mock
 
 from hypothesis import given
@@ -13,8 +14,10 @@ from hypothesis.strategies import (
     shared,
     text,
 )
+import pytest
 
 from automation.functions.delivery import (
+    DeliveryEmailError,
     Inventory,
     check_ready_to_send,
     render_email_template,
@@ -65,9 +68,15 @@ def test_render_email_template(
         )
     )
     inventory = mock.Mock(Inventory, auto_spec=True)
-    inventory.category.return_value = "Groceries"
-    inventory.quantity.return_value = 1
-    inventory.unit.return_value = "widget"
+    inventory.shopping_list.side_effect = lambda items, household_size: [
+        {
+            "name": item,
+            "category": "Groceries",
+            "quantity": 1,
+            "unit": "widget",
+        }
+        for item in items
+    ]
 
     email = render_email_template(ticket, [volunteer], inventory)
 
@@ -97,6 +106,42 @@ def test_render_email_template(
             assert field in content.content
 
 
+def test_inventory():
+    items = [
+        SimpleNamespace(
+            item=item,
+            category="Groceries",
+            unit=unit,
+            **{f"size_{size}": quantity(size) for size in range(1, 11)},
+        )
+        for item, unit, quantity in [
+            ("Rice", "lb", lambda size: size),
+            ("Eggs", "dozen", lambda size: 3 * size),
+            ("Milk", "gallon", lambda size: 1),
+        ]
+    ]
+    table = mock.Mock()
+    table.get_all.return_value = iter(items)
+    inventory = Inventory(table)
+
+    assert inventory.category("Rice") == "Groceries"
+    assert inventory.unit("Eggs") == "dozen"
+    assert inventory.quantity("Eggs", 4) == 12
+    assert inventory.quantity("Eggs", None) == 3
+    with pytest.raises(DeliveryEmailError):
+        inventory.quantity("Eggs", 0)
+
+    # Larger households scale the quantities of the largest one, rounded up
+    assert inventory.quantity("Rice", 12) == 12
+    assert [
+        item["quantity"]
+        for item in inventory.shopping_list(["Eggs", "Milk", "Rice"], 13)
+    ] == [39, 2, 13]
+    assert inventory.shopping_list(["Rice"], 2) == [
+        {"name": "Rice", "category": "Groceries", "quantity": 2, "unit": "lb"}
+    ]
+
+
 def test_ready_to_send():
     required = dict(
         id="1",
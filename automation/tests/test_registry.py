@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from ..registry import Registry
+
+#########
+# TESTS #
+#########
+
+
+def test_registry_get():
+    now = 0.0
+    registry = Registry(clock=lambda: now)
+    values = iter(range(10))
+
+    def factory():
+        return next(values)
+
+    assert registry.get("foo", factory, ttl=60) == 0
+    assert registry.get("foo", factory, ttl=60) == 0
+    assert registry.get("bar", factory) == 1
+
+    # Values are rebuilt once they expire
+    now += 61
+    assert registry.get("foo", factory, ttl=60) == 2
+
+    # Or fail their health check
+    assert registry.get("foo", factory, health_check=lambda v: v > 2) == 3
+
+    # Or are invalidated
+    registry.invalidate(lambda key: key == "foo")
+    assert registry.get("foo", factory) == 4
+    assert registry.get("bar", factory) == 1
+    registry.invalidate()
+    assert registry.get("bar", factory) == 5
+
+    assert (registry.num_hits, registry.num_builds) == (2, 6)
+
+
+def test_registry_get_raises():
+    registry = Registry()
+
+    def factory():
+        raise RuntimeError("Setup failed")
+
+    with pytest.raises(RuntimeError):
+        registry.get("foo", factory)
+
+    # Failures aren't cached
+    assert registry.get("foo", lambda: "foo") == "foo"
+
+
+def test_registry_concurrent_get():
+    registry = Registry()
+    num_calls = 0
+
+    def factory():
+        nonlocal num_calls
+        num_calls += 1
+        time.sleep(0.1)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(registry.get("foo", factory))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Concurrent lookups share a single build
+    assert num_calls == 1
+    assert len({id(r) for r in results}) == 1
@@ -0,0 +1,110 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from ..secrets import BaseSecret, SecretsCache, SecretsClient
+from ..settings import GoogleCloudSettings
+from .helpers import TEST_ENV
+
+#########
+# UTILS #
+#########
+
+
+class FakeSecretManager:
+    """Implements the parts of `SecretManagerServiceClient` we use"""
+
+    def __init__(self, latency=0.0, **secrets):
+        self.latency = latency
+        self.secrets = secrets
+        self.num_accesses = 0
+        self._lock = threading.Lock()
+
+    def secret_path(self, project_id, name):
+        return f"projects/{project_id}/secrets/{name}"
+
+    def secret_version_path(self, project_id, name, version):
+        return f"projects/{project_id}/secrets/{name}/versions/{version}"
+
+    def add_secret_version(self, request):
+        name = request["parent"].split("/")[3]
+        self.secrets[name] = request["payload"]["data"].decode("UTF-8")
+
+    def access_secret_version(self, request):
+        time.sleep(self.latency)
+        with self._lock:
+            self.num_accesses += 1
+        name = request["name"].split("/")[3]
+        data = self.secrets[name].encode("UTF-8")
+        return SimpleNamespace(payload=SimpleNamespace(data=data))
+
+
+class FooSecrets(BaseSecret):
+
+    _secret_name = "foo"
+    value: str
+
+
+def get_secrets_client(secret_manager, clock=time.monotonic, ttl=60):
+    client = SecretsClient(
+        settings=GoogleCloudSettings(_env_file=TEST_ENV),
+        ttl=ttl,
+        cache=SecretsCache(clock=clock),
+    )
+    client._client = secret_manager
+    return client
+
+
+#########
+# TESTS #
+#########
+
+
+def test_secrets_cached():
+    now = 0.0
+    secret_manager = FakeSecretManager(foo='{"value": "bar"}')
+    client = get_secrets_client(secret_manager, clock=lambda: now, ttl=60)
+
+    assert FooSecrets.load(client).value == "bar"
+    assert FooSecrets.load(client).value == "bar"
+    assert secret_manager.num_accesses == 1
+
+    # Secrets are fetched again once they expire
+    now += 61
+    assert FooSecrets.load(client).value == "bar"
+    assert secret_manager.num_accesses == 2
+
+    # Or once invalidated
+    client.invalidate("foo")
+    assert FooSecrets.load(client).value == "bar"
+    assert secret_manager.num_accesses == 3
+
+
+def test_secrets_save_invalidates():
+    secret_manager = FakeSecretManager(foo='{"value": "bar"}')
+    client = get_secrets_client(secret_manager)
+
+    secrets = FooSecrets.load(client)
+    secrets.value = "baz"
+    secrets.save()
+
+    assert FooSecrets.load(client).value == "baz"
+
+
+def test_secrets_preload():
+    secret_manager = FakeSecretManager(
+        latency=0.1, foo="foo", bar="bar", baz="baz"
+    )
+    client = get_secrets_client(secret_manager)
+
+    start = time.monotonic()
+    client.preload(["foo", "bar", "baz", "foo"])
+    assert time.monotonic() - start < 0.25
+
+    # Every secret was fetched once, and is now cached
+    assert [client.get_secret(n) for n in ["foo", "bar", "baz"]] == [
+        "foo",
+        "bar",
+        "baz",
+    ]
+    assert secret_manager.num_accesses == 3
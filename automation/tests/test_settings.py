@@ -1,7 +1,9 @@
 import itertools
+from unittest import mock
 
 import pytest
 
+from .. import settings
 from ..clients import airtable, auth0, slack
 from ..functions import delivery
 
@@ -25,3 +27,35 @@ from ..functions import delivery
 )
 def test_load_settings(settings_class, env_file):
     settings_class(_env_file=env_file)
+
+
+def test_get_settings(monkeypatch):
+    settings.reload_settings()
+    with mock.patch.object(
+        settings, "read_env_file", wraps=settings.read_env_file
+    ) as read_env_file:
+        airtable_settings = settings.get_settings(airtable.AirtableSettings)
+        assert settings.get_settings(airtable.AirtableSettings) is (
+            airtable_settings
+        )
+        settings.get_settings(auth0.Auth0Settings)
+        airtable.AirtableSettings()
+
+    # The env file is only read once, for every settings class
+    assert read_env_file.call_count == 1
+
+    # Until settings are reloaded
+    monkeypatch.setenv("AIRTABLE_BASE_ID", "otherbaseid")
+    assert settings.get_settings(airtable.AirtableSettings) is (
+        airtable_settings
+    )
+    settings.reload_settings()
+    assert settings.get_settings(airtable.AirtableSettings).base_id == (
+        "otherbaseid"
+    )
+    assert settings.get_settings(airtable.AirtableSettings).table_names == (
+        airtable_settings.table_names
+    )
+
+    monkeypatch.delenv("AIRTABLE_BASE_ID")
+    settings.reload_settings()
@@ -0,0 +1,128 @@
+import pytest
+
+from ..stores import (
+    DeadLetterQueue,
+    JsonFileStore,
+    LeaseManager,
+    MemoryStore,
+    SqliteStore,
+)
+
+
+@pytest.fixture(params=["memory", "json_file", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    elif request.param == "json_file":
+        return JsonFileStore(tmp_path / "store.json")
+    else:
+        return SqliteStore(tmp_path / "store.db")
+
+
+def test_store_basic(store):
+    assert store.get("foo") is None
+    assert store.get("foo", "default") == "default"
+
+    store.set("foo", {"bar": [1, 2]})
+    assert store.get("foo") == {"bar": [1, 2]}
+
+    store.set("foo", "baz")
+    assert store.get("foo") == "baz"
+
+    store.delete("foo")
+    assert store.get("foo") is None
+
+    # Deleting a missing key is a no-op
+    store.delete("foo")
+
+
+def test_json_file_store_persists(tmp_path):
+    JsonFileStore(tmp_path / "store.json").set("foo", "bar")
+    assert JsonFileStore(tmp_path / "store.json").get("foo") == "bar"
+
+
+def test_store_keys(store):
+    for key in ["b/2", "a/1", "b/1", "b_1"]:
+        store.set(key, key)
+
+    assert store.keys() == ["a/1", "b/1", "b/2", "b_1"]
+    assert store.keys("b/") == ["b/1", "b/2"]
+    assert store.keys("c/") == []
+
+
+def test_sqlite_store_persists(tmp_path):
+    SqliteStore(tmp_path / "store.db").set("foo", "bar")
+    assert SqliteStore(tmp_path / "store.db").get("foo") == "bar"
+
+
+def test_dead_letter_queue(store):
+    queue = DeadLetterQueue(store)
+    queue.put("base/foo", "rec1", {"num_failures": 1})
+    queue.put("base/foo", "rec2", {"num_failures": 2})
+    queue.put("base/bar", "rec3", {"num_failures": 3})
+
+    assert queue.get("base/foo", "rec1") == {"num_failures": 1}
+    assert queue.entries("base/foo") == {
+        "rec1": {"num_failures": 1},
+        "rec2": {"num_failures": 2},
+    }
+
+    queue.remove("base/foo", "rec1")
+    assert queue.entries("base/foo") == {"rec2": {"num_failures": 2}}
+    assert queue.get("base/foo", "rec1") is None
+
+
+def test_store_compare_and_set(store):
+    assert store.compare_and_set("foo", None, {"bar": 1})
+    assert not store.compare_and_set("foo", None, {"bar": 2})
+    assert not store.compare_and_set("foo", {"bar": 2}, {"bar": 3})
+    assert store.get("foo") == {"bar": 1}
+
+    assert store.compare_and_set("foo", {"bar": 1}, None)
+    assert store.get("foo") is None
+
+
+def test_sqlite_store_compare_and_set_across_connections(tmp_path):
+    first = SqliteStore(tmp_path / "store.db")
+    second = SqliteStore(tmp_path / "store.db")
+
+    assert first.compare_and_set("foo", None, "first")
+    assert not second.compare_and_set("foo", None, "second")
+    assert second.get("foo") == "first"
+
+
+def test_lease_manager(store):
+    now = 1000.0
+    ours = LeaseManager(store, owner="ours", clock=lambda: now)
+    theirs = LeaseManager(store, owner="theirs", clock=lambda: now)
+
+    lease = ours.acquire("table", 10)
+    assert lease.token == 1
+    assert theirs.acquire("table", 10) is None
+
+    # Leases are only renewed once half of their ttl is used up
+    assert ours.keep(lease, 10) is lease
+    now += 6
+    lease = ours.keep(lease, 10)
+    assert lease.expires_at == now + 10
+
+    # Expired leases can be taken over, and the previous owner can neither
+    # renew nor release them
+    now += 11
+    assert not ours.is_held(lease)
+    their_lease = theirs.acquire("table", 10)
+    assert their_lease.token == 2
+    assert ours.renew(lease, 10) is None
+    ours.release(lease)
+    assert theirs.is_held(their_lease)
+
+    # Released leases can be acquired right away, with a new token
+    theirs.release(their_lease)
+    assert not theirs.is_held(their_lease)
+    assert ours.acquire("table", 10).token == 3
+
+    # Only expired leases are pruned
+    ours.acquire("table/rec1", 10)
+    ours.release(ours.acquire("table/rec2", 10))
+    assert ours.prune("table/") == 1
+    assert store.keys("lease/") == ["lease/table", "lease/table/rec1"]
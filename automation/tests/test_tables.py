@@ -0,0 +1,203 @@
+from datetime import datetime
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from structlog.testing import capture_logs
+
+from .. import tables
+from ..clients import airtable
+from ..functions import delivery
+from ..models import IntakeModel
+from ..registry import Registry
+from ..stores import DeadLetterQueue, MemoryStore
+from .helpers import TEST_ENV, MockSecretsClient, get_random_member
+
+#########
+# UTILS #
+#########
+
+
+def get_settings():
+    return airtable.AirtableSettings(
+        _env_file=TEST_ENV,
+        table_names={name: name for name in tables.TABLES},
+    )
+
+
+#########
+# TESTS #
+#########
+
+
+def test_poll_tables():
+    secrets_client = MockSecretsClient(airtable=json.dumps({"api_key": ""}))
+    registry = Registry()
+    polled_clients = {}
+
+    def mock_poll_table(client, callback, **kwargs):
+        polled_clients[client.table_spec.name] = client
+        client.rate_limiter.acquire()
+        if client.table_spec.name == "intake":
+            client.rate_limiter.backoff(0, retry_after=0.0)
+            raise RuntimeError("Polling failed")
+        return True
+
+    with mock.patch.object(
+        airtable.AirtableClient,
+        "poll_table",
+        autospec=True,
+        side_effect=mock_poll_table,
+    ), capture_logs() as logs:
+        results = tables.poll_tables(
+            secrets_client=secrets_client,
+            airtable_settings=get_settings(),
+            registry=registry,
+        )
+
+        # Every default table is polled, and failures of one table don't
+        # affect others
+        assert results == {"members": True, "intake": False}
+        assert sorted(polled_clients) == ["intake", "members"]
+
+        # The rate limiter stats of the poll are logged
+        stats = next(
+            log
+            for log in logs
+            if log["event"] == "Airtable rate limiter stats"
+            and log["base_id"] == "fakebaseid"
+        )
+        assert stats["num_requests"] == 2
+        assert stats["num_retries"] == 1
+
+        # Other tables are polled when asked for
+        results = tables.poll_tables(
+            ["inbound"],
+            secrets_client=secrets_client,
+            airtable_settings=get_settings(),
+            registry=registry,
+        )
+        assert results == {"inbound": True}
+
+
+def test_poll_tables_registry():
+    secrets_client = MockSecretsClient(airtable=json.dumps({"api_key": ""}))
+    settings = get_settings()
+    registry = Registry()
+    polled_clients = []
+    failing_table = None
+
+    def mock_poll_table(client, callback, **kwargs):
+        polled_clients.append(client)
+        if client.table_spec.name == failing_table:
+            raise RuntimeError("Polling failed")
+        return True
+
+    def poll():
+        polled_clients.clear()
+        tables.poll_tables(
+            secrets_client=secrets_client,
+            airtable_settings=settings,
+            registry=registry,
+        )
+        return list(polled_clients)
+
+    def ids(clients):
+        return {id(c) for c in clients}
+
+    with mock.patch.object(
+        airtable.AirtableClient,
+        "poll_table",
+        autospec=True,
+        side_effect=mock_poll_table,
+    ):
+        first_clients = poll()
+        assert len(ids(first_clients)) == 2
+
+        # Clients are kept for the next invocation
+        assert ids(poll()) == ids(first_clients)
+        assert registry.num_builds == 2
+
+        # Unless polling the table raised, which doesn't affect other tables
+        failing_table = "intake"
+        poll()
+        failing_table = None
+        clients = {c.table_spec.name: c for c in poll()}
+        assert id(clients["intake"]) not in ids(first_clients)
+        assert id(clients["members"]) in ids(first_clients)
+
+    # And are shared between tables
+    table = tables.Intake(
+        secrets_client=secrets_client,
+        airtable_settings=settings,
+        registry=registry,
+    )
+    members = tables.Members(
+        read_only=True,
+        secrets_client=secrets_client,
+        airtable_settings=settings,
+        registry=registry,
+    )
+    assert table.member_table is members._get_client()
+
+
+def test_poll_intake_fatal_errors():
+    secrets_client = MockSecretsClient(airtable=json.dumps({"api_key": ""}))
+    registry = Registry()
+    ticket = IntakeModel(
+        id="rec1234",
+        state=airtable.BaseModelState.CLEAN,
+        created_at=datetime.now(),
+        ticket_id="1234",
+        recordID="rec1234",
+        status="Assigned / In Progress",
+        delivery_volunteer=["rec5678"],
+        request_name="Fred R",
+        address="4716 Ellsworth Avenue",
+        phone_number="611",
+        food_options=["Eggs"],
+        household_size=0,
+    )
+
+    items_table = mock.Mock()
+    items_table.get_all.return_value = iter(
+        [
+            SimpleNamespace(
+                item="Eggs",
+                category="Groceries",
+                unit="dozen",
+                **{f"size_{size}": size for size in range(1, 11)},
+            )
+        ]
+    )
+    registry.get(("inventory",), lambda: delivery.Inventory(items_table))
+    registry.get(("sendgrid",), mock.Mock)
+
+    table = tables.Intake(
+        secrets_client=secrets_client,
+        airtable_settings=get_settings(),
+        delivery_settings=delivery.DeliverySettings(_env_file=TEST_ENV),
+        dead_letter_queue=DeadLetterQueue(MemoryStore()),
+        registry=registry,
+    )
+    with mock.patch.object(
+        airtable.AirtableClient,
+        "get_all_with_new_status",
+        side_effect=lambda **kwargs: [ticket],
+    ), mock.patch.object(
+        airtable.AirtableClient,
+        "get_many",
+        side_effect=lambda ids, **kwargs: [get_random_member()],
+    ), mock.patch.object(
+        airtable.AirtableClient, "update_many"
+    ), mock.patch.object(
+        delivery, "on_assigned", wraps=delivery.on_assigned
+    ) as on_assigned:
+        assert not table.poll_table()
+
+    # Tickets that can't be delivered fail once, and aren't retried later
+    assert on_assigned.call_count == 1
+    entry = table._get_client().list_dead_letters(table.dead_letter_queue)[
+        ticket.id
+    ]
+    assert not entry["retryable"]
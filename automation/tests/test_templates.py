@@ -0,0 +1,62 @@
+import json
+from types import SimpleNamespace
+
+from ..scripts import build_templates
+from ..utils import templates
+
+#########
+# TESTS #
+#########
+
+
+def test_build_templates(tmp_path):
+    compiled_path = tmp_path / "compiled"
+    manifest = build_templates.build(compiled_path)
+    assert manifest["inlined"] == [
+        "email_template.html.jinja",
+        "new_member_email.html.jinja",
+    ]
+
+    source_env, _ = templates.get_environment(None)
+    compiled_env, inlined = templates.get_environment(compiled_path)
+    assert inlined == set(manifest["inlined"])
+
+    context = {
+        "subject": "Welcome!",
+        "member": SimpleNamespace(name="Grace Hopper"),
+    }
+    rendered = templates.render_with(
+        compiled_env, inlined, "new_member_email.html.jinja", True, context
+    )
+    assert rendered.count("style=") > 1
+    assert build_templates._normalize(rendered) == (
+        build_templates._normalize(
+            templates.render_with(
+                source_env,
+                frozenset(),
+                "new_member_email.html.jinja",
+                True,
+                context,
+            )
+        )
+    )
+
+
+def test_outdated_templates(tmp_path):
+    compiled_path = tmp_path / "compiled"
+    build_templates.build(compiled_path)
+    assert templates.read_manifest(compiled_path) is not None
+
+    # Builds are ignored once a template changed
+    manifest_path = compiled_path / templates.MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest["sources"]["new_member_email.html.jinja"] = "outdated"
+    manifest_path.write_text(json.dumps(manifest))
+    assert templates.read_manifest(compiled_path) is None
+
+    # Or once jinja was upgraded
+    build_templates.build(compiled_path)
+    manifest = json.loads(manifest_path.read_text())
+    manifest["jinja2"] = "0.0.0"
+    manifest_path.write_text(json.dumps(manifest))
+    assert templates.read_manifest(compiled_path) is None
@@ -10,32 +10,53 @@ Example:
         member=member,
     )
 
+Templates are rendered from `COMPILED_PATH` when it holds an up to date build
+(see `automation.scripts.build_templates`), which also has their CSS inlined
+ahead of time. Otherwise, they're compiled from `STATIC_PATH` when first used.
+
 NOTE when writing jinja templates try and make your variables correspond to
 existing models. For example, if you want to access a member's name in a
 template use `{{ member.name }}` instead of `{{ name }}`.
 """
 
 import functools
+import hashlib
+import json
 from pathlib import Path
 import re
 import logging
 
 import jinja2
 from jinja2.utils import select_autoescape
-from premailer import transform
 
+logger = logging.getLogger(__name__)
 
 STATIC_PATH = Path(__file__).parent.parent / "static"
 
+COMPILED_PATH = STATIC_PATH / "compiled"
+"""Where templates are built to, shipped with deploys"""
+
+MANIFEST_NAME = "manifest.json"
+"""Lists the templates of a build, with the hashes of their sources and the
+version of jinja they were built with
+"""
+
+INLINED_PREFIX = "inlined/"
+"""Prefix of the names of built templates with their CSS inlined"""
+
+PREMAILER_OPTIONS = {
+    "keep_style_tags": True,
+    "cssutils_logging_level": logging.ERROR,
+}
+
 
 def digits_only(value):
     return re.sub(r"[^0-9]", "", value, count=0)
 
 
-@functools.cache
-def get_environment():
+def create_environment(loader):
     env = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(str(STATIC_PATH)),
+        loader=loader,
         autoescape=select_autoescape(["HTML"]),
         trim_blocks=True,
         lstrip_blocks=True,
@@ -44,13 +65,77 @@ def get_environment():
     return env
 
 
+def hash_source(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def read_manifest(compiled_path):
+    """Returns the manifest of a build, or `None` if it's missing, built with
+    another version of jinja or out of date with the templates' sources
+    """
+    try:
+        with (Path(compiled_path) / MANIFEST_NAME).open() as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    # NOTE that compiled templates call into jinja's runtime, which isn't
+    # stable across versions
+    if manifest.get("jinja2") != jinja2.__version__:
+        logger.warning(
+            "Compiled templates were built with jinja2 %s (running %s), "
+            "rebuild them with `python -m automation.scripts.build_templates`",
+            manifest.get("jinja2"),
+            jinja2.__version__,
+        )
+        return None
+
+    for name, source_hash in manifest["sources"].items():
+        path = STATIC_PATH / name
+        if not path.is_file() or hash_source(path) != source_hash:
+            logger.warning(
+                "Compiled templates are out of date, rebuild them with "
+                "`python -m automation.scripts.build_templates`"
+            )
+            return None
+    return manifest
+
+
+@functools.cache
+def get_environment(compiled_path=COMPILED_PATH):
+    """Returns the environment of templates, and the names of those with their
+    CSS inlined ahead of time
+    """
+    loader = jinja2.FileSystemLoader(str(STATIC_PATH))
+    manifest = read_manifest(compiled_path) if compiled_path else None
+    if manifest is None:
+        return create_environment(loader), frozenset()
+
+    # NOTE that templates added since the build are still loaded from source
+    loader = jinja2.ChoiceLoader(
+        [jinja2.ModuleLoader(str(compiled_path)), loader]
+    )
+    return create_environment(loader), frozenset(manifest["inlined"])
+
+
 def render(template_name, inline_css=False, **kwargs):
-    rendered = get_environment().get_template(template_name).render(**kwargs)
-    if inline_css:
-        return transform(
-            rendered,
-            keep_style_tags=True,
-            cssutils_logging_level=logging.ERROR,
+    env, inlined = get_environment()
+    return render_with(env, inlined, template_name, inline_css, kwargs)
+
+
+def render_with(env, inlined, template_name, inline_css, context):
+    """Renders a template of a given environment, see `get_environment`"""
+    if inline_css and template_name in inlined:
+        return env.get_template(INLINED_PREFIX + template_name).render(
+            **context
         )
+
+    rendered = env.get_template(template_name).render(**context)
+    if inline_css:
+        # NOTE that premailer (and lxml, cssutils) is slow to import, and only
+        # needed for some emails
+        from premailer import transform
+
+        return transform(rendered, **PREMAILER_OPTIONS)
     else:
         return rendered
@@ -1,23 +1,37 @@
 import logging
 
 from automation import cloud_logging, tables
+from automation.registry import Registry
 
 
 cloud_logging.configure()
 
+POLL_TIME_BUDGET = 45.0
+"""Seconds polls take new records for, leaving time to write back statuses
+before the function times out (60 seconds by default)
+"""
+
+REGISTRY = Registry()
+"""Clients kept between invocations served by the same (warm) instance"""
+
 
 ##########################
 # GOOGLE CLOUD FUNCTIONS #
 ##########################
 
 
-def poll_members(event, context):
-    table = tables.Members()
-    success = table.poll_table()
-    logging.info("Polling complete" if success else "Polling failed")
-
-
-def poll_intake(event, context):
-    table = tables.Intake()
-    success = table.poll_table()
-    logging.info("Polling complete" if success else "Polling failed")
+# NOTE that polls here run without a watermark, checkpoint, lease or dead
+# letter store, since Cloud Functions only have disk local to an instance,
+# which isn't shared between instances and is lost on cold starts. So every
+# poll scans the whole table, polls cut short by their time budget scan from
+# the start again, overlapping polls aren't excluded, and records whose
+# callbacks keep failing are marked as seen without being kept for later.
+# These stay off in the deployed function (they're used through
+# `automation.scripts.local`) until there is a store shared by instances
+def poll_all(event, context):
+    results = tables.poll_tables(
+        time_budget=POLL_TIME_BUDGET, registry=REGISTRY
+    )
+    logging.info(
+        "Polling complete" if all(results.values()) else "Polling failed"
+    )